@@ -2,6 +2,10 @@ import traceback
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from core.llm import limiter_state
+from core.job_queue import PIPELINE_WORKERS, queue_stats, use_workers
+from core.worker import start_workers, stop_workers
+from utils import syntax_validator
 
 app = FastAPI(title="Repo-to-Jac API", version="1.0.0")
 
@@ -13,17 +17,35 @@ app.add_middleware(
 )
 
 try:
-    from api.routes import convert, stream, preview, download
+    from api.routes import convert, stream, preview, download, metrics, trace
     app.include_router(convert.router)
     app.include_router(stream.router)
     app.include_router(preview.router)
     app.include_router(download.router)
+    app.include_router(metrics.router)
+    app.include_router(trace.router)
     print("✅ All routes loaded")
 except Exception as e:
     print(f"❌ Route load failed: {e}")
     traceback.print_exc()
 
 
+@app.on_event("startup")
+async def start_background_processes():
+    if use_workers():
+        # Conversions run in worker processes — they keep their own validator pools
+        app.state.pipeline_workers = start_workers(PIPELINE_WORKERS)
+        return
+    # Spawn the Jac parser workers before the first conversion needs them
+    syntax_validator.warm_up()
+
+
+@app.on_event("shutdown")
+async def stop_background_processes():
+    stop_workers(getattr(app.state, "pipeline_workers", []))
+    syntax_validator.shutdown()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     tb = traceback.format_exc()
@@ -37,4 +59,6 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "service": "repo-to-jac"}
\ No newline at end of file
+    if use_workers():
+        return {"status": "ok", "service": "repo-to-jac", "job_queue": queue_stats()}
+    return {"status": "ok", "service": "repo-to-jac", "llm_limiter": limiter_state()}
\ No newline at end of file
@@ -1,8 +1,11 @@
 import uuid
-from fastapi import APIRouter, BackgroundTasks
+from typing import Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 from core.job_store import create_job
+from core.job_queue import enqueue_job, use_workers
 from core.pipeline import run_pipeline
+from utils.repo_sources import ALLOW_LOCAL_SOURCES, open_source
 
 router = APIRouter()
 
@@ -11,6 +14,11 @@ class ConvertRequest(BaseModel):
     github_url: str
     include_tests: bool = False
     target_model: str = "claude-3-5-sonnet-20241022"
+    use_cache: bool = True   # False forces fresh LLM calls for this conversion
+    incremental: bool = False          # reuse the last stored result for this repo
+    base_job_id: Optional[str] = None  # ...or the result of a specific earlier job
+    priority: Literal["low", "normal", "high"] = "normal"   # share of LLM slots vs other running jobs
+    batch: bool = False   # submit classify/convert prompts as LLM batches (bulk, not interactive)
 
 
 class ConvertResponse(BaseModel):
@@ -21,16 +29,35 @@ class ConvertResponse(BaseModel):
 
 @router.post("/convert", response_model=ConvertResponse)
 async def start_conversion(req: ConvertRequest, background_tasks: BackgroundTasks):
+    try:
+        # Server paths and arbitrary git URLs are for trusted deployments only
+        open_source(req.github_url, allow_local=ALLOW_LOCAL_SOURCES)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     job_id = str(uuid.uuid4())
 
     # BUG-2 FIX: create job BEFORE returning response
     # so the queue exists when the frontend opens the SSE stream
     create_job(job_id)
 
-    # BUG-2 FIX: use BackgroundTasks instead of asyncio.create_task
-    background_tasks.add_task(
-        run_pipeline, job_id, req.github_url, req.target_model
-    )
+    if use_workers():
+        # A worker process runs it; this process only relays events from the job store
+        enqueue_job(job_id, {
+            "github_url":  req.github_url,
+            "model":       req.target_model,
+            "use_cache":   req.use_cache,
+            "incremental": req.incremental,
+            "base_job_id": req.base_job_id,
+            "priority":    req.priority,
+            "batch":       req.batch,
+        })
+    else:
+        # BUG-2 FIX: use BackgroundTasks instead of asyncio.create_task
+        background_tasks.add_task(
+            run_pipeline, job_id, req.github_url, req.target_model,
+            req.use_cache, req.incremental, req.base_job_id, req.priority, req.batch,
+        )
 
     return ConvertResponse(
         job_id=job_id,
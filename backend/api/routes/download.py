@@ -1,17 +1,93 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-from core.job_store import get_output_path
+import re
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from core.job_store import get_output_path, get_artifact, get_preview_data
+from utils.zip_builder import ENV_EXAMPLE, stream_zip
 
 router = APIRouter()
 
+FILENAME = "converted-jac.zip"
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Single byte range → (start, end_exclusive). Raises 416 if unsatisfiable."""
+    m = _RANGE_RE.match(header.strip())
+    if not m or m.groups() == ("", ""):
+        return None   # malformed or multi-range — serve the whole file
+    first, last = m.groups()
+    if first:
+        start = int(first)
+        end   = min(int(last) + 1, size) if last else size
+    else:
+        start, end = max(size - int(last), 0), size   # suffix range: last N bytes
+    if start >= size or start >= end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _preview_entries(preview: dict):
+    for f in preview.get("files", []):
+        yield f["path"], f.get("converted", "")
+    yield "README.md", preview.get("readme", "")
+    yield "demo.sh", preview.get("demo_script", "")
+    yield ".env.example", ENV_EXAMPLE
+
 
 @router.get("/download/{job_id}")
-async def download_zip(job_id: str):
+async def download_zip(job_id: str, request: Request):
+    disposition = {"Content-Disposition": f'attachment; filename="{FILENAME}"'}
+
+    # Finalized in-memory archive: exact length + Range/resume support
+    artifact = get_artifact(job_id)
+    if artifact is not None and artifact.finalized:
+        size    = artifact.size
+        headers = {**disposition, "Accept-Ranges": "bytes"}
+        span    = _parse_range(request.headers["range"], size) if "range" in request.headers else None
+        if span is None:
+            return StreamingResponse(
+                artifact.iter_bytes(),
+                media_type="application/zip",
+                headers={**headers, "Content-Length": str(size)},
+            )
+        start, end = span
+        return StreamingResponse(
+            artifact.iter_bytes(start, end),
+            status_code=206,
+            media_type="application/zip",
+            headers={
+                **headers,
+                "Content-Length": str(end - start),
+                "Content-Range":  f"bytes {start}-{end - 1}/{size}",
+            },
+        )
+
     path = get_output_path(job_id)
-    if not path:
+    if path:
+        return FileResponse(path, media_type="application/zip", filename=FILENAME)
+
+    # No archive kept — generate one on the fly from the stored preview
+    preview = get_preview_data(job_id)
+    if preview:
+        return StreamingResponse(
+            stream_zip(_preview_entries(preview)),
+            media_type="application/zip",
+            headers=disposition,
+        )
+
+    raise HTTPException(status_code=404, detail="Output not ready yet")
+
+
+@router.head("/download/{job_id}")
+async def download_zip_head(job_id: str):
+    artifact = get_artifact(job_id)
+    if artifact is None or not artifact.finalized:
         raise HTTPException(status_code=404, detail="Output not ready yet")
-    return FileResponse(
-        path,
+    return Response(
         media_type="application/zip",
-        filename="converted-jac.zip"
-    )
\ No newline at end of file
+        headers={"Content-Length": str(artifact.size), "Accept-Ranges": "bytes"},
+    )
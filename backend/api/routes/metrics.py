@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from core import metrics
+from core.job_store import job_count, running_count
+from core.job_queue import queue_stats
+from core.llm import limiter_state
+from core.llm_cache import cache_stats
+
+router = APIRouter()
+
+# Point-in-time values, read when Prometheus scrapes
+metrics.Gauge("repo2jac_active_jobs", "Jobs still running.", fn=running_count)
+metrics.Gauge("repo2jac_job_store_jobs", "Jobs held in the job store (running and finished, until JOB_TTL).", fn=job_count)
+metrics.Gauge("repo2jac_llm_concurrency_limit", "Current adaptive LLM concurrency limit.", fn=lambda: limiter_state()["limit_exact"])
+metrics.Gauge("repo2jac_llm_in_flight", "LLM calls in flight.", fn=lambda: limiter_state()["in_flight"])
+metrics.Gauge("repo2jac_llm_waiting", "LLM calls waiting for a slot.", fn=lambda: limiter_state()["waiting"])
+metrics.Gauge("repo2jac_llm_backoff_seconds", "Remaining rate-limit pause.", fn=lambda: limiter_state()["backoff_seconds"])
+metrics.Gauge("repo2jac_queue_pending", "Jobs waiting for a pipeline worker.", fn=lambda: queue_stats()["pending"])
+metrics.Gauge("repo2jac_queue_running", "Jobs claimed by pipeline workers.", fn=lambda: queue_stats()["running"])
+metrics.Gauge("repo2jac_llm_cache_bytes", "Size of the local LLM response cache.", fn=lambda: cache_stats().get("bytes", 0))
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,37 +1,55 @@
 import json
 import asyncio
-from fastapi import APIRouter
+from typing import Optional
+from fastapi import APIRouter, Header
 from fastapi.responses import StreamingResponse
-from core.job_store import get_event_queue
+from core.job_store import job_exists, subscribe_events
+from core.metrics import SSE_SUBSCRIBERS
 
 router = APIRouter()
 
 
 @router.get("/stream/{job_id}")
-async def stream_progress(job_id: str):
+async def stream_progress(
+    job_id: str,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    # Reconnecting clients resume after the last id they saw (header set by
+    # EventSource; query param for fetch-based readers)
+    try:
+        resume_from = int(last_event_id_header or last_event_id or 0)
+    except ValueError:
+        resume_from = 0
+
     async def event_generator():
 
         # BUG-3 FIX: wait up to 5 seconds for job to be registered
         # prevents false "Job not found" when SSE opens before pipeline starts
-        queue = None
+        found = False
         for _ in range(50):
-            queue = get_event_queue(job_id)
-            if queue:
+            found = job_exists(job_id)
+            if found:
                 break
             await asyncio.sleep(0.1)
 
-        if queue is None:
+        if not found:
             yield f"event: error\ndata: {json.dumps({'message': 'Job not found'})}\n\n"
             return
 
-        while True:
-            try:
-                event = await asyncio.wait_for(queue.get(), timeout=60.0)
-                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        SSE_SUBSCRIBERS.inc()
+        try:
+            async for event in subscribe_events(job_id, timeout=60.0, last_event_id=resume_from):
+                if event is None:
+                    yield ": ping\n\n"  # keepalive
+                    continue
+                # Live-only events (streamed output) carry no id and never move the resume point
+                event_id = f"id: {event['id']}\n" if event["id"] is not None else ""
+                yield f"{event_id}event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
                 if event["type"] in ("complete", "error"):
                     break
-            except asyncio.TimeoutError:
-                yield ": ping\n\n"  # keepalive
+        finally:
+            SSE_SUBSCRIBERS.dec()
 
     return StreamingResponse(
         event_generator(),
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+from typing import Literal
+from core import trace
+from core.job_store import get_trace
+
+router = APIRouter()
+
+
+@router.get("/trace/{job_id}")
+async def get_job_trace(job_id: str, format: Literal["json", "chrome"] = "json"):
+    """
+    Span tree of a job with wait time per span and its critical path.
+    ?format=chrome returns trace-event JSON for chrome://tracing or Perfetto.
+    A running job is only visible on the worker that runs it.
+    """
+    data = trace.live_trace(job_id) or get_trace(job_id)
+    if not data:
+        raise HTTPException(status_code=404, detail="No trace for this job")
+    if format == "chrome":
+        return trace.chrome_trace(data)
+    return {**data, "critical_path": trace.critical_path(data)}
@@ -0,0 +1,99 @@
+"""
+Compare the AST role classifier against expected labels and the LLM classifier.
+
+Usage (from backend/):
+    python -m bench.classifier_compare                      # heuristic only
+    python -m bench.classifier_compare --llm                # also ask the LLM
+    python -m bench.classifier_compare path/to/repo --threshold 0.5
+"""
+import os
+import re
+import sys
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.github_client import _should_include_path
+from utils.role_classifier import classify_role
+
+DEFAULT_REPO = os.path.join(os.path.dirname(__file__), "..", "..", "examples", "todo-app")
+
+# examples/todo-app files document their expected label in the header comment
+_EXPECTED_RE = re.compile(r'classifies this as role:\s*"(\w+)"')
+
+
+def load_files(root: str) -> list[dict]:
+    files = []
+    for dirpath, _, names in os.walk(root):
+        for name in sorted(names):
+            full = os.path.join(dirpath, name)
+            rel  = os.path.relpath(full, root).replace(os.sep, "/")
+            if _should_include_path(rel):
+                with open(full, encoding="utf-8", errors="replace") as fh:
+                    files.append({"path": rel, "content": fh.read()})
+    return files
+
+
+async def llm_roles(files: list[dict]) -> dict:
+    from core.llm import llm
+    from prompts.classify_role import classify_role_prompt
+
+    async def one(f):
+        try:
+            role = (await llm(classify_role_prompt(f["path"], f["content"]), temperature=0.1)).lower().strip()
+            return f["path"], role
+        except Exception as e:
+            return f["path"], f"error: {e}"
+
+    return dict(await asyncio.gather(*[one(f) for f in files]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("repo", nargs="?", default=DEFAULT_REPO)
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("ROLE_CONFIDENCE_THRESHOLD", 0.6)))
+    parser.add_argument("--llm", action="store_true", help="also classify every file with the LLM")
+    args = parser.parse_args()
+
+    files = load_files(args.repo)
+    if not files:
+        sys.exit(f"No Python files found under {args.repo}")
+
+    llm_out = asyncio.run(llm_roles(files)) if args.llm else {}
+
+    rows, confident = [], 0
+    vs_expected = [0, 0]   # correct, labelled
+    vs_llm      = [0, 0]   # agree, compared (confident heuristic answers only)
+    for f in files:
+        role, conf = classify_role(f["path"], f["content"])
+        match      = _EXPECTED_RE.search(f["content"])
+        expected   = match.group(1) if match else ""
+        llm_role   = llm_out.get(f["path"], "")
+        is_confident = conf >= args.threshold
+        confident   += is_confident
+
+        if expected:
+            vs_expected[1] += 1
+            vs_expected[0] += role == expected
+        if llm_role and is_confident:
+            vs_llm[1] += 1
+            vs_llm[0] += role == llm_role
+        rows.append((f["path"], role, conf, "ast" if is_confident else "llm", expected, llm_role))
+
+    width = max(len(r[0]) for r in rows)
+    print(f"{'file':<{width}}  {'heuristic':<10} {'conf':>5}  {'source':<6} {'expected':<10} llm")
+    for path, role, conf, source, expected, llm_role in rows:
+        print(f"{path:<{width}}  {role:<10} {conf:>5.2f}  {source:<6} {expected or '-':<10} {llm_role or '-'}")
+
+    total = len(files)
+    print()
+    print(f"LLM classify calls eliminated: {confident}/{total} ({confident / total:.0%}) at threshold {args.threshold}")
+    if vs_expected[1]:
+        print(f"Heuristic accuracy vs expected labels: {vs_expected[0]}/{vs_expected[1]}")
+    if vs_llm[1]:
+        print(f"Heuristic agreement with LLM (confident files): {vs_llm[0]}/{vs_llm[1]}")
+
+
+if __name__ == "__main__":
+    main()
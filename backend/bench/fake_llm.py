@@ -0,0 +1,302 @@
+"""
+Local stand-in for the Anthropic Messages API.
+
+Answers every request with a canned reply after a fixed or lognormally
+jittered latency, and
+injects the failures the LLM client has to cope with: 429s with retry-after
+once more than `capacity` requests are in flight, and random 429/529s.
+Also serves the Message Batches endpoints; a batch ends `batch_latency`
+seconds after submission, with `error_rate` of its requests errored.
+Streamed requests get their first text after `first_token` of the latency
+and the rest in small deltas spread over the remainder. With a `seed`, the
+latency of a request depends only on its prompt and how often that prompt
+was asked before, so two runs see the same latencies in any request order.
+
+Usage (from backend/):
+    python -m bench.fake_llm --port 8765 --capacity 8 --latency 0.2
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8765 ANTHROPIC_API_KEY=x uvicorn api.main:app
+"""
+import json
+import math
+import functools
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PLAN_REPLY = '{"nodes": [], "walkers": [], "edges": []}'
+JAC_REPLY  = "node Item {\n    has name: str = \"\";\n}\n\nwalker ListItems {\n    can run with Item entry {\n        report here;\n    }\n}\n"
+
+
+def canned_reply(prompt: str, nodes: int = 1) -> str:
+    """`nodes` > 1 pads conversions with extra node blocks, for larger outputs."""
+    if "Classify" in prompt:
+        return "service"
+    if "OSP architect" in prompt:
+        return PLAN_REPLY
+    if "README" in prompt:
+        return "# Converted project\n"
+    if "demo" in prompt.lower() and "bash" in prompt.lower():
+        return "#!/bin/bash\njac run main.jac\n"
+    extra = "".join(f"\nnode Item{i} {{\n    has name: str = \"\";\n}}\n" for i in range(1, nodes))
+    return JAC_REPLY + extra
+
+
+class FakeLLM:
+    """Server state shared by the handler threads."""
+
+    def __init__(self, latency: float = 0.2, capacity: int = 0, retry_after: float = 1.0,
+                 error_rate: float = 0.0, overload_rate: float = 0.0, reply=canned_reply,
+                 batch_latency: float = 2.0, latency_sigma: float = 0.0, first_token: float = 0.15,
+                 seed: int | None = None):
+        self.latency       = latency           # median seconds per reply
+        self.latency_sigma = latency_sigma     # lognormal spread; 0 = fixed latency
+        self.capacity      = capacity          # 0 = unlimited
+        self.retry_after   = retry_after
+        self.error_rate    = error_rate        # random 429s
+        self.overload_rate = overload_rate     # random 529s
+        self.reply         = reply
+        self.first_token   = first_token       # share of the latency before a stream's first delta
+        self.batch_latency = batch_latency
+        self.seed          = seed              # None = fresh random latencies and failures
+        self._rng          = random.Random(seed)
+        self._asked: dict[str, int] = {}       # seeded: prompt → times asked, picks its next latency
+        self.batches: dict = {}                # id → {"created", "requests"}
+        self.prefixes: set = set()             # cache_control prefixes seen, for cache token accounting
+        self.in_flight     = 0
+        self.peak          = 0
+        self.counts        = {"ok": 0, "429": 0, "529": 0}
+        self._lock         = threading.Lock()
+
+    def admit(self) -> int:
+        """Status code for a new request: 200, 429 or 529."""
+        with self._lock:
+            roll = self._rng.random()
+            if self.capacity and self.in_flight >= self.capacity or roll < self.error_rate:
+                self.counts["429"] += 1
+                return 429
+            if roll < self.error_rate + self.overload_rate:
+                self.counts["529"] += 1
+                return 529
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            return 200
+
+    def sample_latency(self, body: dict | None = None) -> float:
+        if self.latency_sigma <= 0 or self.latency <= 0:
+            return self.latency
+        rng = self._rng
+        if self.seed is not None and body is not None:
+            prompt = json.dumps(body.get("messages", []))
+            with self._lock:
+                asked = self._asked[prompt] = self._asked.get(prompt, 0) + 1
+            rng = random.Random(f"{self.seed}:{asked}:{prompt}")
+        return rng.lognormvariate(math.log(self.latency), self.latency_sigma)
+
+    def reset(self):
+        """Forget what was asked, so a seeded server replays the same latencies and failures."""
+        with self._lock:
+            self._rng     = random.Random(self.seed)
+            self._asked   = {}
+            self.prefixes = set()
+            self.peak     = self.in_flight
+            self.counts   = {"ok": 0, "429": 0, "529": 0}
+
+    def done(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.counts["ok"] += 1
+
+    def usage(self, body: dict, prompt: str) -> dict:
+        """Mimic prompt caching: a cache_control system block is a cache write once, a read after."""
+        usage = {"input_tokens": len(prompt) // 4, "output_tokens": 32,
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        for block in body.get("system") or []:
+            if not isinstance(block, dict):
+                continue
+            tokens = len(block.get("text", "")) // 4
+            if "cache_control" not in block:
+                usage["input_tokens"] += tokens
+                continue
+            with self._lock:
+                seen = block["text"] in self.prefixes
+                self.prefixes.add(block["text"])
+            usage["cache_read_input_tokens" if seen else "cache_creation_input_tokens"] += tokens
+        return usage
+
+    def message(self, body: dict) -> dict:
+        prompt = json.dumps(body.get("messages", []))
+        text   = self.reply(prompt)
+        usage  = self.usage(body, prompt)
+        usage["output_tokens"] = max(len(text) // 4, 1)
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:12]}", "type": "message", "role": "assistant", "model": body.get("model", "fake"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": usage,
+        }
+
+    def stream_events(self, body: dict, latency: float):
+        """(delay, event, data) for a streamed reply — the Messages API's SSE sequence."""
+        msg    = self.message(body)
+        text   = msg["content"][0]["text"]
+        deltas = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        step   = latency * (1 - self.first_token) / len(deltas)
+        start  = {**msg, "content": [], "stop_reason": None, "usage": {**msg["usage"], "output_tokens": 1}}
+        yield latency * self.first_token, "message_start", {"type": "message_start", "message": start}
+        yield 0, "content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+        for i, delta in enumerate(deltas):
+            yield step if i else 0, "content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": delta}}
+        yield step, "content_block_stop", {"type": "content_block_stop", "index": 0}
+        yield 0, "message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                   "usage": {"output_tokens": msg["usage"]["output_tokens"]}}
+        yield 0, "message_stop", {"type": "message_stop"}
+
+    def create_batch(self, requests: list[dict]) -> str:
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self.batches[batch_id] = {"created": time.time(), "requests": requests}
+        return batch_id
+
+    def batch_object(self, batch_id: str, base_url: str) -> dict:
+        batch = self.batches[batch_id]
+        ended = time.time() - batch["created"] >= self.batch_latency
+        n     = len(batch["requests"])
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(batch["created"]))
+        return {
+            "id": batch_id, "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else n, "succeeded": n if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "created_at": stamp, "expires_at": stamp, "ended_at": stamp if ended else None,
+            "archived_at": None, "cancel_initiated_at": None,
+            "results_url": f"{base_url}/v1/messages/batches/{batch_id}/results" if ended else None,
+        }
+
+    def batch_results(self, batch_id: str) -> str:
+        lines = []
+        for r in self.batches[batch_id]["requests"]:
+            if self._rng.random() < self.error_rate:
+                result = {"type": "errored", "error": {"type": "error", "error": {"type": "api_error", "message": "injected"}}}
+            else:
+                result = {"type": "succeeded", "message": self.message(r["params"])}
+            lines.append(json.dumps({"custom_id": r["custom_id"], "result": result}))
+        return "\n".join(lines) + "\n"
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        """Request handler class answering from this state, for any HTTP server."""
+        return _handler(self)
+
+    def serve(self, port: int = 0) -> ThreadingHTTPServer:
+        """Start in a daemon thread; port 0 picks a free one (server.server_port)."""
+        server = ThreadingHTTPServer(("127.0.0.1", port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def _handler(state: FakeLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status: int, body: dict, headers: dict | None = None):
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _base_url(self) -> str:
+            return f"http://{self.headers.get('host')}"
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")   # v1/messages/batches/<id>[/results]
+            if len(parts) < 4 or parts[:3] != ["v1", "messages", "batches"] or parts[3] not in state.batches:
+                return self._send(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+            if len(parts) == 5 and parts[4] == "results":
+                raw = state.batch_results(parts[3]).encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/binary")
+                self.send_header("content-length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+                return
+            self._send(200, state.batch_object(parts[3], self._base_url()))
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+            if self.path.split("?")[0].rstrip("/").endswith("/messages/batches"):
+                batch_id = state.create_batch(body["requests"])
+                return self._send(200, state.batch_object(batch_id, self._base_url()))
+            status = state.admit()
+            if status == 429:
+                return self._send(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "rate limited"}},
+                                  {"retry-after": str(state.retry_after)})
+            if status == 529:
+                return self._send(529, {"type": "error", "error": {"type": "overloaded_error", "message": "overloaded"}})
+            try:
+                if body.get("stream"):
+                    return self._stream(body)
+                time.sleep(state.sample_latency(body))
+                self._send(200, state.message(body))
+            except (BrokenPipeError, ConnectionResetError):
+                pass   # client gave up on the call — a cancelled hedge race
+            finally:
+                state.done()
+
+        def _stream(self, body: dict):
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            try:
+                for delay, event, data in state.stream_events(body, state.sample_latency(body)):
+                    time.sleep(delay)
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass   # client stopped reading — an aborted stream
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="median seconds per successful reply")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="lognormal spread of the latency (0 = fixed)")
+    parser.add_argument("--reply-nodes", type=int, default=1, help="node blocks per conversion reply (output size)")
+    parser.add_argument("--capacity", type=int, default=0, help="429 above this many in-flight requests (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of random 429s")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="fraction of random 529s")
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="seconds until a submitted batch ends")
+    parser.add_argument("--first-token", type=float, default=0.15, help="share of the latency before a stream's first text")
+    parser.add_argument("--seed", type=int, default=None, help="make latencies and failures reproducible")
+    args = parser.parse_args()
+
+    state  = FakeLLM(args.latency, args.capacity, args.retry_after, args.error_rate, args.overload_rate,
+                     reply=functools.partial(canned_reply, nodes=args.reply_nodes),
+                     batch_latency=args.batch_latency, latency_sigma=args.latency_sigma, first_token=args.first_token,
+                     seed=args.seed)
+    server = state.serve(args.port)
+    print(f"Fake LLM on http://127.0.0.1:{server.server_port}  (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"in_flight={state.in_flight} peak={state.peak} {state.counts}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
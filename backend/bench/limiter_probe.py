@@ -0,0 +1,76 @@
+"""
+Drive llm() against the fake LLM server and watch the adaptive limiter.
+
+The fake server 429s (with retry-after) once more than --capacity requests
+are in flight; the limiter should settle just under that capacity instead
+of sitting at MAX_PARALLEL or bouncing every call.
+
+Usage (from backend/):
+    python -m bench.limiter_probe --calls 300 --capacity 12 --latency 0.1
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_llm import FakeLLM
+
+
+async def probe(calls: int, sample_every: float) -> tuple[list, int]:
+    from core.llm import llm, limiter_state
+
+    failures = 0
+
+    async def one(i):
+        nonlocal failures
+        try:
+            await llm(f"probe call {i}", use_cache=False)
+        except Exception:
+            failures += 1
+
+    timeline, started = [], time.monotonic()
+    work = asyncio.gather(*(one(i) for i in range(calls)))
+    while not work.done():
+        state = limiter_state()
+        timeline.append((round(time.monotonic() - started, 1), state["limit_exact"], state["in_flight"],
+                         state["backoff_seconds"], state["rate_limited"]))
+        await asyncio.sleep(sample_every)
+    await work
+    return timeline, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--capacity", type=int, default=12, help="fake server 429s above this concurrency")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--retry-after", type=float, default=0.5)
+    parser.add_argument("--overload-rate", type=float, default=0.0)
+    parser.add_argument("--sample", type=float, default=0.5, help="seconds between limiter samples")
+    args = parser.parse_args()
+
+    server_state = FakeLLM(args.latency, args.capacity, args.retry_after, overload_rate=args.overload_rate)
+    server = server_state.serve()
+    os.environ["ANTHROPIC_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("ANTHROPIC_API_KEY", "fake")
+
+    started = time.monotonic()
+    timeline, failures = asyncio.run(probe(args.calls, args.sample))
+    elapsed = time.monotonic() - started
+    server.shutdown()
+
+    from core.llm import limiter_state
+    print(f"{'t':>6}  {'limit':>7}  {'in_flight':>9}  {'backoff':>7}  {'429s':>5}")
+    for t, limit, in_flight, backoff, limited in timeline:
+        print(f"{t:>6}  {limit:>7.2f}  {in_flight:>9}  {backoff:>7.2f}  {limited:>5}")
+    print()
+    print(f"{args.calls} calls in {elapsed:.1f}s — {args.calls / elapsed:.1f} calls/s, {failures} failed")
+    print(f"server: peak in-flight {server_state.peak}, {server_state.counts}")
+    print(f"limiter: {limiter_state()}")
+
+
+if __name__ == "__main__":
+    main()
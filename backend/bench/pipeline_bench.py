@@ -0,0 +1,344 @@
+"""
+End-to-end pipeline benchmark — no network needed.
+
+Runs run_pipeline() against synthetic repos (or examples/todo-app) and the
+fake LLM server, then reports jobs/s, job latency percentiles, peak RSS and
+event-loop lag per scenario. The fake LLM runs in a separate process so its
+threads do not skew the loop-lag numbers; RSS is the pipeline process only
+(validator workers excluded).
+
+Usage (from backend/):
+    python -m bench.pipeline_bench                                    # todo-app, 10 and 100 files
+    python -m bench.pipeline_bench --repos 10,1000,5000 --jobs 2 --concurrency 1
+    python -m bench.pipeline_bench --latency 0.5 --latency-sigma 0.6 --error-rate 0.05
+    python -m bench.pipeline_bench --hedge --repos 10 --jobs 100 --concurrency 8 --latency-sigma 1.0   # with vs without hedging
+    python -m bench.pipeline_bench --out bench.json                   # save results
+    python -m bench.pipeline_bench --baseline bench.json --tolerance 0.25   # exit 1 on regression
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import functools
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_llm import FakeLLM, canned_reply
+
+TODO_APP = os.path.join(os.path.dirname(__file__), "..", "..", "examples", "todo-app")
+P99_MIN_JOBS = 100   # below this, nearest-rank p99 is just the slowest job
+
+
+# ── Fake LLM (child process) ──────────────────────────────────
+def unique_reply(prompt: str, nodes: int) -> str:
+    """Canned reply made unique per request, so validation results are not all cache hits."""
+    text = canned_reply(prompt, nodes)
+    if "node " in text:
+        text = f"# reply {uuid.uuid4().hex}\n{text}"
+    return text
+
+
+def _serve_fake_llm(conn, options: dict):
+    nodes = options.pop("reply_nodes")
+    state = FakeLLM(reply=functools.partial(unique_reply, nodes=nodes), **options)
+    conn.send(state.serve().server_port)
+    while True:
+        conn.recv()      # "reset" before each scenario
+        state.reset()
+        conn.send(True)
+
+
+class FakeLLMProcess:
+    """The fake LLM in a child process, so its threads do not skew the loop-lag numbers."""
+
+    def __init__(self, **options):
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_serve_fake_llm, args=(child, options), daemon=True)
+        self.proc.start()
+        self.port = self._conn.recv()
+
+    def reset(self):
+        """Start the next scenario from the same (seeded) latency schedule."""
+        self._conn.send("reset")
+        self._conn.recv()
+
+
+# ── Fake repos ────────────────────────────────────────────────
+def synthetic_repo(n_files: int, lines: int, seed: int = 0) -> list[dict]:
+    """A Flask-style app of models, services, routes and utils that import each other."""
+    rng   = random.Random(seed)
+    kinds = ("models", "services", "routes", "utils")
+    files = []
+    for i in range(n_files):
+        kind = kinds[i % len(kinds)]
+        pkg  = f"app{i // 100}"
+        body = []
+        if kind == "models":
+            body += [f"from dataclasses import dataclass", "", "@dataclass", f"class Record{i}:",
+                     "    id: int", "    name: str", "    done: bool = False", ""]
+        elif kind == "services":
+            model = max(i - 1, 0)
+            body += [f"from {pkg}.models_{model} import Record{model}", "", f"class Service{i}:",
+                     "    def __init__(self):", "        self.items = {}", "",
+                     f"    def add(self, item: Record{model}):", "        self.items[item.id] = item",
+                     "        return item", ""]
+        elif kind == "routes":
+            service = max(i - 1, 0)
+            body += ["from flask import Flask, jsonify", f"from {pkg}.services_{service} import Service{service}", "",
+                     "app = Flask(__name__)", f"svc = Service{service}()", "",
+                     f"@app.route('/items{i}')", f"def list_items{i}():", "    return jsonify(list(svc.items))", ""]
+        else:
+            body += ["import re", "", f"def slug{i}(text: str) -> str:",
+                     "    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')", ""]
+        while len(body) < lines:
+            k = len(body)
+            body += [f"def helper_{i}_{k}(value):", f"    return value * {rng.randint(2, 9)} + {k}", ""]
+        files.append({"path": f"{pkg}/{kind}_{i}.py", "content": "\n".join(body) + "\n"})
+    return files
+
+
+class BenchRepos:
+    """File source for run_pipeline: bench://todo-app and bench://synthetic/<n>."""
+
+    def __init__(self, lines: int):
+        self.lines = lines
+        self._repos: dict[str, list[dict]] = {}
+
+    def url(self, spec: str) -> str:
+        return "bench://todo-app" if spec == "todo" else f"bench://synthetic/{int(spec)}"
+
+    def __call__(self, url: str):
+        if url not in self._repos:
+            name = url.removeprefix("bench://")
+            if name == "todo-app":
+                from utils.repo_sources import LocalDirSource
+                self._repos[url] = list(LocalDirSource(TODO_APP).iter_files(limit=10**6))
+            else:
+                self._repos[url] = synthetic_repo(int(name.split("/")[1]), self.lines)
+        for f in self._repos[url]:
+            yield dict(f)   # the pipeline annotates file dicts in place
+
+
+# ── Measurement ───────────────────────────────────────────────
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)   # nearest rank
+    return ordered[min(len(ordered), max(math.ceil(pct / 100 * len(ordered)), 1)) - 1]
+
+
+def _reset_peak_rss():
+    """Restart the kernel's RSS high-water mark, so each scenario reports its own peak (Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass   # the peak then covers the whole process lifetime
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024   # kB
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # lifetime peak, KiB on Linux
+
+
+async def _watch_loop(lags: list[float], interval: float = 0.01):
+    """Event-loop lag: how late a short sleep wakes up."""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(interval)
+        lags.append(max(time.monotonic() - started - interval, 0.0))
+
+
+async def run_scenario(url: str, jobs: int, concurrency: int) -> dict:
+    from core.job_store import create_job, get_status
+    from core.pipeline import run_pipeline
+
+    gate      = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    failed    = 0
+    lags      = []
+    _reset_peak_rss()
+
+    async def one():
+        nonlocal failed
+        async with gate:
+            job_id = str(uuid.uuid4())
+            create_job(job_id)
+            started = time.monotonic()
+            await run_pipeline(job_id, url, "bench", use_cache=False)
+            latencies.append(time.monotonic() - started)
+            if get_status(job_id) != "complete":
+                failed += 1
+
+    watcher = asyncio.create_task(_watch_loop(lags))
+    started = time.monotonic()
+    await asyncio.gather(*(one() for _ in range(jobs)))
+    elapsed = time.monotonic() - started
+    watcher.cancel()
+
+    return {
+        "jobs":          jobs,
+        "failed":        failed,
+        "seconds":       round(elapsed, 3),
+        "jobs_per_sec":  round(jobs / elapsed, 3),
+        "latency_p50":   round(percentile(latencies, 50), 3),
+        "latency_p95":   round(percentile(latencies, 95), 3),
+        "latency_p99":   round(percentile(latencies, 99), 3),
+        "peak_rss_mb":   round(_peak_rss_mb(), 1),
+        "loop_lag_p50_ms": round(percentile(lags, 50) * 1000, 2),
+        "loop_lag_p99_ms": round(percentile(lags, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags, default=0.0) * 1000, 2),
+    }
+
+
+async def run_all(repos: BenchRepos, specs: list[str], jobs: int, concurrency: int, warmup: int,
+                  hedge: bool = False, fake_llm: FakeLLMProcess | None = None) -> dict:
+    from core.llm import hedge_stats, set_hedging
+    from utils import syntax_validator
+    syntax_validator.warm_up()   # as at API startup — parser imports are not charged to the first job
+    results = {}
+    try:
+        if warmup:
+            # First-call costs (lazy imports, client setup, connection pool) are not steady state
+            print(f"▶ warm-up: {warmup} jobs (not reported)", flush=True)
+            await run_scenario(repos.url(specs[0]), warmup, concurrency)
+        for spec in specs:
+            name = "todo-app" if spec == "todo" else f"synthetic-{spec}"
+            # --hedge: the same scenario without, then with hedging — the p99 difference is what it saved
+            for hedged in ((False, True) if hedge else (None,)):
+                label = f"{name}+hedge" if hedged else name
+                if hedged is not None:
+                    set_hedging(hedged)
+                hedge_stats(reset=True)
+                if fake_llm:
+                    fake_llm.reset()   # both arms of --hedge see the same latencies
+                print(f"▶ {label}: {jobs} jobs, {concurrency} at a time", flush=True)
+                result = await run_scenario(repos.url(spec), jobs, concurrency)
+                stats  = hedge_stats()
+                result["hedged_pct"] = round(stats["hedge_rate"] * 100, 2)
+                result["hedge_wins"] = stats["won"]
+                if hedged and jobs >= P99_MIN_JOBS:
+                    result["p99_saved"] = round(results[name]["latency_p99"] - result["latency_p99"], 3)
+                results[label] = result
+    finally:
+        syntax_validator.shutdown()
+    return results
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for name, now in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if now["jobs_per_sec"] < before["jobs_per_sec"] * (1 - tolerance):
+            found.append(f"{name}: jobs/s {now['jobs_per_sec']} < baseline {before['jobs_per_sec']}")
+        if now["latency_p95"] > before["latency_p95"] * (1 + tolerance):
+            found.append(f"{name}: p95 {now['latency_p95']}s > baseline {before['latency_p95']}s")
+        if now["failed"] > before["failed"]:
+            found.append(f"{name}: {now['failed']} failed jobs (baseline {before['failed']})")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repos", default="todo,10,100", help="comma-separated: 'todo' and/or synthetic file counts")
+    parser.add_argument("--jobs", type=int, default=4, help="jobs per scenario")
+    parser.add_argument("--concurrency", type=int, default=2, help="jobs running at once")
+    parser.add_argument("--warmup", type=int, default=1, help="unreported jobs run first on the first repo")
+    parser.add_argument("--file-lines", type=int, default=40, help="lines per synthetic file")
+    parser.add_argument("--latency", type=float, default=0.05, help="median fake LLM latency (s)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal spread (0 = fixed)")
+    parser.add_argument("--capacity", type=int, default=0, help="fake LLM 429s above this concurrency (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=1, help="fake LLM latency/failure seed, replayed for every scenario")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of random 429s")
+    parser.add_argument("--overload-rate", type=float, default=0.0, help="fraction of random 529s")
+    parser.add_argument("--reply-nodes", type=int, default=1, help="node blocks per conversion reply (output size)")
+    parser.add_argument("--no-validate", action="store_true", help="skip the jaclang parse of each output")
+    parser.add_argument("--hedge", action="store_true", help="run each scenario without and with LLM request hedging")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from an earlier --out; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown vs the baseline")
+    parser.add_argument("--fail-on-error", action="store_true", help="exit 1 if any job did not complete")
+    args = parser.parse_args()
+
+    fake_llm = FakeLLMProcess(
+        latency=args.latency, latency_sigma=args.latency_sigma, capacity=args.capacity, seed=args.seed,
+        retry_after=0.5, error_rate=args.error_rate, overload_rate=args.overload_rate, reply_nodes=args.reply_nodes,
+    )
+    scratch = tempfile.mkdtemp(prefix="repo2jac-bench-")
+    specs   = list(dict.fromkeys(s.strip() for s in args.repos.split(",") if s.strip()))
+    # Configure before core modules are imported — they read the environment once
+    os.environ.update({
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{fake_llm.port}",
+        "ANTHROPIC_API_KEY":  os.environ.get("ANTHROPIC_API_KEY") or "bench",
+        "LLM_CACHE_ENABLED":  "0",
+        "JOB_STORE":          "memory",
+        "RESULT_STORE_DIR":   os.path.join(scratch, "results"),
+        "MAX_FILES":          str(max([int(s) for s in specs if s.isdigit()] + [50])),
+    })
+    if args.no_validate:
+        os.environ["VALIDATE_JAC"] = "0"
+    if args.hedge:
+        os.environ.setdefault("LLM_HEDGE_MIN_SECONDS", "0")   # fake latencies are far below the production floor
+
+    import logging
+    logging.disable(logging.WARNING)   # per-file pipeline logs would dominate the run
+
+    from core.pipeline import set_file_source
+    repos = BenchRepos(args.file_lines)
+    set_file_source(repos)
+    try:
+        results = asyncio.run(run_all(repos, specs, args.jobs, args.concurrency, args.warmup, args.hedge, fake_llm))
+    finally:
+        fake_llm.proc.kill()
+
+    cols = ("jobs_per_sec", "latency_p50", "latency_p95", "latency_p99", "peak_rss_mb", "loop_lag_p99_ms", "failed")
+    if args.hedge:
+        cols += ("hedged_pct", "hedge_wins")
+    print()
+    print(f"{'scenario':<24}" + "".join(f"{c:>17}" for c in cols))
+    for name, r in results.items():
+        print(f"{name:<24}" + "".join(f"{r[c]:>17}" for c in cols))
+    for name, r in results.items():
+        if not name.endswith("+hedge"):
+            continue
+        saved = f"not reported, needs --jobs >= {P99_MIN_JOBS}"
+        if "p99_saved" in r:
+            base  = results[name.removesuffix("+hedge")]["latency_p99"]
+            saved = f"{r['p99_saved']}s" + (f" ({r['p99_saved'] / base:.0%})" if base else "")
+        print(f"{name}: hedged {r['hedged_pct']}% of LLM calls, p99 job latency saved {saved}")
+
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+    found = []
+    if args.baseline:
+        with open(args.baseline) as fh:
+            found = regressions(results, json.load(fh), args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+    failed = {name: r["failed"] for name, r in results.items() if r["failed"]}
+    if args.fail_on_error and failed:
+        print(f"FAILED JOBS {failed}")
+    if found or (args.fail_on_error and failed):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Convert many repos without the web stack.
+
+Reads conversion targets (one per line, '#' comments) and runs
+the conversion pipeline for several of them at once. Each finished repo gets
+a ZIP in --out and a line in the JSONL summary. --workers splits the list
+across processes; --llm-budget caps concurrent LLM calls across all of them.
+
+Targets are anything utils.repo_sources accepts: GitHub URLs, local
+directories, bare git repos, `git+<path or url>[#ref]`.
+
+Usage (from backend/):
+    python cli.py repos.txt --out converted/
+    python cli.py repos.txt --out converted/ --concurrency 8 --workers 4 --llm-budget 40
+    python cli.py repos.txt --out converted/ --batch --incremental
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import queue
+import asyncio
+import argparse
+import multiprocessing
+
+# Add backend/ to Python path so all imports resolve correctly
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_COMMENT_RE = re.compile(r"(?:^|\s)#")   # "#" inside git+<url>#ref is not a comment
+
+
+def read_targets(path: str) -> list[str]:
+    with (sys.stdin if path == "-" else open(path)) as fh:
+        lines = [_COMMENT_RE.split(line, 1)[0].strip() for line in fh]
+    return [line for line in lines if line]
+
+
+def _slug(target: str) -> str:
+    if os.path.isdir(target):
+        return os.path.basename(os.path.abspath(target)) or "repo"
+    name = target.removeprefix("git+").rstrip("/").removesuffix(".git").split("github.com/")[-1]
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", name).strip("-") or "repo"
+
+
+# ── One shard: convert its targets, `concurrency` at a time ───
+async def _final_event(job_id: str) -> dict | None:
+    from core.job_store import subscribe_events
+    last = None
+    async for event in subscribe_events(job_id, timeout=0.01):
+        if event is None:
+            break
+        last = event
+    return last
+
+
+async def convert_one(target: str, zip_path: str, opts: dict) -> dict:
+    from core.job_store import create_job, discard_job, get_artifact, get_preview_data
+    from core.pipeline import FALLBACK_CONFIDENCE, run_pipeline
+
+    job_id  = str(uuid.uuid4())
+    started = time.monotonic()
+    create_job(job_id)
+    await run_pipeline(
+        job_id, target, opts["model"], not opts["no_cache"], opts["incremental"], None, opts["priority"], opts["batch"],
+    )
+    event  = await _final_event(job_id) or {"type": "error", "data": {"message": "no result"}}
+    record = {"target": target, "status": event["type"], "seconds": round(time.monotonic() - started, 2)}
+    if event["type"] == "complete":
+        files = (get_preview_data(job_id) or {}).get("files", [])
+        get_artifact(job_id).write_to(zip_path)
+        record.update({
+            "zip":            zip_path,
+            "files":          event["data"]["total_files"],
+            "reused_files":   event["data"]["reused_files"],
+            "avg_confidence": event["data"]["avg_confidence"],
+            "validated":      sum(1 for f in files if f["validated"]),
+            "fallbacks":      sum(1 for f in files if f["confidence"] <= FALLBACK_CONFIDENCE),
+            "tokens":         event["data"]["llm_tokens"],
+        })
+    else:
+        record["error"] = event["data"].get("message", "")
+    discard_job(job_id)   # a backfill can run far more jobs than fit in memory until JOB_TTL
+    return record
+
+
+async def run_shard(targets: list[tuple[int, str]], opts: dict, report) -> None:
+    from utils import syntax_validator
+    syntax_validator.warm_up()
+    gate = asyncio.Semaphore(opts["concurrency"])
+
+    async def one(index: int, target: str):
+        async with gate:
+            zip_path = os.path.join(opts["out"], f"{index:04d}-{_slug(target)}.zip")
+            try:
+                record = await convert_one(target, zip_path, opts)
+            except Exception as e:
+                record = {"target": target, "status": "error", "error": str(e)}
+            report({"index": index, **record})
+
+    try:
+        await asyncio.gather(*(one(i, t) for i, t in targets))
+    finally:
+        syntax_validator.shutdown()
+
+
+def _configure(opts: dict, workers: int):
+    """Set the environment before core modules are imported — they read it once."""
+    os.environ["JOB_STORE"] = "memory"
+    os.environ["JAC_MODEL"] = opts["model"]   # core.llm sends every request with this model
+    if opts["max_files"]:
+        os.environ["MAX_FILES"] = str(opts["max_files"])
+    if opts["llm_budget"]:
+        share = opts["llm_budget"] // workers   # each process gets its slice of the global cap (workers ≤ budget)
+        os.environ["LLM_LIMIT_MAX"] = str(share)
+        os.environ["MAX_PARALLEL"]  = str(min(int(os.getenv("MAX_PARALLEL", 5)), share))
+
+    import logging
+    import core.pipeline   # noqa: F401 — configures logging on import
+    logging.getLogger().setLevel(opts["log_level"])
+
+
+def _shard_main(targets: list, opts: dict, workers: int, results):
+    _configure(opts, workers)
+    try:
+        asyncio.run(run_shard(targets, opts, results.put))
+    finally:
+        results.put(None)   # this shard is done
+
+
+# ── Driver ────────────────────────────────────────────────────
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="file with one target per line — GitHub URL, directory or git+<url> ('-' for stdin)")
+    parser.add_argument("--out", default="converted", help="directory for the ZIPs")
+    parser.add_argument("--summary", help="JSONL summary path (default: <out>/summary.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="repos converted at once per worker")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes; targets are split round-robin")
+    parser.add_argument("--llm-budget", type=int, default=0, help="max concurrent LLM calls across all workers (0 = LLM_LIMIT_MAX per worker)")
+    parser.add_argument("--max-files", type=int, default=0, help="files per repo (default: MAX_FILES)")
+    parser.add_argument("--model", default=os.getenv("JAC_MODEL", "claude-3-haiku-20240307"), help="LLM model for every request (default: JAC_MODEL)")
+    parser.add_argument("--priority", choices=("low", "normal", "high"), default="normal")
+    parser.add_argument("--batch", action="store_true", help="submit classify/convert prompts as LLM batches")
+    parser.add_argument("--incremental", action="store_true", help="reuse the last stored result per repo")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the local LLM response cache")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    targets = list(enumerate(read_targets(args.input)))
+    if not targets:
+        sys.exit("No targets in input")
+    os.makedirs(args.out, exist_ok=True)
+    summary_path = args.summary or os.path.join(args.out, "summary.jsonl")
+    workers      = max(min(args.workers, len(targets)), 1)
+    if args.llm_budget and workers > args.llm_budget:
+        # Every worker needs at least one LLM slot; more workers would overshoot the budget
+        print(f"--workers capped at {args.llm_budget} to stay within --llm-budget", file=sys.stderr)
+        workers = args.llm_budget
+    opts = {
+        "out": args.out, "concurrency": args.concurrency, "llm_budget": args.llm_budget, "max_files": args.max_files,
+        "model": args.model, "priority": args.priority, "batch": args.batch, "incremental": args.incremental,
+        "no_cache": args.no_cache, "log_level": args.log_level.upper(),
+    }
+
+    # spawn: each shard gets a fresh interpreter, event loop and LLM client
+    ctx     = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    shards  = [ctx.Process(target=_shard_main, args=(targets[i::workers], opts, workers, results)) for i in range(workers)]
+    for proc in shards:
+        proc.start()
+
+    started, done, failed, running = time.monotonic(), 0, 0, workers
+    with open(summary_path, "a") as summary:
+        while running:
+            try:
+                record = results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(p.is_alive() for p in shards):
+                    break   # a shard died without reporting
+                continue
+            if record is None:
+                running -= 1
+                continue
+            done   += 1
+            failed += record["status"] != "complete"
+            summary.write(json.dumps(record) + "\n")
+            summary.flush()
+            detail = f"{record.get('files', 0)} files, conf {record.get('avg_confidence', 0)}" if record["status"] == "complete" else record.get("error", "")
+            print(f"[{done}/{len(targets)}] {record['status']:<8} {record['target']}  {record.get('seconds', 0)}s  {detail}", flush=True)
+
+    for proc in shards:
+        proc.join()
+    print(f"\n{done - failed}/{len(targets)} converted, {failed} failed in {time.monotonic() - started:.1f}s — summary: {summary_path}")
+    if failed or done < len(targets):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
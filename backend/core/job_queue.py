@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional
+
+from core.job_store import JOB_STORE, JOB_STORE_DB
+
+# ── Config ────────────────────────────────────────────────────
+PIPELINE_EXECUTOR = os.getenv("PIPELINE_EXECUTOR", "inline")      # inline (in the API process) | workers
+PIPELINE_WORKERS  = int(os.getenv("PIPELINE_WORKERS", 2))          # worker processes the API starts (0 = external only)
+QUEUE_LEASE       = float(os.getenv("QUEUE_LEASE_SECONDS", 60))    # claimed job with no heartbeat this long → worker lost
+QUEUE_MAX_CLAIMS  = int(os.getenv("QUEUE_MAX_CLAIMS", 3))          # claims per job before losing its worker fails it
+
+PRIORITY_ORDER = {"low": 0, "normal": 1, "high": 2}
+
+
+class SqliteJobQueue:
+    """
+    Pending conversions in the job store's SQLite file. Workers claim the
+    oldest job of the highest priority in one write transaction, so a job
+    is never handed to two workers; a claimed job's heartbeat shows its
+    worker is still alive. A job whose worker is lost goes back to the
+    queue until it has been claimed QUEUE_MAX_CLAIMS times.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid   = None
+        self._lock  = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per process — never share a handle across fork()
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS queue (
+                       job_id      TEXT PRIMARY KEY,
+                       payload     TEXT NOT NULL,
+                       priority    INTEGER NOT NULL,
+                       enqueued_at REAL NOT NULL,
+                       worker      TEXT,
+                       heartbeat   REAL,
+                       claims      INTEGER NOT NULL DEFAULT 0
+                   )"""
+            )
+            try:
+                conn.execute("ALTER TABLE queue ADD COLUMN claims INTEGER NOT NULL DEFAULT 0")   # queues created before re-queueing
+            except sqlite3.OperationalError:
+                pass
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def enqueue(self, job_id: str, payload: dict):
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO queue (job_id, payload, priority, enqueued_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(payload), PRIORITY_ORDER.get(payload.get("priority"), 1), time.time()),
+            )
+
+    def claim(self, worker: str) -> Optional[tuple[str, dict]]:
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT job_id, payload FROM queue WHERE worker IS NULL ORDER BY priority DESC, enqueued_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE queue SET worker = ?, heartbeat = ?, claims = claims + 1 WHERE job_id = ?",
+                        (worker, time.time(), row[0]),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def heartbeat(self, job_ids: list[str]):
+        if job_ids:
+            with self._lock:
+                self._db().execute(
+                    f"UPDATE queue SET heartbeat = ? WHERE job_id IN ({','.join('?' * len(job_ids))})",
+                    (time.time(), *job_ids),
+                )
+
+    def finish(self, job_id: str):
+        with self._lock:
+            self._db().execute("DELETE FROM queue WHERE job_id = ?", (job_id,))
+
+    def release(self, job_id: str) -> bool:
+        """
+        Give up a claimed job: back to the queue if it has claims left (True),
+        otherwise dropped (False).
+        """
+        return job_id in self._release("job_id = ?", (job_id,))[0]
+
+    def reap_stale(self) -> tuple[list[str], list[str]]:
+        """
+        Release claimed jobs whose worker stopped sending heartbeats.
+        Returns (re-queued ids, dropped ids).
+        """
+        return self._release("heartbeat < ?", (time.time() - QUEUE_LEASE,))
+
+    def _release(self, where: str, params: tuple) -> tuple[list[str], list[str]]:
+        with self._lock:
+            conn = self._db()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(f"SELECT job_id, claims FROM queue WHERE worker IS NOT NULL AND {where}", params).fetchall()
+                requeued = [job_id for job_id, claims in rows if claims < QUEUE_MAX_CLAIMS]
+                dropped  = [job_id for job_id, claims in rows if claims >= QUEUE_MAX_CLAIMS]
+                # Keep enqueued_at: a re-queued job goes ahead of newer ones of its priority
+                conn.executemany("UPDATE queue SET worker = NULL, heartbeat = NULL WHERE job_id = ?", [(j,) for j in requeued])
+                conn.executemany("DELETE FROM queue WHERE job_id = ?", [(j,) for j in dropped])
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return requeued, dropped
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, running = self._db().execute(
+                "SELECT COUNT(*) - COUNT(worker), COUNT(worker) FROM queue"
+            ).fetchone()
+        return {"pending": pending, "running": running}
+
+
+if PIPELINE_EXECUTOR not in ("inline", "workers"):
+    raise ValueError(f"Unknown PIPELINE_EXECUTOR: {PIPELINE_EXECUTOR!r} (expected 'inline' or 'workers')")
+if PIPELINE_EXECUTOR == "workers" and JOB_STORE != "sqlite":
+    raise ValueError("PIPELINE_EXECUTOR=workers needs JOB_STORE=sqlite — workers and the API share jobs through it")
+
+_queue = SqliteJobQueue(JOB_STORE_DB)
+
+
+def get_queue() -> SqliteJobQueue:
+    return _queue
+
+
+def use_workers() -> bool:
+    """True when /convert should enqueue instead of running the pipeline in-process."""
+    return PIPELINE_EXECUTOR == "workers"
+
+
+def enqueue_job(job_id: str, payload: dict):
+    _queue.enqueue(job_id, payload)
+
+
+def queue_stats() -> dict:
+    return _queue.stats() if use_workers() else {"pending": 0, "running": 0}
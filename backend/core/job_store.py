@@ -1,63 +1,478 @@
 import os
-import asyncio
+import json
 import time
-from typing import Optional
+import asyncio
+import sqlite3
+import threading
+from collections import deque
+from itertools import islice
+from typing import AsyncIterator, Optional
 
-# In-memory store: job_id → { queue, preview, zip_path }
-_jobs: dict = {}
-_timestamps: dict[str, float] = {}
+from utils.zip_builder import ZipFileArtifact
 
-JOB_TTL = int(os.getenv("JOB_TTL_SECONDS", 3600))  # evict after 1 hour
+JOB_TTL       = int(os.getenv("JOB_TTL_SECONDS", 3600))  # evict after 1 hour
+JOB_STORE     = os.getenv("JOB_STORE", "memory")          # memory | sqlite
+JOB_STORE_DB  = os.getenv("JOB_STORE_PATH", "/tmp/repo2jac-jobs.sqlite3")
+ARTIFACT_DIR  = os.getenv("ARTIFACT_DIR", "/tmp/repo2jac-artifacts")
+POLL_INTERVAL = float(os.getenv("JOB_STORE_POLL_SECONDS", 0.2))  # sqlite event polling
+EVENT_LOG_MAX = int(os.getenv("EVENT_LOG_MAX", 1000))            # events retained per job (memory store)
 
+TERMINAL_EVENTS = ("complete", "error")
 
-def create_job(job_id: str):
-    _evict_old_jobs()
-    _jobs[job_id] = {
-        "queue":    asyncio.Queue(),
-        "preview":  None,
-        "zip_path": None,
-    }
-    _timestamps[job_id] = time.time()
-
-
-def _evict_old_jobs():
-    cutoff = time.time() - JOB_TTL
-    stale = [jid for jid, ts in list(_timestamps.items()) if ts < cutoff]
-    for jid in stale:
-        job = _jobs.pop(jid, {})
-        _timestamps.pop(jid, None)
-        # Delete the ZIP file from disk
-        zip_path = job.get("zip_path")
-        if zip_path and os.path.exists(zip_path):
+
+def _partial_deltas(partials: dict, sent: dict) -> list[dict]:
+    """
+    Live `partial` events that bring one subscriber up to date with
+    `partials` (file → (attempt, text so far)): the text each file gained
+    since this subscriber last looked, or all of it after a (re)connect or
+    a new attempt. `sent` (file → (attempt, length)) is that subscriber's
+    state and is updated in place. The events carry no id, so they are
+    never replayed.
+    """
+    for file in [file for file in sent if file not in partials]:
+        del sent[file]
+    events = []
+    for file, (attempt, text) in partials.items():
+        seen_attempt, offset = sent.get(file, (None, 0))
+        if seen_attempt != attempt or offset > len(text):
+            offset = 0
+        if len(text) > offset or seen_attempt != attempt:
+            events.append({"id": None, "type": "partial",
+                           "data": {"file": file, "attempt": attempt, "offset": offset, "text": text[offset:]}})
+            sent[file] = (attempt, len(text))
+    return events
+
+
+def _unlink_quietly(path: Optional[str]):
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except Exception:
+            pass
+
+
+# ── In-memory store (single process) ──────────────────────────
+class MemoryJobStore:
+    """
+    job_id → { events, next_id, wakeup, partials, status, preview, zip_path, artifact, result, trace }
+
+    Events are an append-only ring buffer with monotonically increasing ids.
+    Subscribers read from the log instead of draining a queue, so any number
+    of tabs see every event and reconnects replay from their last id.
+    Streamed output is kept apart from the log — only the latest text of
+    each converting file — and sent to subscribers live.
+    """
+
+    def __init__(self):
+        self._jobs: dict = {}
+        self._timestamps: dict[str, float] = {}
+
+    def create_job(self, job_id: str):
+        self._evict_old_jobs()
+        self._jobs[job_id] = {
+            "events":   deque(maxlen=EVENT_LOG_MAX),
+            "next_id":  1,
+            "wakeup":   asyncio.Event(),
+            "partials": {},
+            "status":   "running",
+            "preview":  None,
+            "zip_path": None,
+            "artifact": None,
+            "result":   None,
+            "trace":    None,
+        }
+        self._timestamps[job_id] = time.time()
+
+    def _evict_old_jobs(self):
+        cutoff = time.time() - JOB_TTL
+        stale = [jid for jid, ts in list(self._timestamps.items()) if ts < cutoff]
+        for jid in stale:
+            job = self._jobs.pop(jid, {})
+            self._timestamps.pop(jid, None)
+            # Delete the ZIP file from disk
+            _unlink_quietly(job.get("zip_path"))
+
+    def job_exists(self, job_id: str) -> bool:
+        return job_id in self._jobs
+
+    def discard_job(self, job_id: str):
+        job = self._jobs.pop(job_id, {})
+        self._timestamps.pop(job_id, None)
+        _unlink_quietly(job.get("zip_path"))
+
+    def job_count(self) -> int:
+        return len(self._jobs)
+
+    def running_count(self) -> int:
+        return sum(1 for job in self._jobs.values() if job["status"] == "running")
+
+    def push_event(self, job_id: str, event_type: str, data: dict):
+        job = self._jobs.get(job_id)
+        if job:
+            if event_type in TERMINAL_EVENTS:
+                job["status"] = event_type
+                job["partials"].clear()
+            job["events"].append({"id": job["next_id"], "type": event_type, "data": data})
+            job["next_id"] += 1
+            self._wake(job)
+
+    def set_partial(self, job_id: str, file: str, attempt: int, text: Optional[str]):
+        job = self._jobs.get(job_id)
+        if job:
+            if text is None:
+                job["partials"].pop(file, None)
+            else:
+                job["partials"][file] = (attempt, text)
+            self._wake(job)
+
+    @staticmethod
+    def _wake(job: dict):
+        # Wake every subscriber, then arm a fresh event for the next push
+        job["wakeup"].set()
+        job["wakeup"] = asyncio.Event()
+
+    async def subscribe(self, job_id: str, timeout: float, last_event_id: int = 0) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield events with id > last_event_id, then new ones as they arrive.
+        Yields None after `timeout` idle seconds. If the requested id has
+        already rotated out of the log, replay starts at the oldest kept event.
+        Streamed output of files still converting follows as live `partial` events.
+        """
+        cursor, sent = last_event_id, {}
+        while True:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return   # evicted
+            events = job["events"]
+            if events and events[-1]["id"] > cursor:
+                skip = max(cursor - events[0]["id"] + 1, 0)
+                for event in list(islice(events, skip, None)):
+                    cursor = event["id"]
+                    yield event
+                continue
+            partials = _partial_deltas(job["partials"], sent)
+            if partials:
+                for event in partials:
+                    yield event
+                continue
+            wakeup = job["wakeup"]
             try:
-                os.unlink(zip_path)
-            except Exception:
+                await asyncio.wait_for(wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                yield None
+
+    def _set(self, job_id: str, key: str, value):
+        if job_id in self._jobs:
+            self._jobs[job_id][key] = value
+
+    def _get(self, job_id: str, key: str):
+        return self._jobs.get(job_id, {}).get(key)
+
+    def get_status(self, job_id: str) -> Optional[str]:
+        return self._get(job_id, "status")
+
+    def set_preview(self, job_id: str, data: dict):
+        self._set(job_id, "preview", data)
+
+    def get_preview_data(self, job_id: str) -> Optional[dict]:
+        return self._get(job_id, "preview")
+
+    def set_output_path(self, job_id: str, path: str):
+        self._set(job_id, "zip_path", path)
+
+    def get_output_path(self, job_id: str) -> Optional[str]:
+        return self._get(job_id, "zip_path")
+
+    def set_artifact(self, job_id: str, artifact):
+        self._set(job_id, "artifact", artifact)
+
+    def get_artifact(self, job_id: str):
+        return self._get(job_id, "artifact")
+
+    def set_result(self, job_id: str, result: dict):
+        self._set(job_id, "result", result)
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        return self._get(job_id, "result")
+
+    def set_trace(self, job_id: str, trace: dict):
+        self._set(job_id, "trace", trace)
+
+    def get_trace(self, job_id: str) -> Optional[dict]:
+        return self._get(job_id, "trace")
+
+
+# ── SQLite store (WAL — shared by every worker process) ───────
+class SqliteJobStore:
+    """
+    Jobs, events, previews and artifact paths in one SQLite file, so any
+    uvicorn worker can serve /stream, /preview and /download for any job.
+    Artifacts are written to ARTIFACT_DIR and served from disk. Streamed
+    output lives in `partials`, one row per converting file, overwritten
+    in place instead of appended to the event log.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid   = None
+        self._lock  = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        # One connection per process — never share a handle across fork()
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                       job_id     TEXT PRIMARY KEY,
+                       created_at REAL NOT NULL,
+                       status     TEXT NOT NULL,
+                       preview    TEXT,
+                       result     TEXT,
+                       zip_path   TEXT
+                   );
+                   CREATE TABLE IF NOT EXISTS events (
+                       id         INTEGER PRIMARY KEY AUTOINCREMENT,
+                       job_id     TEXT NOT NULL,
+                       type       TEXT NOT NULL,
+                       data       TEXT NOT NULL
+                   );
+                   CREATE INDEX IF NOT EXISTS idx_events_job ON events(job_id, id);
+                   CREATE TABLE IF NOT EXISTS partials (
+                       job_id     TEXT NOT NULL,
+                       file       TEXT NOT NULL,
+                       attempt    INTEGER NOT NULL,
+                       text       TEXT NOT NULL,
+                       PRIMARY KEY (job_id, file)
+                   );"""
+            )
+            try:
+                conn.execute("ALTER TABLE jobs ADD COLUMN trace TEXT")   # databases created before traces
+            except sqlite3.OperationalError:
                 pass
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()):
+        with self._lock:
+            return self._db().execute(sql, params).fetchall()
+
+    def create_job(self, job_id: str):
+        self._evict_old_jobs()
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (job_id, created_at, status) VALUES (?, ?, 'running')",
+            (job_id, time.time()),
+        )
+
+    def _evict_old_jobs(self):
+        cutoff = time.time() - JOB_TTL
+        stale  = self._execute("SELECT job_id, zip_path FROM jobs WHERE created_at < ?", (cutoff,))
+        for jid, zip_path in stale:
+            _unlink_quietly(zip_path)
+            self._execute("DELETE FROM events WHERE job_id = ?", (jid,))
+            self._execute("DELETE FROM partials WHERE job_id = ?", (jid,))
+            self._execute("DELETE FROM jobs WHERE job_id = ?", (jid,))
+
+    def job_exists(self, job_id: str) -> bool:
+        return bool(self._execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)))
+
+    def discard_job(self, job_id: str):
+        _unlink_quietly(self.get_output_path(job_id))
+        self._execute("DELETE FROM events WHERE job_id = ?", (job_id,))
+        self._execute("DELETE FROM partials WHERE job_id = ?", (job_id,))
+        self._execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+
+    def job_count(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM jobs")[0][0]
+
+    def running_count(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'")[0][0]
+
+    def push_event(self, job_id: str, event_type: str, data: dict):
+        if event_type in TERMINAL_EVENTS:
+            self._execute("UPDATE jobs SET status = ? WHERE job_id = ?", (event_type, job_id))
+            self._execute("DELETE FROM partials WHERE job_id = ?", (job_id,))
+        self._execute(
+            "INSERT INTO events (job_id, type, data) VALUES (?, ?, ?)",
+            (job_id, event_type, json.dumps(data)),
+        )
+
+    def set_partial(self, job_id: str, file: str, attempt: int, text: Optional[str]):
+        if text is None:
+            self._execute("DELETE FROM partials WHERE job_id = ? AND file = ?", (job_id, file))
+        else:
+            self._execute(
+                "INSERT OR REPLACE INTO partials (job_id, file, attempt, text) VALUES (?, ?, ?, ?)",
+                (job_id, file, attempt, text),
+            )
 
+    async def subscribe(self, job_id: str, timeout: float, last_event_id: int = 0) -> AsyncIterator[Optional[dict]]:
+        # Row ids are global but strictly increasing, so they double as SSE event ids
+        last_id, idle, sent = last_event_id, 0.0, {}
+        while True:
+            rows = self._execute(
+                "SELECT id, type, data FROM events WHERE job_id = ? AND id > ? ORDER BY id",
+                (job_id, last_id),
+            )
+            if rows:
+                idle = 0.0
+                for row_id, event_type, data in rows:
+                    last_id = row_id
+                    yield {"id": row_id, "type": event_type, "data": json.loads(data)}
+                continue
+            rows = self._execute("SELECT file, attempt, text FROM partials WHERE job_id = ?", (job_id,))
+            for event in _partial_deltas({file: (attempt, text) for file, attempt, text in rows}, sent):
+                idle = 0.0
+                yield event
+            await asyncio.sleep(POLL_INTERVAL)
+            idle += POLL_INTERVAL
+            if idle >= timeout:
+                idle = 0.0
+                yield None
 
-def get_event_queue(job_id: str) -> Optional[asyncio.Queue]:
-    return _jobs.get(job_id, {}).get("queue")
+    def _get_column(self, job_id: str, column: str):
+        rows = self._execute(f"SELECT {column} FROM jobs WHERE job_id = ?", (job_id,))
+        return rows[0][0] if rows else None
+
+    def get_status(self, job_id: str) -> Optional[str]:
+        return self._get_column(job_id, "status")
+
+    def set_preview(self, job_id: str, data: dict):
+        self._execute("UPDATE jobs SET preview = ? WHERE job_id = ?", (json.dumps(data), job_id))
+
+    def get_preview_data(self, job_id: str) -> Optional[dict]:
+        raw = self._get_column(job_id, "preview")
+        return json.loads(raw) if raw else None
+
+    def set_output_path(self, job_id: str, path: str):
+        self._execute("UPDATE jobs SET zip_path = ? WHERE job_id = ?", (path, job_id))
+
+    def get_output_path(self, job_id: str) -> Optional[str]:
+        return self._get_column(job_id, "zip_path")
+
+    def set_artifact(self, job_id: str, artifact):
+        # In-memory archives cannot cross processes — persist to disk first
+        os.makedirs(ARTIFACT_DIR, exist_ok=True)
+        path = os.path.join(ARTIFACT_DIR, f"{job_id}.zip")
+        artifact.write_to(path)
+        self.set_output_path(job_id, path)
+
+    def get_artifact(self, job_id: str):
+        path = self.get_output_path(job_id)
+        return ZipFileArtifact(path) if path and os.path.exists(path) else None
+
+    def set_result(self, job_id: str, result: dict):
+        self._execute("UPDATE jobs SET result = ? WHERE job_id = ?", (json.dumps(result), job_id))
+
+    def get_result(self, job_id: str) -> Optional[dict]:
+        raw = self._get_column(job_id, "result")
+        return json.loads(raw) if raw else None
+
+    def set_trace(self, job_id: str, trace: dict):
+        self._execute("UPDATE jobs SET trace = ? WHERE job_id = ?", (json.dumps(trace), job_id))
+
+    def get_trace(self, job_id: str) -> Optional[dict]:
+        raw = self._get_column(job_id, "trace")
+        return json.loads(raw) if raw else None
+
+
+def _make_store():
+    if JOB_STORE == "sqlite":
+        return SqliteJobStore(JOB_STORE_DB)
+    if JOB_STORE != "memory":
+        raise ValueError(f"Unknown JOB_STORE: {JOB_STORE!r} (expected 'memory' or 'sqlite')")
+    return MemoryJobStore()
+
+
+_store = _make_store()
+
+
+def get_store():
+    return _store
+
+
+# ── Module-level API used by routes and the pipeline ──────────
+def create_job(job_id: str):
+    _store.create_job(job_id)
+
+
+def job_exists(job_id: str) -> bool:
+    return _store.job_exists(job_id)
+
+
+def discard_job(job_id: str):
+    """Drop a job and its artifact now instead of waiting for JOB_TTL."""
+    _store.discard_job(job_id)
+
+
+def job_count() -> int:
+    return _store.job_count()
+
+
+def running_count() -> int:
+    return _store.running_count()
 
 
 def push_event(job_id: str, event_type: str, data: dict):
-    q = get_event_queue(job_id)
-    if q:
-        q.put_nowait({"type": event_type, "data": data})
+    _store.push_event(job_id, event_type, data)
+
+
+def set_partial(job_id: str, file: str, attempt: int, text: Optional[str]):
+    """
+    Publish the streamed output so far of one converting file (None once it
+    is done). Only the latest text is kept; it is never added to the replayable
+    event log.
+    """
+    _store.set_partial(job_id, file, attempt, text)
+
+
+def subscribe_events(job_id: str, timeout: float = 60.0, last_event_id: int = 0) -> AsyncIterator[Optional[dict]]:
+    return _store.subscribe(job_id, timeout, last_event_id)
+
+
+def get_status(job_id: str) -> Optional[str]:
+    return _store.get_status(job_id)
 
 
 def set_preview(job_id: str, data: dict):
-    if job_id in _jobs:
-        _jobs[job_id]["preview"] = data
+    _store.set_preview(job_id, data)
 
 
 def get_preview_data(job_id: str) -> Optional[dict]:
-    return _jobs.get(job_id, {}).get("preview")
+    return _store.get_preview_data(job_id)
 
 
 def set_output_path(job_id: str, path: str):
-    if job_id in _jobs:
-        _jobs[job_id]["zip_path"] = path
+    _store.set_output_path(job_id, path)
 
 
 def get_output_path(job_id: str) -> Optional[str]:
-    return _jobs.get(job_id, {}).get("zip_path")
\ No newline at end of file
+    return _store.get_output_path(job_id)
+
+
+def set_artifact(job_id: str, artifact):
+    """Attach the finalized ZipAssembler for this job."""
+    _store.set_artifact(job_id, artifact)
+
+
+def get_artifact(job_id: str):
+    return _store.get_artifact(job_id)
+
+
+def set_result(job_id: str, result: dict):
+    _store.set_result(job_id, result)
+
+
+def get_result(job_id: str) -> Optional[dict]:
+    return _store.get_result(job_id)
+
+
+def set_trace(job_id: str, trace: dict):
+    _store.set_trace(job_id, trace)
+
+
+def get_trace(job_id: str) -> Optional[dict]:
+    return _store.get_trace(job_id)
@@ -0,0 +1,356 @@
+import os
+import time
+import asyncio
+import logging
+import anthropic
+import httpx
+from contextvars import ContextVar
+from typing import Callable
+
+from core.llm_cache import cache_key, get_cached, put_cached
+from core.llm_limiter import AdaptiveLimiter, PRIORITY_WEIGHTS, is_rate_limited
+from core.llm_hedge import HedgePolicy
+from core import metrics, trace
+
+log = logging.getLogger("llm")
+
+# ── Config ────────────────────────────────────────────────────
+API_KEY         = os.getenv("ANTHROPIC_API_KEY", "")
+MODEL           = os.getenv("JAC_MODEL", "claude-3-haiku-20240307")
+MAX_PARALLEL    = int(os.getenv("MAX_PARALLEL", 5))                 # initial concurrent LLM calls
+MAX_ATTEMPTS    = int(os.getenv("LLM_MAX_ATTEMPTS", 6))             # per call, across 429s and transient errors
+POOL_SIZE       = int(os.getenv("LLM_POOL_SIZE", 100))             # max open connections
+POOL_KEEPALIVE  = int(os.getenv("LLM_POOL_KEEPALIVE", 20))         # idle connections kept warm
+KEEPALIVE_TTL   = float(os.getenv("LLM_KEEPALIVE_SECONDS", 30))    # idle connection expiry
+CALL_TIMEOUT    = float(os.getenv("LLM_TIMEOUT_SECONDS", 120))     # per-call total timeout
+CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", 10))
+PROMPT_CACHING  = os.getenv("LLM_PROMPT_CACHING", "1") != "0"      # cache_control on shared prefixes
+# Shortest prefix the provider caches: 2048 tokens for Haiku models, 1024 for the others
+PROMPT_CACHE_MIN_TOKENS = int(os.getenv("LLM_PROMPT_CACHE_MIN_TOKENS", 2048 if "haiku" in MODEL else 1024))
+
+if not API_KEY:
+    log.error("❌ ANTHROPIC_API_KEY is not set!")
+
+# ── Shared async client ───────────────────────────────────────
+# One pooled httpx client per event loop — async connections cannot cross loops
+_client = None
+_client_loop = None
+def _get_client() -> anthropic.AsyncAnthropic:
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop:
+        http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=POOL_SIZE,
+                max_keepalive_connections=POOL_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_TTL,
+            ),
+            timeout=httpx.Timeout(CALL_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+        # Retries happen in llm() so the limiter sees every 429/529
+        _client = anthropic.AsyncAnthropic(api_key=API_KEY, http_client=http_client, max_retries=0)
+        _client_loop = loop
+    return _client
+
+# ── Adaptive concurrency limit (AIMD on 429/529) ──────────────
+_limiter = None
+_limiter_loop = None
+def get_limiter() -> AdaptiveLimiter:
+    global _limiter, _limiter_loop
+    loop = asyncio.get_running_loop()
+    if _limiter is None or _limiter_loop is not loop:
+        # Carry the learned limit over to the new loop
+        _limiter = AdaptiveLimiter(_limiter.limit if _limiter else MAX_PARALLEL)
+        _limiter_loop = loop
+    return _limiter
+
+# ── Hedging of straggling calls ───────────────────────────────
+_hedger = HedgePolicy()
+
+def set_hedging(enabled: bool):
+    """Turn hedging on or off at runtime (LLM_HEDGE sets the default)."""
+    _hedger.enabled = enabled
+
+def hedge_stats(reset: bool = False) -> dict:
+    """How many calls were hedged and how many hedges won; `reset` starts the counts over."""
+    stats = _hedger.stats()
+    if reset:
+        _hedger.reset_stats()
+    return stats
+
+# Which job (and fair-share weight) the calls of the current task belong to.
+# Set once per pipeline run; tasks spawned from it inherit the binding.
+_current_job: ContextVar[tuple] = ContextVar("llm_job", default=(None, PRIORITY_WEIGHTS["normal"]))
+
+def bind_job(job_id: str, priority: str = "normal"):
+    """Attribute every llm() call made from this task (and its children) to job_id."""
+    _current_job.set((job_id, PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS["normal"])))
+
+def job_queue_stats(job_id: str, finished: bool = False) -> dict:
+    """Time this job's LLM calls spent waiting for a slot; `finished` drops the bookkeeping."""
+    if _limiter is None:
+        return AdaptiveLimiter().job_stats(job_id)
+    return _limiter.end_job(job_id) if finished else _limiter.job_stats(job_id)
+
+# Input/output tokens per job, split into cached and uncached input
+_usage: dict[str | None, dict] = {}
+_USAGE_FIELDS = ("input_tokens", "cache_read_input_tokens", "cache_creation_input_tokens", "output_tokens")
+
+def record_usage(usage, job_id: str | None = None):
+    """Add one response's usage to its job (the current binding unless job_id is given)."""
+    if usage is None:
+        return
+    job = job_id if job_id is not None else _current_job.get()[0]
+    totals = _usage.setdefault(job, dict.fromkeys(_USAGE_FIELDS + ("requests",), 0))
+    counts = {field: getattr(usage, field, None) or 0 for field in _USAGE_FIELDS}
+    for field, n in counts.items():
+        totals[field] += n
+    totals["requests"] += 1
+    metrics.LLM_TOKENS_TOTAL.inc(counts["input_tokens"], kind="input")
+    metrics.LLM_TOKENS_TOTAL.inc(counts["cache_read_input_tokens"], kind="cache_read")
+    metrics.LLM_TOKENS_TOTAL.inc(counts["cache_creation_input_tokens"], kind="cache_write")
+    metrics.LLM_TOKENS_TOTAL.inc(counts["output_tokens"], kind="output")
+    metrics.LLM_INPUT_TOKENS.observe(counts["input_tokens"] + counts["cache_read_input_tokens"] + counts["cache_creation_input_tokens"])
+    metrics.LLM_OUTPUT_TOKENS.observe(counts["output_tokens"])
+
+def job_token_usage(job_id: str, finished: bool = False) -> dict:
+    """
+    Token totals for a job. `input_tokens` is the uncached part of the input;
+    `cached_ratio` is the share of input served from the provider's prompt cache.
+    """
+    totals = (_usage.pop(job_id, None) if finished else _usage.get(job_id)) or dict.fromkeys(_USAGE_FIELDS + ("requests",), 0)
+    total_input = totals["input_tokens"] + totals["cache_read_input_tokens"] + totals["cache_creation_input_tokens"]
+    return {**totals, "cached_ratio": round(totals["cache_read_input_tokens"] / total_input, 3) if total_input else 0.0}
+
+def limiter_state() -> dict:
+    """Current limit and backoff state, for /health and logs."""
+    if _limiter is None:
+        return AdaptiveLimiter(MAX_PARALLEL).state()
+    return _limiter.state()
+
+
+class StreamAborted(Exception):
+    """A streamed answer was cut off early because `check` rejected the text so far."""
+
+    def __init__(self, reason: str, text: str):
+        super().__init__(f"output aborted: {reason}")
+        self.reason = reason
+        self.text   = text
+
+
+def _is_transient(exc: Exception) -> bool:
+    if isinstance(exc, (anthropic.APIConnectionError, anthropic.APITimeoutError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in (408, 409) or (status is not None and status >= 500)
+
+
+# ── Async LLM ─────────────────────────────────────────────────
+def request_params(prompt: str, prefix: str | None, temperature: float, max_tokens: int) -> dict:
+    """
+    Messages API parameters. A shared `prefix` goes in the system prompt
+    with a cache_control breakpoint, so calls that share it only pay full
+    price for the per-call suffix. Prefixes below the provider's minimum are
+    never cached, so they are sent without one.
+    """
+    params = {
+        "model":       MODEL,
+        "max_tokens":  max_tokens,
+        "temperature": temperature,
+        "messages":    [{"role": "user", "content": prompt}],
+    }
+    if prefix:
+        block = {"type": "text", "text": prefix}
+        if PROMPT_CACHING and len(prefix) // 4 >= PROMPT_CACHE_MIN_TOKENS:   # ~4 chars per token
+            block["cache_control"] = {"type": "ephemeral"}
+        params["system"] = [block]
+    return params
+
+async def _llm_call(prompt: str, prefix: str | None, temperature: float, max_tokens: int, timeout: float) -> str:
+    started = time.monotonic()
+    resp = await _get_client().messages.create(
+        **request_params(prompt, prefix, temperature, max_tokens),
+        timeout=timeout,
+    )
+    _hedger.observe("call", time.monotonic() - started)
+    record_usage(resp.usage)
+    return resp.content[0].text.strip()
+
+async def _llm_stream_call(
+    prompt: str, prefix: str | None, temperature: float, max_tokens: int, timeout: float,
+    on_text: Callable[[str], None] | None, check: Callable[[str], str | None] | None,
+) -> str:
+    """
+    Same request as _llm_call, read as a token stream. `on_text` sees the
+    text so far after every delta; `check` may return a reason to stop —
+    leaving the stream closes the connection, so the model stops generating.
+    """
+    started = time.monotonic()
+    text    = ""
+    async with _get_client().messages.stream(
+        **request_params(prompt, prefix, temperature, max_tokens),
+        timeout=timeout,
+    ) as stream:
+        async for delta in stream.text_stream:
+            if not text:
+                metrics.LLM_FIRST_TOKEN_SECONDS.observe(time.monotonic() - started)
+                _hedger.observe("first_token", time.monotonic() - started)
+            text += delta
+            if on_text:
+                on_text(text)
+            reason = check(text) if check else None
+            if reason:
+                record_usage(stream.current_message_snapshot.usage)   # input + what was generated so far
+                raise StreamAborted(reason, text)
+        message = await stream.get_final_message()
+    record_usage(message.usage)
+    return text.strip()
+
+def _request_key(prompt: str, prefix: str | None, temperature: float, max_tokens: int) -> str:
+    return cache_key(MODEL, temperature, max_tokens, f"{prefix}\x00{prompt}" if prefix else prompt)
+
+async def cache_answer(prompt: str, text: str, temperature: float = 0.2, max_tokens: int = 4096, prefix: str | None = None):
+    """Store `text` as the cached answer to a request llm() would make with these arguments."""
+    await asyncio.to_thread(put_cached, _request_key(prompt, prefix, temperature, max_tokens), text)
+
+def _accepted(accept: Callable[[str], bool] | bool, text: str) -> bool:
+    return accept(text) if callable(accept) else accept
+
+async def _run_hedge(call, ticket: int) -> str:
+    """The duplicate request, in the limiter slot admit() reserved for it."""
+    limiter = get_limiter()
+    started = time.monotonic()
+    try:
+        with trace.span("llm_hedge", trace.LLM):
+            text = await call
+    except BaseException as e:
+        limiter.release(ticket, error=e)
+        raise
+    limiter.release(ticket, latency=time.monotonic() - started)
+    return text
+
+async def _hedged(call, streamed: bool, on_text, check) -> str:
+    """
+    Run call(on_text, check). If it is still pending after the hedge delay,
+    and the budget and a free limiter slot allow, start the same request
+    again and keep the winner: the first to finish — or, for a stream, the
+    first to produce text, which alone reaches on_text. The loser is cancelled.
+    """
+    delay = _hedger.delay("first_token" if streamed else "call")
+    if delay is None:
+        return await call(on_text, check)
+
+    racers: list[asyncio.Task] = []
+    leader: list[int] = []
+
+    def follow(i: int):
+        def on_racer_text(text: str):
+            if not leader:
+                leader.append(i)
+                for j, task in enumerate(racers):
+                    if j != i:
+                        task.cancel()
+            if leader[0] == i and on_text:
+                on_text(text)
+        return on_racer_text
+
+    def start(i: int):
+        return call(follow(i), check) if streamed else call(None, None)
+
+    racers.append(asyncio.create_task(start(0)))
+    try:
+        done, _ = await asyncio.wait(racers, timeout=delay)
+        if not done and not leader:
+            ticket = _hedger.admit(get_limiter().try_acquire)
+            if ticket is not None:
+                racers.append(asyncio.create_task(_run_hedge(start(1), ticket)))
+        errors, pending = {}, set(racers)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            finished = [task for task in racers if task in done and not task.cancelled()]
+            errors.update({racers.index(task): task.exception() for task in finished if task.exception()})
+            winner = next((task for task in finished if not task.exception()), None)
+            if winner:
+                if len(racers) > 1:
+                    _hedger.settle(hedge_won=winner is racers[1])
+                return winner.result()
+        raise errors[min(errors)]   # both failed — report the original call's error
+    finally:
+        for task in racers:
+            task.cancel()
+
+async def llm(
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = 4096,
+    use_cache: bool = True,
+    timeout: float | None = None,
+    prefix: str | None = None,
+    on_text: Callable[[str], None] | None = None,
+    check: Callable[[str], str | None] | None = None,
+    accept: Callable[[str], bool] | bool = True,
+) -> str:
+    """
+    `prefix` is an optional shared leading part of the prompt, sent as a
+    cacheable system block. With `on_text` or `check` the answer is streamed:
+    `on_text(text_so_far)` follows it as it arrives, and a non-empty
+    `check(text_so_far)` aborts the call with StreamAborted (not retried here).
+
+    A fresh answer goes into the response cache only if `accept(text)` holds,
+    so a re-run never replays an answer the caller threw away. accept=False
+    leaves it to the caller, who stores it with cache_answer() once judged.
+    """
+    streamed = on_text is not None or check is not None
+
+    def call(on_text, check):
+        if streamed:
+            return _llm_stream_call(prompt, prefix, temperature, max_tokens, timeout or CALL_TIMEOUT, on_text, check)
+        return _llm_call(prompt, prefix, temperature, max_tokens, timeout or CALL_TIMEOUT)
+    # Identical requests are answered from the on-disk cache; use_cache=False forces a fresh call
+    key = _request_key(prompt, prefix, temperature, max_tokens)
+    if use_cache:
+        cached = await asyncio.to_thread(get_cached, key)
+        metrics.LLM_CACHE_TOTAL.inc(result="hit" if cached is not None else "miss")
+        if cached is not None:
+            trace.annotate(llm_cache_hit=True)
+            if on_text:
+                on_text(cached)
+            return cached
+
+    limiter = get_limiter()
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        with trace.span("llm_slot", trace.WAIT):
+            ticket = await limiter.acquire(*_current_job.get())   # fair share; waits out any retry-after pause
+        started = time.monotonic()
+        try:
+            with trace.span("llm_call", trace.LLM, attempt=attempt) as call_span:
+                text = await _hedged(call, streamed, on_text, check)
+        except BaseException as e:
+            limiter.release(ticket, error=e)
+            if not isinstance(e, Exception):
+                outcome = "cancelled"
+            elif isinstance(e, StreamAborted):
+                outcome = "aborted"
+                metrics.LLM_STREAM_ABORTS_TOTAL.inc(reason=e.reason)
+            elif is_rate_limited(e):
+                outcome = "rate_limited"
+            else:
+                outcome = "transient" if _is_transient(e) else "error"
+            metrics.LLM_CALL_SECONDS.observe(time.monotonic() - started, outcome=outcome)
+            if call_span is not None:
+                call_span.attrs["outcome"] = outcome
+            if outcome in ("cancelled", "aborted", "error") or attempt == MAX_ATTEMPTS:
+                raise
+            metrics.LLM_RETRIES_TOTAL.inc(reason=outcome)
+            if outcome == "transient":
+                with trace.span("llm_backoff", trace.WAIT):
+                    await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 8))
+            log.info(f"LLM attempt {attempt} failed ({e.__class__.__name__}) — retrying")
+            continue
+        limiter.release(ticket, latency=time.monotonic() - started)
+        metrics.LLM_CALL_SECONDS.observe(time.monotonic() - started, outcome="ok")
+        break
+
+    if use_cache and _accepted(accept, text):
+        await asyncio.to_thread(put_cached, key, text)
+    return text
@@ -0,0 +1,138 @@
+import os
+import asyncio
+import logging
+from typing import Callable
+
+from core import trace
+from core.llm import _accepted, _get_client, _request_key, record_usage, request_params
+from core.llm_cache import get_cached, put_cached
+
+log = logging.getLogger("llm")
+
+# ── Config ────────────────────────────────────────────────────
+BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", 30))
+BATCH_MAX_REQUESTS = int(os.getenv("LLM_BATCH_MAX_REQUESTS", 10000))   # per submitted batch
+BATCH_TIMEOUT      = float(os.getenv("LLM_BATCH_TIMEOUT_SECONDS", 24 * 3600))
+
+
+class BatchError(Exception):
+    """One request of a batch did not succeed (errored, canceled or expired)."""
+
+
+class BatchBackend:
+    """
+    Interface for batch-capable LLM backends. A backend accepts many
+    prompts at once and answers them asynchronously; nothing is held open
+    while the batch runs.
+    """
+
+    async def submit(self, requests: list[dict]) -> str:
+        """requests: [{"custom_id", "prompt", "prefix", "temperature", "max_tokens"}]. Returns a batch id."""
+        raise NotImplementedError
+
+    async def poll(self, batch_id: str) -> dict:
+        """{"done": bool, "finished": int, "total": int}"""
+        raise NotImplementedError
+
+    async def results(self, batch_id: str) -> dict:
+        """{custom_id: text | BatchError} once poll() reports done."""
+        raise NotImplementedError
+
+
+class AnthropicBatchBackend(BatchBackend):
+    """Anthropic Message Batches API (also served by bench.fake_llm)."""
+
+    async def submit(self, requests: list[dict]) -> str:
+        batch = await _get_client().messages.batches.create(requests=[
+            {
+                "custom_id": r["custom_id"],
+                "params":    request_params(r["prompt"], r.get("prefix"), r["temperature"], r["max_tokens"]),
+            }
+            for r in requests
+        ])
+        return batch.id
+
+    async def poll(self, batch_id: str) -> dict:
+        batch  = await _get_client().messages.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        finished = counts.succeeded + counts.errored + counts.canceled + counts.expired
+        return {"done": batch.processing_status == "ended", "finished": finished, "total": finished + counts.processing}
+
+    async def results(self, batch_id: str) -> dict:
+        out = {}
+        async for entry in await _get_client().messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                record_usage(entry.result.message.usage)
+                out[entry.custom_id] = entry.result.message.content[0].text.strip()
+            else:
+                error = getattr(entry.result, "error", None)
+                out[entry.custom_id] = BatchError(f"{entry.result.type}: {error}" if error else entry.result.type)
+        return out
+
+
+_backend: BatchBackend = AnthropicBatchBackend()
+
+
+def set_batch_backend(backend: BatchBackend):
+    """Swap the batch backend (e.g. for a local fake)."""
+    global _backend
+    _backend = backend
+
+
+async def llm_batch(
+    prompts: dict[str, str],
+    temperature: float = 0.2,
+    max_tokens: int = 4096,
+    use_cache: bool = True,
+    on_progress: Callable[[int, int], None] | None = None,
+    prefix: str | None = None,
+    accept: Callable[[str], bool] | bool = True,
+) -> dict:
+    """
+    Answer {id: prompt} through the batch backend. Returns {id: text}, in the
+    order of `prompts`, with a BatchError in place of the text for requests
+    that failed. Cached prompts are answered locally and never submitted.
+    `prefix` is shared by every prompt and `accept` gates cache writes, as in llm().
+    """
+    out, pending = {}, {}
+    for rid, prompt in prompts.items():
+        key    = _request_key(prompt, prefix, temperature, max_tokens)   # the key llm() uses — answers are shared
+        cached = await asyncio.to_thread(get_cached, key) if use_cache else None
+        if cached is not None:
+            out[rid] = cached
+        else:
+            pending[rid] = (prompt, key)
+
+    ids = list(pending)
+    for start in range(0, len(ids), BATCH_MAX_REQUESTS):
+        part = ids[start: start + BATCH_MAX_REQUESTS]
+        # custom_id must be short and [A-Za-z0-9_-] — map back after the batch ends
+        custom = {f"r{i}": rid for i, rid in enumerate(part)}
+        with trace.span("llm_batch", trace.LLM, requests=len(custom)):
+            batch_id = await _backend.submit([
+                {"custom_id": cid, "prompt": pending[rid][0], "prefix": prefix, "temperature": temperature, "max_tokens": max_tokens}
+                for cid, rid in custom.items()
+            ])
+            log.info(f"Submitted LLM batch {batch_id} with {len(custom)} requests")
+            trace.annotate(batch_id=batch_id)
+
+            waited = 0.0
+            while True:
+                status = await _backend.poll(batch_id)
+                if on_progress:
+                    on_progress(len(out) + status["finished"], len(prompts))
+                if status["done"]:
+                    break
+                if waited >= BATCH_TIMEOUT:
+                    raise TimeoutError(f"LLM batch {batch_id} did not finish in {BATCH_TIMEOUT:.0f}s")
+                await asyncio.sleep(BATCH_POLL_SECONDS)
+                waited += BATCH_POLL_SECONDS
+
+            results = await _backend.results(batch_id)
+        for cid, rid in custom.items():
+            text = results.get(cid, BatchError("missing from batch results"))
+            out[rid] = text
+            if use_cache and isinstance(text, str) and _accepted(accept, text):
+                await asyncio.to_thread(put_cached, pending[rid][1], text)
+
+    return {rid: out[rid] for rid in prompts}
@@ -0,0 +1,141 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Optional
+
+log = logging.getLogger("llm_cache")
+
+# Disk-backed response cache: sha256(model, temperature, max_tokens, prompt) → text
+CACHE_ENABLED   = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "False", "")
+CACHE_DIR       = os.getenv("LLM_CACHE_DIR", "/tmp/repo2jac-cache")
+CACHE_TTL       = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))   # evict after 7 days
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))  # evict LRU above 256 MB
+
+_conn: Optional[sqlite3.Connection] = None
+_total = 0   # bytes of all stored responses, kept up to date instead of re-summed on every write
+_lock  = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+
+def _get_conn() -> sqlite3.Connection:
+    global _conn, _total
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        _conn = sqlite3.connect(
+            os.path.join(CACHE_DIR, "llm_cache.sqlite3"),
+            check_same_thread=False,
+            isolation_level=None,   # autocommit
+        )
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   key        TEXT PRIMARY KEY,
+                   response   TEXT NOT NULL,
+                   size       INTEGER NOT NULL,
+                   created_at REAL NOT NULL,
+                   last_used  REAL NOT NULL
+               )"""
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON responses(last_used)")
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_created_at ON responses(created_at)")
+        _total = _conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    return _conn
+
+
+def cache_key(model: str, temperature: float, max_tokens: int, prompt: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, repr(float(temperature)), str(max_tokens), prompt):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def get_cached(key: str) -> Optional[str]:
+    """
+    Return the cached response for `key`, or None on miss / expiry. Blocking —
+    async callers run it in a thread (asyncio.to_thread).
+    """
+    if not CACHE_ENABLED:
+        return None
+    try:
+        with _lock:
+            conn = _get_conn()
+            row  = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            now = time.time()
+            if row is None or row[1] < now - CACHE_TTL:
+                _stats["misses"] += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            _stats["hits"] += 1
+            return row[0]
+    except sqlite3.Error as e:
+        # A broken cache must never break the pipeline
+        log.warning(f"LLM cache read failed: {e}")
+        return None
+
+
+def put_cached(key: str, response: str):
+    """Store `response` under `key`. Blocking, like get_cached()."""
+    global _total
+    if not CACHE_ENABLED or not response:
+        return
+    try:
+        with _lock:
+            conn = _get_conn()
+            now  = time.time()
+            size = len(response.encode("utf-8"))
+            old  = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            _total += size - (old[0] if old else 0)
+            _stats["writes"] += 1
+            _evict(conn, now)
+    except sqlite3.Error as e:
+        log.warning(f"LLM cache write failed: {e}")
+
+
+def _evict(conn: sqlite3.Connection, now: float):
+    global _total
+    # Age-based: drop anything past TTL (indexed, so a no-op costs one lookup)
+    expired = conn.execute("DELETE FROM responses WHERE created_at < ? RETURNING size", (now - CACHE_TTL,)).fetchall()
+    _total -= sum(size for size, in expired)
+    _stats["evictions"] += len(expired)
+
+    # Size-based: drop least recently used rows until under the cap
+    if _total <= CACHE_MAX_BYTES:
+        return
+    excess = _total - CACHE_MAX_BYTES
+    freed  = 0
+    stale  = []
+    for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC"):
+        stale.append((key,))
+        freed += size
+        if freed >= excess:
+            break
+    conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+    _total -= freed
+    _stats["evictions"] += len(stale)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for this process plus current on-disk usage."""
+    stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["enabled"]  = CACHE_ENABLED
+    if CACHE_ENABLED:
+        try:
+            with _lock:
+                stats["entries"] = _get_conn().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                stats["bytes"]   = _total
+        except sqlite3.Error:
+            pass
+    return stats
@@ -0,0 +1,87 @@
+import os
+import math
+from collections import deque
+from typing import Callable
+
+from core import metrics
+
+# ── Config ────────────────────────────────────────────────────
+HEDGE_ENABLED     = os.getenv("LLM_HEDGE", "0") == "1"
+HEDGE_PERCENTILE  = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))     # calls slower than this get a duplicate
+HEDGE_BUDGET      = float(os.getenv("LLM_HEDGE_BUDGET", 0.05))       # extra requests as a share of all calls
+HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", 0.5))   # never hedge sooner than this
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))      # latencies seen before hedging starts
+HEDGE_WINDOW      = 500                                              # recent latencies per kind
+HEDGE_REFRESH     = 10                                               # new samples between percentile updates
+
+
+class HedgePolicy:
+    """
+    When to send a duplicate of a slow LLM call. The delay is a percentile
+    of recent latencies of the same kind — whole calls, or time to first
+    text for streams — so only stragglers are hedged. Every call earns
+    `budget` credit and every hedge costs 1, so duplicates stay within that
+    share of the traffic; credit saved up while calls are fast is capped.
+    """
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED, percentile: float = HEDGE_PERCENTILE, budget: float = HEDGE_BUDGET):
+        self.enabled    = enabled
+        self.percentile = percentile
+        self.budget     = budget
+        self.credit     = 0.0
+        self._samples: dict[str, deque] = {}
+        self._delays:  dict[str, float] = {}
+        self._fresh:   dict[str, int]   = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.counts = {"calls": 0, "hedged": 0, "won": 0, "no_budget": 0, "no_slot": 0}
+
+    def observe(self, kind: str, seconds: float):
+        """Latency of one call that ran to completion (a hedge's own time, never the race's)."""
+        samples = self._samples.setdefault(kind, deque(maxlen=HEDGE_WINDOW))
+        samples.append(seconds)
+        self._fresh[kind] = self._fresh.get(kind, 0) + 1
+        if len(samples) >= HEDGE_MIN_SAMPLES and (kind not in self._delays or self._fresh[kind] >= HEDGE_REFRESH):
+            ordered = sorted(samples)   # nearest rank
+            self._delays[kind] = ordered[min(max(math.ceil(self.percentile / 100 * len(ordered)), 1), len(ordered)) - 1]
+            self._fresh[kind]  = 0
+
+    def delay(self, kind: str) -> float | None:
+        """Seconds to wait before hedging a call that starts now; None = do not hedge."""
+        if not self.enabled:
+            return None
+        self.counts["calls"] += 1
+        self.credit = min(self.credit + self.budget, max(self.budget * 100, 1.0))
+        if kind not in self._delays:
+            return None
+        return max(self._delays[kind], HEDGE_MIN_SECONDS)
+
+    def admit(self, try_slot: Callable[[], int | None]) -> int | None:
+        """Spend one hedge if there is credit and try_slot() gets a free limiter slot; returns its ticket."""
+        if self.credit < 1:
+            outcome = "no_budget"
+        else:
+            ticket = try_slot()
+            if ticket is not None:
+                self.credit -= 1
+                self.counts["hedged"] += 1
+                return ticket
+            outcome = "no_slot"
+        self.counts[outcome] += 1
+        metrics.LLM_HEDGES_TOTAL.inc(outcome=outcome)
+        return None
+
+    def settle(self, hedge_won: bool):
+        if hedge_won:
+            self.counts["won"] += 1
+        metrics.LLM_HEDGES_TOTAL.inc(outcome="won" if hedge_won else "lost")
+
+    def stats(self) -> dict:
+        calls = self.counts["calls"]
+        return {
+            "enabled":    self.enabled,
+            **self.counts,
+            "hedge_rate": round(self.counts["hedged"] / calls, 4) if calls else 0.0,
+            "delays":     {kind: round(max(d, HEDGE_MIN_SECONDS), 3) for kind, d in self._delays.items()},
+        }
@@ -0,0 +1,217 @@
+import os
+import time
+import heapq
+import random
+import asyncio
+import logging
+from itertools import count
+
+from core import metrics
+from email.utils import parsedate_to_datetime
+
+log = logging.getLogger("llm")
+
+# ── Config ────────────────────────────────────────────────────
+LIMIT_INITIAL   = float(os.getenv("MAX_PARALLEL", 5))                     # starting concurrency
+LIMIT_MIN       = float(os.getenv("LLM_LIMIT_MIN", 1))
+LIMIT_MAX       = float(os.getenv("LLM_LIMIT_MAX", 50))
+BACKOFF_FACTOR  = float(os.getenv("LLM_BACKOFF_FACTOR", 0.5))             # multiplicative decrease
+LATENCY_TARGET  = float(os.getenv("LLM_LATENCY_TARGET_SECONDS", 20))      # slower calls stop growth
+BACKOFF_BASE    = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 1))         # pause when no retry-after
+BACKOFF_CAP     = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 60))
+
+RATE_LIMIT_STATUSES = (429, 529, 503)   # rate limited / overloaded
+
+# Fair-share weights: a job gets LLM slots in proportion to its class weight
+PRIORITY_WEIGHTS = {
+    "low":    float(os.getenv("PRIORITY_WEIGHT_LOW", 1)),
+    "normal": float(os.getenv("PRIORITY_WEIGHT_NORMAL", 2)),
+    "high":   float(os.getenv("PRIORITY_WEIGHT_HIGH", 4)),
+}
+
+
+def is_rate_limited(exc: Exception) -> bool:
+    return getattr(exc, "status_code", None) in RATE_LIMIT_STATUSES
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds the server asked us to wait (retry-after-ms, retry-after seconds or HTTP date)."""
+    response = getattr(exc, "response", None)
+    headers  = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for LLM calls. Every healthy response (fast, not
+    rate limited, with the limit fully in use) adds 1/limit, so the limit
+    grows by about one per window. A 429/529 halves it (once per generation,
+    not once per in-flight call that bounces) and blocks new calls until
+    retry-after has passed.
+
+    Slots are handed out across jobs by weighted fair queuing: each waiting
+    call carries a virtual finish tag (start + 1/weight, where start is the
+    later of the job's last tag and the global virtual clock), and the
+    smallest tag goes next. A 3-file job submitted behind a 50-file job is
+    served at once instead of after it, while a lone job still gets every slot.
+    """
+
+    def __init__(self, initial: float = LIMIT_INITIAL):
+        self.limit         = min(max(initial, LIMIT_MIN), LIMIT_MAX)
+        self.in_flight     = 0
+        self.blocked_until = 0.0
+        self.successes     = 0
+        self.slow          = 0
+        self.rate_limited  = 0
+        self.decreases     = 0
+        self.last_retry_after = None
+        self._streak       = 0    # consecutive rate limits without a success
+        self._queue        = []   # heap of (finish_tag, seq, start_tag, future, job)
+        self._seq          = count()
+        self._vclock       = 0.0  # start tag of the last admitted call
+        self._jobs: dict   = {}   # job → {"tag", "calls", "waiting", "wait_total", "wait_max"}
+        self._timer        = None
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for entry in self._queue if not entry[3].done())
+
+    async def acquire(self, job: str | None = None, weight: float = PRIORITY_WEIGHTS["normal"]) -> int:
+        """
+        Wait for a slot in `job`'s fair share. Returns a ticket (the cut count
+        at admission) for release().
+        """
+        stats  = self._jobs.setdefault(job, {"tag": 0.0, "calls": 0, "waiting": 0, "wait_total": 0.0, "wait_max": 0.0})
+        start  = max(stats["tag"], self._vclock)
+        stats["tag"] = start + 1 / max(weight, 1e-6)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (stats["tag"], next(self._seq), start, future, job))
+        stats["waiting"] += 1
+        queued = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.in_flight -= 1   # admitted just as we were cancelled — hand the slot back
+                self._dispatch()
+            raise
+        finally:
+            stats["waiting"] -= 1
+        waited = time.monotonic() - queued
+        metrics.LLM_QUEUE_WAIT_SECONDS.observe(waited)
+        stats["calls"]      += 1
+        stats["wait_total"] += waited
+        stats["wait_max"]    = max(stats["wait_max"], waited)
+        return self.decreases
+
+    def try_acquire(self) -> int | None:
+        """
+        A slot only if one is free right now, nobody is queued for it and no
+        backoff is in effect — for optional extra calls that must never wait
+        or push ahead of queued ones. Returns a ticket or None.
+        """
+        if self.blocked_until > time.monotonic() or self.waiting or self.in_flight >= int(self.limit):
+            return None
+        self.in_flight += 1
+        return self.decreases
+
+    def _dispatch(self):
+        """Admit queued calls in finish-tag order while the limit and backoff allow."""
+        pause = self.blocked_until - time.monotonic()
+        if pause > 0:
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(pause, self._resume)
+            return
+        while self._queue and self.in_flight < int(self.limit):
+            _, _, start, future, _ = heapq.heappop(self._queue)
+            if future.done():
+                continue   # cancelled while waiting
+            self._vclock = start
+            self.in_flight += 1
+            future.set_result(None)
+
+    def _resume(self):
+        self._timer = None
+        self._dispatch()
+
+    def release(self, ticket: int, latency: float | None = None, error: BaseException | None = None):
+        """Free the slot. Synchronous so it is safe in `finally` blocks of cancelled calls."""
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        if error is not None and is_rate_limited(error):
+            self._on_rate_limit(ticket, error)
+        elif error is None:
+            self._on_success(latency or 0.0, saturated)
+        self._dispatch()
+
+    def job_stats(self, job: str | None) -> dict:
+        """LLM queue wait for one job so far (seconds)."""
+        stats = self._jobs.get(job)
+        if not stats:
+            return {"calls": 0, "waiting": 0, "wait_mean": 0.0, "wait_max": 0.0, "wait_total": 0.0}
+        return {
+            "calls":      stats["calls"],
+            "waiting":    stats["waiting"],
+            "wait_mean":  round(stats["wait_total"] / stats["calls"], 4) if stats["calls"] else 0.0,
+            "wait_max":   round(stats["wait_max"], 4),
+            "wait_total": round(stats["wait_total"], 4),
+        }
+
+    def end_job(self, job: str | None) -> dict:
+        """Final queue-wait stats for a finished job; forgets it."""
+        stats = self.job_stats(job)
+        if job in self._jobs and not self._jobs[job]["waiting"]:
+            del self._jobs[job]
+        return stats
+
+    def _on_success(self, latency: float, saturated: bool):
+        self.successes += 1
+        self._streak = 0
+        if latency > LATENCY_TARGET:
+            self.slow += 1
+            return
+        if not saturated:
+            return   # the current limit is not what holds us back — do not inflate it
+        self.limit = min(self.limit + 1 / self.limit, LIMIT_MAX)
+
+    def _on_rate_limit(self, ticket: int, error: Exception):
+        self.rate_limited += 1
+        self._streak += 1
+        wait = retry_after(error)
+        if wait is None:
+            wait = min(BACKOFF_BASE * 2 ** (self._streak - 1), BACKOFF_CAP) * random.uniform(0.8, 1.2)
+        self.last_retry_after = round(wait, 3)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        # Calls admitted before the last cut bounce for the same reason — only
+        # a call admitted under the current limit may cut it again
+        if ticket == self.decreases:
+            self.limit = max(self.limit * BACKOFF_FACTOR, LIMIT_MIN)
+            self.decreases += 1
+            log.warning(f"LLM rate limited — concurrency limit now {int(self.limit)}, pausing {wait:.1f}s")
+
+    def state(self) -> dict:
+        return {
+            "limit":            int(self.limit),
+            "limit_exact":      round(self.limit, 3),
+            "in_flight":        self.in_flight,
+            "waiting":          self.waiting,
+            "backoff_seconds":  round(max(self.blocked_until - time.monotonic(), 0.0), 3),
+            "last_retry_after": self.last_retry_after,
+            "successes":        self.successes,
+            "slow":             self.slow,
+            "rate_limited":     self.rate_limited,
+            "decreases":        self.decreases,
+            "jobs":             {job: self.job_stats(job) for job in self._jobs if job is not None},
+        }
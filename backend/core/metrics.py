@@ -0,0 +1,187 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable
+
+# Minimal Prometheus text-format metrics (exposition format 0.0.4).
+# Values are per process: with several uvicorn workers, scrape each one.
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+WAIT_BUCKETS    = (0.001, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS   = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+_lock = threading.Lock()
+_registry: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _fmt(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.label_names = name, help, tuple(labels)
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(n, "") for n in self.label_names)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with _lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or computed at scrape time from `fn` (returns {label tuple: value} or a number)."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), fn: Callable | None = None):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        if self._fn is not None:
+            try:
+                value = self._fn()
+            except Exception:
+                return []
+            items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        else:
+            with _lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}   # key → [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            i = bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def _samples(self) -> list[str]:
+        with _lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), key + (_fmt(float(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names + ('le',), key + ('+Inf',))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+def render() -> str:
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# ── Metrics ───────────────────────────────────────────────────
+STAGE_SECONDS = Histogram(
+    "repo2jac_stage_duration_seconds",
+    "Wall time each pipeline stage (fetch, analyze, plan, convert, assemble) adds, timed from the end of the previous stage.",
+    ("stage",),
+)
+JOBS_TOTAL = Counter("repo2jac_jobs_total", "Finished jobs by outcome.", ("status",))
+FILES_TOTAL = Counter("repo2jac_files_total", "Files handled by outcome (converted, reused).", ("outcome",))
+
+LLM_CALL_SECONDS = Histogram(
+    "repo2jac_llm_call_seconds", "Latency of individual LLM API calls.", ("outcome",),
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "repo2jac_llm_first_token_seconds", "Time from sending a streamed LLM call to its first text.",
+)
+LLM_STREAM_ABORTS_TOTAL = Counter(
+    "repo2jac_llm_stream_aborts_total", "Streamed LLM answers cut off early (no_keywords, too_long).", ("reason",),
+)
+LLM_HEDGES_TOTAL = Counter(
+    "repo2jac_llm_hedges_total",
+    "Straggling LLM calls by hedge outcome (won, lost, or skipped for no_budget / no_slot).", ("outcome",),
+)
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "repo2jac_llm_queue_wait_seconds", "Time LLM calls waited for a concurrency slot.", buckets=WAIT_BUCKETS,
+)
+LLM_TOKENS_TOTAL = Counter(
+    "repo2jac_llm_tokens_total", "LLM tokens by kind (input, cache_read, cache_write, output).", ("kind",),
+)
+LLM_INPUT_TOKENS = Histogram(
+    "repo2jac_llm_input_tokens", "Input tokens per LLM response, cached and uncached.", buckets=TOKEN_BUCKETS,
+)
+LLM_OUTPUT_TOKENS = Histogram(
+    "repo2jac_llm_output_tokens", "Output tokens per LLM response.", buckets=TOKEN_BUCKETS,
+)
+LLM_RETRIES_TOTAL = Counter(
+    "repo2jac_llm_retries_total", "LLM calls retried by the client (rate_limited, transient).", ("reason",),
+)
+LLM_CACHE_TOTAL = Counter("repo2jac_llm_cache_total", "Local LLM response cache lookups.", ("result",))
+CONVERSION_RETRIES_TOTAL = Counter(
+    "repo2jac_conversion_retries_total", "Conversion attempts repeated after an LLM or validation error.", ("reason",),
+)
+FALLBACKS_TOTAL = Counter(
+    "repo2jac_fallbacks_total", "Files or chunks that ended with a fallback skeleton.", ("reason",),
+)
+SSE_SUBSCRIBERS = Gauge("repo2jac_sse_subscribers", "Open /stream connections.")
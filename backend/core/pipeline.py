@@ -1,16 +1,27 @@
 import os
 import json
+import time
 import asyncio
 import logging
 import traceback
-import anthropic
-
-from core.job_store import push_event, set_preview, set_output_path
-from utils.github_client import fetch_repo_files
-from utils.zip_builder import build_zip
+from itertools import islice
+
+from core import trace
+from core.job_store import push_event, set_partial, set_preview, set_artifact, set_result, get_result, set_trace
+from core.llm import llm, StreamAborted, bind_job, cache_answer, get_limiter, job_queue_stats, job_token_usage, limiter_state
+from core.llm_cache import cache_stats
+from core.llm_batch import llm_batch
+from core.metrics import STAGE_SECONDS, JOBS_TOTAL, FILES_TOTAL, CONVERSION_RETRIES_TOTAL, FALLBACKS_TOTAL
+from core.result_store import content_hash, plan_signature, build_result, save_result, load_result
+from utils.repo_sources import iter_source, open_source
+from utils.zip_builder import ZipAssembler
+from utils.role_classifier import ROLES, classify_role
+from utils.import_graph import analyze_imports, module_classes
+from utils.syntax_validator import validate_jac
+from utils.chunker import CHUNK_THRESHOLD_LINES, split_source, stitch
 from prompts.classify_role import classify_role_prompt
 from prompts.generate_plan import generate_plan_prompt
-from prompts.generate_jac_code import generate_jac_code_prompt
+from prompts.generate_jac_code import generate_jac_code_prefix, generate_jac_code_prompt
 from prompts.generate_readme import generate_readme_prompt
 from prompts.generate_demo import generate_demo_prompt
 
@@ -19,114 +30,485 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 log = logging.getLogger("pipeline")
 
 # ── Config ────────────────────────────────────────────────────
-API_KEY       = os.getenv("ANTHROPIC_API_KEY", "")
-MODEL         = os.getenv("JAC_MODEL", "claude-3-haiku-20240307")
 MAX_FILES     = int(os.getenv("MAX_FILES", 50))   # whole repo
 MAX_RETRY     = int(os.getenv("MAX_RETRIES", 1))
-MAX_PARALLEL  = int(os.getenv("MAX_PARALLEL", 5)) # concurrent LLM calls
-
-if not API_KEY:
-    log.error("❌ ANTHROPIC_API_KEY is not set!")
-
-_client = None
-def _get_client():
-    global _client
-    if _client is None:
-        _client = anthropic.Anthropic(api_key=API_KEY)
-    return _client
-
-# ── Semaphore to limit concurrent API calls ───────────────────
-_semaphore = None
-def get_semaphore():
-    global _semaphore
-    if _semaphore is None:
-        _semaphore = asyncio.Semaphore(MAX_PARALLEL)
-    return _semaphore
-
-
-# ── Async LLM ─────────────────────────────────────────────────
-def _llm_sync(prompt: str, temperature: float, max_tokens: int) -> str:
-    resp = _get_client().messages.create(
-        model=MODEL,
-        max_tokens=max_tokens,
-        temperature=temperature,
-        messages=[{"role": "user", "content": prompt}]
-    )
-    return resp.content[0].text.strip()
-
-async def llm(prompt: str, temperature: float = 0.2, max_tokens: int = 4096) -> str:
-    async with get_semaphore():  # limit concurrent calls
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _llm_sync, prompt, temperature, max_tokens)
+ROLE_CONFIDENCE_THRESHOLD = float(os.getenv("ROLE_CONFIDENCE_THRESHOLD", 0.6))  # below → ask the LLM
+STREAM_PARTIALS       = os.getenv("STREAM_PARTIALS", "1") != "0"          # stream conversions as `partial` events
+PARTIAL_EVENT_SECONDS = float(os.getenv("PARTIAL_EVENT_SECONDS", 0.25))   # min gap between partial events per file
+STREAM_KEYWORD_WINDOW = int(os.getenv("STREAM_KEYWORD_WINDOW", 1500))     # output chars allowed before a Jac keyword
+STREAM_OUTPUT_RATIO   = float(os.getenv("STREAM_OUTPUT_RATIO", 4))        # abort output longer than this × source
+STREAM_OUTPUT_MIN     = 4000                                              # …but never below this many chars
+FALLBACK_CONFIDENCE   = 0.55                                              # stub output scores at most this…
+LLM_ERROR_CONFIDENCE  = 0.50                                              # …and less when the LLM call itself failed
+UNVALIDATED_CONFIDENCE = 0.60                                             # real output that still fails the parser
+
+ABORT_HINTS = {
+    "no_keywords": "The previous answer contained no Jac declarations (node, walker, has, can). Reply with Jac code only.",
+    "too_long":    "The previous answer was far longer than the source and was cut off. Convert only this code, without commentary.",
+}
+
+
+class PlanHolder:
+    """
+    The plan conversions read at the start of every attempt. It starts as a
+    static skeleton and is swapped for the LLM-refined plan when that lands.
+    """
+
+    def __init__(self, plan: dict):
+        self.set(plan, refined=False)
+
+    def set(self, plan: dict, refined: bool):
+        self.plan    = plan
+        self.text    = json.dumps(plan, indent=2)
+        self.prefix  = generate_jac_code_prefix(self.text)   # byte-identical across files → prompt-cacheable
+        self.refined = refined
+
+
+class StageClock:
+    """
+    Times the pipeline's stages back to back: each from the end of the previous
+    one, so STAGE_SECONDS shows what every stage added to the job's wall time
+    even though streaming mode overlaps fetch, analysis and conversion.
+    """
+
+    def __init__(self):
+        self.last = time.monotonic()
+
+    def done(self, stage: str):
+        now = time.monotonic()
+        STAGE_SECONDS.observe(now - self.last, stage=stage)
+        self.last = now
+
+
+class ConvertGate:
+    """
+    Admits conversions while fewer than the shared LLM limiter's current
+    limit (plus one waiting call) are running. Prompts are then built just
+    before a slot frees up, so late starters pick up the refined plan, and
+    the gate grows and shrinks with the adaptive limit instead of holding
+    a job at its starting value.
+    """
+
+    def __init__(self):
+        self.active  = 0
+        self._wakeup = asyncio.Event()
+
+    async def acquire(self):
+        while self.active >= int(get_limiter().limit) + 1:
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._wakeup.set()
 
 
 # ── Convert a single file (used in parallel) ──────────────────
-async def convert_file(f: dict, plan_str: str, job_id: str, index: int, total: int):
-    log.info(f"Converting [{index+1}/{total}]: {f['path']}")
+def _units(f: dict) -> list[dict]:
+    """
+    Conversion units of a file: the whole file, or — above CHUNK_THRESHOLD_LINES —
+    one per group of top-level definitions, so one huge module neither truncates
+    at max_tokens nor becomes the job's tail latency.
+    """
+    chunks = []
+    if f["content"].count("\n") + 1 > CHUNK_THRESHOLD_LINES:
+        chunks = split_source(f["content"])
+    if len(chunks) < 2:
+        return [{"source": f["content"], "symbols": None, "part": None}]
+    return [{"source": c["source"], "symbols": c["symbols"], "part": (i + 1, len(chunks))} for i, c in enumerate(chunks)]
+
+
+def _unit_prompt(f: dict, unit: dict, error_log: str) -> str:
+    return generate_jac_code_prompt(
+        f["path"], f["role"],
+        unit["source"], error_log,
+        symbol_table=unit["symbols"], part=unit["part"],
+    )
+
+
+def _unit_label(f: dict, unit: dict) -> str:
+    part = unit["part"]
+    return f"{f['path']} [{part[0]}/{part[1]}]" if part else f["path"]
+
+
+def _has_jac_keywords(jac_code: str) -> bool:
+    return "node " in jac_code or "walker " in jac_code or "can " in jac_code or "has " in jac_code
+
+
+class PartialOutput:
+    """
+    Follows one streamed conversion attempt: publishes its text so far at
+    most every PARTIAL_EVENT_SECONDS, withdraws it when the attempt ends, and
+    rejects output that is clearly going nowhere.
+    """
+
+    def __init__(self, label: str, attempt: int, source: str, emit):
+        self.label   = label
+        self.attempt = attempt
+        self.emit    = emit
+        self.budget  = max(int(len(source) * STREAM_OUTPUT_RATIO), STREAM_OUTPUT_MIN)
+        self.text    = ""
+        self.sent    = 0
+        self.last    = 0.0
+        self.has_jac = False
+
+    def on_text(self, text: str):
+        self.text = text
+        if not self.sent or time.monotonic() - self.last >= PARTIAL_EVENT_SECONDS:
+            self.flush()
+
+    def flush(self):
+        if len(self.text) > self.sent:
+            self.emit(self.label, self.attempt + 1, self.text)
+            self.sent = len(self.text)
+            self.last = time.monotonic()
+
+    def close(self):
+        if self.sent:
+            self.emit(self.label, self.attempt + 1, None)
+
+    def check(self, text: str) -> str | None:
+        if len(text) > self.budget:
+            return "too_long"
+        if not self.has_jac:
+            self.has_jac = _has_jac_keywords(text)
+            if not self.has_jac and len(text) > STREAM_KEYWORD_WINDOW:
+                return "no_keywords"
+        return None
+
+
+async def _check_output(f: dict, label: str, jac_code: str, attempt: int) -> tuple[tuple | None, str]:
+    """
+    Judge one LLM answer. Returns ((jac_code, validated, confidence), "") when
+    it is final, or (None, error) when the next attempt should fix `error`.
+    """
+    # Strip markdown fences
+    jac_code = jac_code.replace("```jac", "").replace("```", "").strip()
+
+    # Basic quality check — does it have Jac keywords?
+    if not _has_jac_keywords(jac_code):
+        # Fallback if no Jac keywords found
+        log.warning(f"  ⚠ No Jac keywords found in output for {label}")
+        FALLBACKS_TOTAL.inc(reason="no_keywords")
+        return (_fallback(f["path"], f["role"]), False, FALLBACK_CONFIDENCE), ""
+
+    # Real parse in the warm validator pool; errors feed the next attempt
+    with trace.span("validate", trace.VALIDATE):
+        valid, error = await validate_jac(jac_code)
+    if valid:
+        confidence = 0.95 - (attempt * 0.08)
+        log.info(f"  ✅ {label} conf={confidence:.2f}")
+        return (jac_code, True, confidence), ""
+    log.warning(f"  ⚠ Jac syntax errors in {label} (attempt {attempt + 1})")
+    if attempt == MAX_RETRY:
+        return (jac_code, False, UNVALIDATED_CONFIDENCE), ""
+    CONVERSION_RETRIES_TOTAL.inc(reason="invalid_syntax")
+    return None, error
+
+
+async def _convert_unit(f: dict, unit: dict, plan: PlanHolder, use_cache: bool, on_partial=None) -> tuple[str, bool, float]:
+    """
+    Convert one file or one chunk of it. Returns (jac_code, validated, confidence).
+    With `on_partial(label, attempt, text)` the answer is streamed and its text
+    so far passed on as it arrives (None once the attempt is over).
+    """
+    label     = _unit_label(f, unit)
     error_log = ""
-    f["jac_code"]   = ""
-    f["validated"]  = False
-    f["confidence"] = 0.5
 
     for attempt in range(MAX_RETRY + 1):
+        f["refined_plan"] = plan.refined
+        partial = PartialOutput(label, attempt, unit["source"], on_partial) if on_partial else None
         try:
-            jac_code = await llm(
-                generate_jac_code_prompt(
-                    f["path"], f["role"],
-                    f["content"], plan_str, error_log
-                ),
-                temperature=0.2
+            with trace.span(f"attempt {attempt + 1}", trace.ATTEMPT, unit=label, refined_plan=plan.refined):
+                prompt, prefix = _unit_prompt(f, unit, error_log), plan.prefix
+                jac_code = await llm(
+                    prompt, temperature=0.2, use_cache=use_cache, prefix=prefix,
+                    on_text=partial and partial.on_text, check=partial and partial.check,
+                    accept=False,   # cached below, once it has passed the checks
+                )
+                if partial:
+                    partial.flush()
+                result, error_log = await _check_output(f, label, jac_code, attempt)
+                if use_cache and result and result[1]:
+                    await cache_answer(prompt, jac_code, temperature=0.2, prefix=prefix)
+            if result:
+                return result
+        except StreamAborted as e:
+            # Cut off mid-answer: the slot is already free for the next attempt
+            log.warning(f"  ✂ Stopped {label} output after {len(e.text)} chars ({e.reason})")
+            if attempt == MAX_RETRY:
+                FALLBACKS_TOTAL.inc(reason=e.reason)
+                return _fallback(f["path"], f["role"]), False, FALLBACK_CONFIDENCE
+            CONVERSION_RETRIES_TOTAL.inc(reason=e.reason)
+            error_log = ABORT_HINTS[e.reason]
+        except Exception as e:
+            log.error(f"  ❌ LLM error for {label}: {e}")
+            error_log = str(e)
+            if attempt < MAX_RETRY:
+                CONVERSION_RETRIES_TOTAL.inc(reason="llm_error")
+        finally:
+            if partial:
+                partial.close()
+
+    FALLBACKS_TOTAL.inc(reason="llm_error")
+    return _fallback(f["path"], f["role"]), False, LLM_ERROR_CONFIDENCE
+
+
+def _assemble(f: dict, results: list[tuple]):
+    """Set jac_code / validated / confidence on f from its unit results."""
+    if len(results) == 1:
+        f["jac_code"], f["validated"], f["confidence"] = results[0]
+        return
+    if all(confidence <= FALLBACK_CONFIDENCE for _, _, confidence in results):   # every chunk fell back
+        f["jac_code"], f["validated"], f["confidence"] = _fallback(f["path"], f["role"]), False, LLM_ERROR_CONFIDENCE
+        return
+    f["jac_code"]   = stitch([code for code, _, _ in results])
+    f["validated"]  = all(validated for _, validated, _ in results)
+    f["confidence"] = min(confidence for _, _, confidence in results)
+    f["chunks"]     = len(results)
+
+
+async def convert_file(f: dict, plan: PlanHolder, use_cache: bool = True, on_partial=None):
+    log.info(f"Converting: {f['path']}")
+    units = _units(f)
+    if len(units) > 1:
+        log.info(f"  ✂ {f['path']} split into {len(units)} chunks")
+    _assemble(f, await asyncio.gather(*(_convert_unit(f, u, plan, use_cache, on_partial) for u in units)))
+
+
+# ── Batch mode: one LLM batch per stage ───────────────────────
+async def classify_files_batch(files: list[dict], use_cache: bool, on_progress=None) -> int:
+    """AST-classify every file; ambiguous ones go to the LLM in one batch. Returns that count."""
+    ambiguous = {}
+    for f in files:
+        guess, confidence = classify_role(f["path"], f["content"])
+        f["role"] = guess
+        if confidence < ROLE_CONFIDENCE_THRESHOLD:
+            ambiguous[f["path"]] = f
+        f["classes"] = module_classes(f["content"])
+    if ambiguous:
+        answers = await llm_batch(
+            {path: classify_role_prompt(path, f["content"]) for path, f in ambiguous.items()},
+            temperature=0.1, use_cache=use_cache, on_progress=on_progress, accept=_is_role,
+        )
+        for path, answer in answers.items():
+            role = answer.lower().strip() if isinstance(answer, str) else ""
+            if role in ROLES:
+                ambiguous[path]["role"] = role
+    return len(ambiguous)
+
+
+async def convert_files_batch(files: list[dict], plan: PlanHolder, use_cache: bool, on_progress=None):
+    """
+    Convert every unit of every file as one LLM batch per attempt: the first
+    batch holds all prompts, each retry batch only the units whose output
+    failed validation, with the parser error in the prompt.
+    """
+    units   = [(f, u) for f in files for u in _units(f)]
+    results = [None] * len(units)
+    errors  = [""] * len(units)
+
+    for attempt in range(MAX_RETRY + 1):
+        pending = [i for i, r in enumerate(results) if r is None]
+        if not pending:
+            break
+        for f, _ in units:
+            f["refined_plan"] = plan.refined
+        with trace.span(f"attempt {attempt + 1}", trace.ATTEMPT, units=len(pending)):
+            prompts = {str(i): _unit_prompt(units[i][0], units[i][1], errors[i]) for i in pending}
+            answers = await llm_batch(
+                prompts, temperature=0.2, use_cache=use_cache, on_progress=on_progress, prefix=plan.prefix,
+                accept=False,   # cached below, once they have passed the checks
             )
-            # Strip markdown fences
-            jac_code = jac_code.replace("```jac", "").replace("```", "").strip()
-
-            # Basic quality check — does it have Jac keywords?
-            has_node   = "node " in jac_code
-            has_walker = "walker " in jac_code or "can " in jac_code
-            has_has    = "has " in jac_code
-
-            if has_node or has_walker or has_has:
-                f["jac_code"]   = jac_code
-                f["validated"]  = True
-                f["confidence"] = 0.95 - (attempt * 0.08)
-                log.info(f"  ✅ {f['path']} conf={f['confidence']:.2f}")
+            checks = await asyncio.gather(*(
+                _check_output(units[i][0], _unit_label(*units[i]), answers[str(i)], attempt)
+                for i in pending if isinstance(answers[str(i)], str)
+            ))
+        judged = iter(checks)
+        for i in pending:
+            if isinstance(answers[str(i)], str):
+                results[i], errors[i] = next(judged)
+                if use_cache and results[i] and results[i][1]:
+                    await cache_answer(prompts[str(i)], answers[str(i)], temperature=0.2, prefix=plan.prefix)
             else:
-                # Fallback if no Jac keywords found
-                f["jac_code"]   = _fallback(f["path"], f["role"])
-                f["confidence"] = 0.55
-                f["validated"]  = False
-                log.warning(f"  ⚠ No Jac keywords found in output for {f['path']}")
-            break
+                log.error(f"  ❌ LLM batch error for {_unit_label(*units[i])}: {answers[str(i)]}")
+                errors[i] = str(answers[str(i)])
+                if attempt < MAX_RETRY:
+                    CONVERSION_RETRIES_TOTAL.inc(reason="llm_error")
+
+    by_file: dict = {}
+    for (f, _), result in zip(units, results):
+        if result is None:
+            FALLBACKS_TOTAL.inc(reason="llm_error")
+        by_file.setdefault(f["path"], (f, []))[1].append(result or (_fallback(f["path"], f["role"]), False, LLM_ERROR_CONFIDENCE))
+    for f, file_results in by_file.values():
+        _assemble(f, file_results)
 
-        except Exception as e:
-            log.error(f"  ❌ LLM error for {f['path']}: {e}")
-            error_log = str(e)
-            if attempt == MAX_RETRY:
-                f["jac_code"]   = _fallback(f["path"], f["role"])
-                f["confidence"] = 0.50
-                f["validated"]  = False
 
-    pct = 45 + int((index + 1) / total * 38)
-    push_event(job_id, "progress", {
-        "step":       "convert",
-        "pct":        pct,
-        "file":       f["path"],
-        "confidence": round(f["confidence"], 2),
-        "validated":  f["validated"],
-    })
+# ── Repo file source ──────────────────────────────────────────
+# target → iterator of {path, content}; swapped out by benchmarks
+_file_source = iter_source
 
 
-async def run_pipeline(job_id: str, github_url: str, model: str):
-    log.info(f"🚀 Pipeline started — job={job_id} url={github_url}")
+def set_file_source(source):
+    """Replace the repo fetcher (e.g. with synthetic repos). None restores the default sources."""
+    global _file_source
+    _file_source = source or iter_source
+
+
+async def _aiter_repo_files(github_url: str, limit: int):
+    """Run the blocking fetcher in a thread and hand over up to `limit` files as they arrive."""
+    loop  = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    done  = object()
+
+    def produce():
+        try:
+            for f in islice(_file_source(github_url), limit):
+                loop.call_soon_threadsafe(queue.put_nowait, f)
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+
+    producer = loop.run_in_executor(None, produce)
+    while True:
+        item = await queue.get()
+        if item is done:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
+    await producer
+
+
+async def run_pipeline(
+    job_id: str,
+    github_url: str,
+    model: str,
+    use_cache: bool = True,
+    incremental: bool = False,
+    base_job_id: str | None = None,
+    priority: str = "normal",
+    batch: bool = False,
+):
+    """
+    Fetch, analyze and convert overlap: each file is classified as soon as it
+    is fetched, and conversions start once the fetch is complete, against a
+    skeleton plan built from every file's AST role. The LLM plan is requested
+    once every file is classified and applies to conversions that have not
+    started yet.
+
+    batch=True runs stage by stage instead and submits each stage's classify
+    and convert prompts as one LLM batch — slower per job, but cheaper and
+    without an open connection per request.
+    """
+    log.info(f"🚀 Pipeline started — job={job_id} url={github_url} priority={priority} batch={batch}")
+    bind_job(job_id, priority)   # LLM slots are shared fairly across running jobs
+    trace.start_trace(job_id)    # span tree for /trace/{job_id}
+    tasks: list[asyncio.Task] = []
+    stages  = StageClock()
+    status  = "error"
 
     try:
-        # ── STEP 1: Fetch ALL files ───────────────────────────
+        repo_name = github_url.rstrip("/").split("/")[-1].removesuffix(".git")
+        repo_key  = _repo_key(github_url)
+
+        # ── Incremental: reuse prior output for files whose content is unchanged
+        previous = None
+        if incremental or base_job_id:
+            previous = get_result(base_job_id) if base_job_id else load_result(repo_key)
+            if previous is None:
+                log.info("No previous result found — running a full conversion")
+
+        files:   list[dict] = []
+        reused:  set[str]   = set()
+        archive  = ZipAssembler()    # each .jac entry is deflated in as soon as it is done
+        static_roles: dict[str, tuple[str, float]] = {}   # path → AST role guess and its confidence
+        # Conversions wait for the skeleton plan of the whole repo: the plan is part
+        # of the cached prefix and of the response-cache key, so it must not depend
+        # on which files happen to be fetched or classified yet
+        skeleton_ready = asyncio.Event()
+        convert_gate   = ConvertGate()
+        progress = {"analyzed": 0, "converted": 0, "total": MAX_FILES, "llm_classified": 0}
+
+        async def analyze_file(f):
+            with trace.span(f["path"], trace.FILE, parent=analyze_stage):
+                # Static AST heuristic first; the LLM only breaks low-confidence ties
+                guess, confidence = static_roles[f["path"]]
+                if confidence >= ROLE_CONFIDENCE_THRESHOLD:
+                    f["role"] = guess
+                else:
+                    progress["llm_classified"] += 1
+                    try:
+                        role = (await llm(
+                            classify_role_prompt(f["path"], f["content"]), temperature=0.1, use_cache=use_cache, accept=_is_role,
+                        )).lower().strip()
+                        f["role"] = role if role in ROLES else guess
+                    except Exception:
+                        f["role"] = guess
+                trace.annotate(role=f["role"])
+            progress["analyzed"] += 1
+            pct = 18 + int(progress["analyzed"] / progress["total"] * 20)
+            push_event(job_id, "progress", {"step": "analyze", "pct": min(pct, 38), "file": f["path"], "role": f["role"]})
+
+        # Streamed conversions forward their text as it arrives
+        on_partial = (lambda label, attempt, text: set_partial(job_id, label, attempt, text)) if STREAM_PARTIALS else None
+
+        async def convert_and_pack(f, analyzed: asyncio.Task):
+            with trace.span(f["path"], trace.FILE, parent=convert_stage, lines=f["content"].count("\n") + 1):
+                with trace.span("await_analyze", trace.WAIT):
+                    await analyzed
+                    await skeleton_ready.wait()
+                with trace.span("convert_gate", trace.WAIT):
+                    await convert_gate.acquire()
+                try:
+                    await convert_file(f, plan, use_cache, on_partial)
+                finally:
+                    convert_gate.release()
+                trace.annotate(confidence=round(f["confidence"], 2), validated=f["validated"])
+            archive.add_jac_file(f["path"], f["jac_code"])
+            progress["converted"] += 1
+            FILES_TOTAL.inc(outcome="converted")
+            pct = 45 + int(progress["converted"] / progress["total"] * 38)
+            push_event(job_id, "progress", {
+                "step":       "convert",
+                "pct":        min(pct, 83),
+                "file":       f["path"],
+                "confidence": round(f["confidence"], 2),
+                "validated":  f["validated"],
+            })
+
+        # ── STEP 1-2: Fetch → analyze → convert, per file ─────
         push_event(job_id, "progress", {"step": "fetch", "pct": 5, "file": "Connecting to GitHub..."})
+        prior = {p["path"]: p for p in (previous or {}).get("files", [])}
+        analyze_tasks = []
+        batched: list[dict] = []   # batch mode: files waiting for the classify/convert batches
+        # Streaming mode: analysis and conversion start with the first fetched file
+        fetch_stage   = trace.begin("fetch", trace.STAGE)
+        analyze_stage = trace.begin("analyze", trace.STAGE)
+        convert_stage = None if batch else trace.begin("convert", trace.STAGE)
 
         try:
-            files = fetch_repo_files(github_url)
+            async for f in _aiter_repo_files(github_url, MAX_FILES):
+                f["hash"]    = content_hash(f["content"])
+                f["classes"] = module_classes(f["content"])
+                files.append(f)
+                if _reuse_unchanged(f, prior.get(f["path"])):
+                    reused.add(f["path"])
+                    archive.add_jac_file(f["path"], f["jac_code"])
+                    continue
+                static_roles[f["path"]] = classify_role(f["path"], f["content"])
+                if batch:
+                    batched.append(f)
+                    continue
+                analyzed = asyncio.create_task(analyze_file(f))
+                analyze_tasks.append(analyzed)
+                tasks.append(asyncio.create_task(convert_and_pack(f, analyzed)))
         except Exception as e:
             log.error(f"❌ GitHub fetch failed: {e}")
+            for t in tasks + analyze_tasks:
+                t.cancel()
             push_event(job_id, "error", {"message": f"GitHub error: {str(e)}", "recoverable": False})
             return
 
@@ -134,76 +516,110 @@ async def run_pipeline(job_id: str, github_url: str, model: str):
             push_event(job_id, "error", {"message": "No Python files found.", "recoverable": False})
             return
 
-        # Cap at MAX_FILES
-        files = files[:MAX_FILES]
-        repo_name = github_url.rstrip("/").split("/")[-1].removesuffix(".git")
+        # Skeleton from the AST roles, never from LLM tie-breaks that may or may not have landed
+        plan = PlanHolder(_skeleton_plan([
+            dict(f, role=static_roles[f["path"]][0]) if f["path"] in static_roles else f for f in files
+        ]))
+        skeleton_ready.set()
+        trace.end(fetch_stage, files=len(files), reused=len(reused))
+        stages.done("fetch")
+        FILES_TOTAL.inc(len(reused), outcome="reused")
+        progress["total"] = max(len(files) - len(reused), 1)
         log.info(f"✅ Fetched {len(files)} files from '{repo_name}'")
-
         push_event(job_id, "progress", {
             "step": "fetch", "pct": 15,
             "file": f"Found {len(files)} Python files in '{repo_name}'"
         })
-
-        # ── STEP 2: Analyze ALL files IN PARALLEL ─────────────
-        push_event(job_id, "progress", {"step": "analyze", "pct": 18, "file": "Analyzing file roles..."})
-
-        async def analyze_file(f, i):
-            try:
-                role = (await llm(classify_role_prompt(f["path"], f["content"]), temperature=0.1)).lower().strip()
-                f["role"] = role if role in ("model", "controller", "service", "util") else "util"
-            except Exception:
-                f["role"] = "util"
-            pct = 18 + int((i + 1) / len(files) * 20)
-            push_event(job_id, "progress", {"step": "analyze", "pct": pct, "file": f["path"], "role": f["role"]})
-
-        # Run all analysis calls in parallel
-        await asyncio.gather(*[analyze_file(f, i) for i, f in enumerate(files)])
-        log.info("✅ Analysis complete")
-
-        # ── STEP 3: Plan ──────────────────────────────────────
+        if previous is not None:
+            log.info(f"♻ Incremental: {len(reused)}/{len(files)} files unchanged")
+            push_event(job_id, "progress", {
+                "step": "fetch", "pct": 16,
+                "file": f"Reusing {len(reused)} unchanged files from the previous conversion"
+            })
+
+        def batch_progress(step: str, low: int, span: int):
+            def report(done: int, total: int):
+                pct = low + int(done / max(total, 1) * span)
+                push_event(job_id, "progress", {"step": step, "pct": pct, "file": f"LLM batch: {done}/{total} answered"})
+            return report
+
+        if batch:
+            with trace.span("classify", trace.ATTEMPT, parent=analyze_stage, files=len(batched)):
+                progress["llm_classified"] = await classify_files_batch(batched, use_cache, batch_progress("analyze", 18, 20))
+        else:
+            await asyncio.gather(*analyze_tasks)
+        stages.done("analyze")
+        trace.end(analyze_stage, llm_classified=progress["llm_classified"])
+        log.info(f"✅ Analysis complete — {progress['llm_classified']} files needed the LLM classifier")
+
+        # ── STEP 3: Plan (refines the skeleton while conversion runs)
         push_event(job_id, "progress", {"step": "plan", "pct": 40, "file": "Building OSP plan..."})
+        plan_stage = trace.begin("plan", trace.STAGE)
+
+        # Conversion order and edge candidates come from static import analysis;
+        # the LLM only maps classes to nodes/walkers
+        analysis = analyze_imports(files)
+        if analysis["cycles"]:
+            log.info(f"Import cycles collapsed: {analysis['cycles']}")
+
+        if previous is not None and previous.get("signature") == plan_signature(files):
+            # Same roles and classes as last time — the previous plan still applies
+            plan_json = previous["plan"]
+            log.info("♻ Plan reused from previous result")
+        elif progress["converted"] == len(files) - len(reused):
+            plan_json = plan.plan   # nothing left to refine
+        else:
+            try:
+                plan_raw  = await llm(generate_plan_prompt(repo_name, files, analysis), temperature=0.2, use_cache=use_cache, accept=_is_plan)
+                plan_json = _parse_plan(plan_raw)
+                log.info(f"✅ Plan: {len(plan_json.get('nodes', []))} nodes")
+            except Exception as e:
+                log.error(f"Plan failed: {e}")
+                plan_json = _skeleton_plan(files)
 
-        try:
-            plan_raw  = await llm(generate_plan_prompt(repo_name, files), temperature=0.2)
-            plan_raw  = plan_raw.replace("```json", "").replace("```", "").strip()
-            plan_json = json.loads(plan_raw)
-            log.info(f"✅ Plan: {len(plan_json.get('nodes', []))} nodes")
-        except Exception as e:
-            log.error(f"Plan failed: {e}")
-            plan_json = {"nodes": [], "walkers": [], "edges": [], "order": [f["path"] for f in files]}
-
-        conversion_order = plan_json.get("order", [f["path"] for f in files])
-        order_index = {p: i for i, p in enumerate(conversion_order)}
-        files.sort(key=lambda f: order_index.get(f["path"], 999))
-        plan_str = json.dumps(plan_json, indent=2)
+        if not plan_json.get("edges"):
+            plan_json["edges"] = [{k: e[k] for k in ("from_node", "to_node", "edge_name")} for e in analysis["edges"]]
+        plan_json["order"] = analysis["order"]
+        plan.set(plan_json, refined=True)
+        stages.done("plan")
+        trace.end(plan_stage)
 
         push_event(job_id, "progress", {
             "step": "plan", "pct": 45,
             "file": f"Plan ready — {len(plan_json.get('nodes', []))} nodes mapped"
         })
 
-        # ── STEP 4: Convert ALL files IN PARALLEL ─────────────
-        log.info(f"STEP 4: Converting {len(files)} files in parallel (max {MAX_PARALLEL} at a time)...")
-
-        await asyncio.gather(*[
-            convert_file(f, plan_str, job_id, i, len(files))
-            for i, f in enumerate(files)
-        ])
-        log.info("✅ All files converted")
-
+        # ── STEP 4: Wait for the in-flight conversions ────────
+        if batch:
+            with trace.span("convert", trace.STAGE, files=len(batched)):
+                await convert_files_batch(batched, plan, use_cache, batch_progress("convert", 45, 38))
+            for f in batched:
+                archive.add_jac_file(f["path"], f["jac_code"])
+            FILES_TOTAL.inc(len(batched), outcome="converted")
+            log.info(f"✅ All files converted in batch mode — {len(batched)} files")
+        else:
+            await asyncio.gather(*tasks)
+            late = sum(1 for f in files if f.get("refined_plan"))
+            log.info(f"✅ All files converted — {late}/{len(tasks)} with the refined plan")
+        stages.done("convert")
+        trace.end(convert_stage)
+        assemble_stage = trace.begin("assemble", trace.STAGE)
+
+        order_index = {p: i for i, p in enumerate(analysis["order"])}
+        files.sort(key=lambda f: order_index[f["path"]])
         # ── STEP 5: README + demo IN PARALLEL ─────────────────
         push_event(job_id, "progress", {"step": "assemble", "pct": 85, "file": "Generating README..."})
 
         async def gen_readme():
             try:
-                return await llm(generate_readme_prompt(repo_name, files), temperature=0.3)
+                return await llm(generate_readme_prompt(repo_name, files), temperature=0.3, use_cache=use_cache)
             except Exception as e:
                 log.error(f"README failed: {e}")
                 return f"# {repo_name} — Converted to Jac\n\nRun: `jac run main.jac`\n"
 
         async def gen_demo():
             try:
-                return await llm(generate_demo_prompt(repo_name), temperature=0.1)
+                return await llm(generate_demo_prompt(repo_name), temperature=0.1, use_cache=use_cache)
             except Exception as e:
                 log.error(f"Demo failed: {e}")
                 return "#!/bin/bash\npip install jaseci\njac run main.jac\n"
@@ -213,8 +629,8 @@ async def run_pipeline(job_id: str, github_url: str, model: str):
         # ── STEP 6: ZIP ───────────────────────────────────────
         push_event(job_id, "progress", {"step": "assemble", "pct": 92, "file": "Building ZIP..."})
 
-        jac_files = {f["path"].replace(".py", ".jac"): f.get("jac_code", "") for f in files}
-        zip_path  = build_zip(job_id, jac_files, readme, demo)
+        archive.add_project_files(readme, demo)
+        archive.finalize()
         avg_conf  = sum(f.get("confidence", 0.5) for f in files) / len(files)
 
         set_preview(job_id, {
@@ -231,19 +647,95 @@ async def run_pipeline(job_id: str, github_url: str, model: str):
             "readme":      readme,
             "demo_script": demo,
         })
-        set_output_path(job_id, zip_path)
+        set_artifact(job_id, archive)
+        stages.done("assemble")
+        trace.end(assemble_stage)
+
+        result = build_result(repo_key, files, plan_json)
+        set_result(job_id, result)
+        save_result(repo_key, result)
 
         log.info(f"🎉 Done — {len(files)} files, avg_conf={round(avg_conf, 2)}")
+        log.info(f"LLM cache: {cache_stats()}")
+        log.info(f"LLM limiter: {limiter_state()}")
+        queue_wait = job_queue_stats(job_id, finished=True)
+        tokens     = job_token_usage(job_id, finished=True)
+        log.info(f"LLM queue wait: {queue_wait}")
+        log.info(f"LLM tokens: {tokens}")
+        job_trace = trace.finish_trace(job_id)   # stored before "complete" so /trace is ready when clients see it
+        if job_trace:
+            set_trace(job_id, job_trace)
+            log.info(f"Critical path: {trace.critical_path(job_trace)['by_category']}")
         push_event(job_id, "complete", {
             "download_url":   f"/download/{job_id}",
             "total_files":    len(files),
             "avg_confidence": round(avg_conf, 2),
+            "reused_files":   len(reused),
+            "llm_queue_wait": queue_wait,
+            "llm_tokens":     tokens,
         })
+        status = "complete"
 
     except Exception as e:
         log.error(f"❌ Fatal: {e}\n{traceback.format_exc()}")
         push_event(job_id, "error", {"message": f"Pipeline error: {str(e)}", "recoverable": False})
 
+    finally:
+        job_trace = trace.finish_trace(job_id)   # failed jobs keep their trace too
+        if job_trace:
+            set_trace(job_id, job_trace)
+        JOBS_TOTAL.inc(status=status)
+        job_queue_stats(job_id, finished=True)   # drop per-job LLM bookkeeping on every exit path
+        job_token_usage(job_id, finished=True)
+
+
+def _repo_key(github_url: str) -> str:
+    try:
+        return open_source(github_url).key
+    except ValueError:
+        return github_url.rstrip("/")
+
+
+def _reuse_unchanged(f: dict, old: dict | None) -> bool:
+    """
+    Copy role + Jac output from the previous result if the content hash matches
+    and that output was a real conversion — fallback stubs are always retried.
+    """
+    if not old or old.get("hash") != f["hash"] or old.get("confidence", 0) <= FALLBACK_CONFIDENCE:
+        return False
+    f["role"]       = old["role"]
+    f["jac_code"]   = old["jac_code"]
+    f["confidence"] = old["confidence"]
+    f["validated"]  = old["validated"]
+    return True
+
+
+def _is_role(answer: str) -> bool:
+    return answer.lower().strip() in ROLES
+
+
+def _parse_plan(answer: str) -> dict:
+    return json.loads(answer.replace("```json", "").replace("```", "").strip())
+
+
+def _is_plan(answer: str) -> bool:
+    try:
+        return isinstance(_parse_plan(answer), dict)
+    except ValueError:
+        return False
+
+
+def _skeleton_plan(files: list[dict]) -> dict:
+    """Static stand-in plan from classified files: model classes → nodes, handlers → walkers."""
+    nodes, walkers = [], []
+    for f in files:
+        for cls in f.get("classes", []):
+            if f.get("role") == "model":
+                nodes.append({"original_class": cls["name"], "jac_node": cls["name"], "fields": cls["fields"]})
+            elif f.get("role") in ("controller", "service"):
+                walkers.append({"original": cls["name"], "jac_walker": cls["name"], "purpose": f["path"]})
+    return {"nodes": nodes, "walkers": walkers, "edges": []}
+
 
 def _fallback(path: str, role: str) -> str:
     name = role.capitalize()
@@ -0,0 +1,70 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from typing import Optional
+
+log = logging.getLogger("result_store")
+
+# Last completed conversion per repo: owner/repo → { files, plan, signature }
+RESULT_DIR = os.getenv("RESULT_STORE_DIR", "/tmp/repo2jac-cache/results")
+
+_CLASS_RE = re.compile(r"^class\s+(\w+)", re.MULTILINE)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def plan_signature(files: list[dict]) -> dict:
+    """The inputs that shape the OSP plan: which roles and classes exist."""
+    return {
+        "roles":   sorted({f.get("role", "util") for f in files}),
+        "classes": sorted({cls for f in files for cls in _CLASS_RE.findall(f["content"])}),
+    }
+
+
+def build_result(repo_key: str, files: list[dict], plan: dict) -> dict:
+    return {
+        "repo":       repo_key,
+        "created_at": time.time(),
+        "plan":       plan,
+        "signature":  plan_signature(files),
+        "files": [
+            {
+                "path":       f["path"],
+                "hash":       f.get("hash") or content_hash(f["content"]),
+                "role":       f.get("role", "util"),
+                "jac_code":   f.get("jac_code", ""),
+                "confidence": f.get("confidence", 0.5),
+                "validated":  f.get("validated", False),
+            }
+            for f in files
+        ],
+    }
+
+
+def _result_path(repo_key: str) -> str:
+    return os.path.join(RESULT_DIR, repo_key.replace("/", "__") + ".json")
+
+
+def save_result(repo_key: str, result: dict):
+    try:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        path     = _result_path(repo_key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(result, fh)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning(f"Result store write failed for {repo_key}: {e}")
+
+
+def load_result(repo_key: str) -> Optional[dict]:
+    try:
+        with open(_result_path(repo_key), encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,267 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ── Config ────────────────────────────────────────────────────
+TRACE_ENABLED   = os.getenv("TRACE_ENABLED", "1") != "0"
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 5000))   # per job; later spans are counted, not kept
+
+# Span categories
+JOB, STAGE, FILE, ATTEMPT, LLM, VALIDATE, WAIT = "job", "stage", "file", "attempt", "llm", "validate", "wait"
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "cat", "start", "end", "attrs")
+
+    def __init__(self, span_id: int, parent: int | None, name: str, cat: str, start: float, attrs: dict):
+        self.id, self.parent, self.name, self.cat = span_id, parent, name, cat
+        self.start, self.end, self.attrs = start, None, attrs
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else self.start) - self.start
+
+
+class Tracer:
+    """
+    Span tree of one job: job → stage → file → attempt → LLM call / validation,
+    with `wait` spans for time spent queued (LLM slots, the convert gate,
+    backoff). Times are seconds since the job started.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id  = job_id
+        self.origin  = time.monotonic()
+        self.wall    = time.time()
+        self.spans: list[Span] = []
+        self.dropped = 0
+
+    def now(self) -> float:
+        return time.monotonic() - self.origin
+
+    def begin(self, name: str, cat: str, parent: Span | None = None, **attrs) -> Span | None:
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return None
+        span = Span(len(self.spans), parent.id if parent else None, name, cat, self.now(), attrs)
+        self.spans.append(span)
+        return span
+
+    def end(self, span: Span | None, **attrs):
+        if span is not None and span.end is None:
+            span.end = self.now()
+            span.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        now  = self.now()
+        ends = {s.id: s.end if s.end is not None else now for s in self.spans}   # open spans end "now"
+        kids = _children(self.spans)
+        return {
+            "job_id":        self.job_id,
+            "started_at":    self.wall,
+            "duration":      round(max(ends.values(), default=0.0), 6),
+            "finished":      all(s.end is not None for s in self.spans),
+            "dropped_spans": self.dropped,
+            "spans": [
+                {
+                    "id":     s.id,
+                    "parent": s.parent,
+                    "name":   s.name,
+                    "cat":    s.cat,
+                    "start":  round(s.start, 6),
+                    "end":    round(ends[s.id], 6),
+                    "wait":   round(_wait_time(s, ends, kids), 6),
+                    **({"attrs": s.attrs} if s.attrs else {}),
+                }
+                for s in self.spans
+            ],
+        }
+
+
+# ── Per-task current span ─────────────────────────────────────
+# (tracer, span) — tasks inherit it at creation, like core.llm's job binding
+_current: ContextVar[tuple] = ContextVar("trace_span", default=(None, None))
+_live: dict[str, Tracer] = {}
+
+
+def start_trace(job_id: str) -> Span | None:
+    """Open the job's root span and make it current for this task and the tasks it creates."""
+    if not TRACE_ENABLED:
+        return None
+    tracer = Tracer(job_id)
+    _live[job_id] = tracer
+    root = tracer.begin("job", JOB, job_id=job_id)
+    _current.set((tracer, root))
+    return root
+
+
+def finish_trace(job_id: str) -> dict | None:
+    """Close every open span and return the finished trace."""
+    tracer = _live.pop(job_id, None)
+    if tracer is None:
+        return None
+    for s in tracer.spans:
+        tracer.end(s)
+    return tracer.to_dict()
+
+
+def live_trace(job_id: str) -> dict | None:
+    """Snapshot of a job still running in this process."""
+    tracer = _live.get(job_id)
+    return tracer.to_dict() if tracer else None
+
+
+def begin(name: str, cat: str, **attrs) -> Span | None:
+    """Open a span under the current one without making it current (for stages that overlap)."""
+    tracer, parent = _current.get()
+    return tracer.begin(name, cat, parent, **attrs) if tracer else None
+
+
+def end(span: Span | None, **attrs):
+    tracer, _ = _current.get()
+    if tracer:
+        tracer.end(span, **attrs)
+
+
+@contextmanager
+def span(name: str, cat: str, parent: Span | None = None, **attrs):
+    """Time the block as a child of `parent` (default: the current span) and make it current."""
+    tracer, current = _current.get()
+    if tracer is None:
+        yield None
+        return
+    opened = tracer.begin(name, cat, parent or current, **attrs)
+    if opened is None:
+        yield None
+        return
+    token = _current.set((tracer, opened))
+    try:
+        yield opened
+    finally:
+        _current.reset(token)
+        tracer.end(opened)
+
+
+def annotate(**attrs):
+    """Add attributes to the current span."""
+    _, current = _current.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+
+# ── Analysis ──────────────────────────────────────────────────
+def _children(spans) -> dict:
+    kids: dict = {}
+    for s in spans:
+        kids.setdefault(s.parent, []).append(s)
+    return kids
+
+
+def _wait_time(span, ends: dict, kids: dict) -> float:
+    """Time within `span` during which at least one descendant `wait` span was open."""
+    intervals, stack = [], list(kids.get(span.id, []))
+    while stack:
+        s = stack.pop()
+        if s.cat == WAIT:
+            intervals.append((s.start, ends[s.id]))
+        else:
+            stack.extend(kids.get(s.id, []))
+    total, cursor = 0.0, float("-inf")
+    for lo, hi in sorted(intervals):
+        lo = max(lo, cursor)
+        if hi > lo:
+            total += hi - lo
+            cursor = hi
+    return total
+
+
+def critical_path(trace: dict) -> dict:
+    """
+    The chain of spans that determined the job's end time. Walking back from
+    the end, each span hands over to the child that finished last before the
+    current point; time covered by no child is the span's own. Returns the
+    segments in time order plus totals per category and per span.
+    """
+    spans = {s["id"]: s for s in trace["spans"]}
+    kids: dict = {}
+    for s in trace["spans"]:
+        kids.setdefault(s["parent"], []).append(s)
+    segments: list = []
+
+    def walk(s: dict, until: float):
+        cursor    = until
+        remaining = [c for c in kids.get(s["id"], []) if c["start"] < until]
+        while remaining:
+            child = max(remaining, key=lambda c: (min(c["end"], cursor), c["end"] - c["start"]))
+            child_end = min(child["end"], cursor)
+            if child_end < cursor:
+                segments.append((s, child_end, cursor))
+            walk(child, child_end)
+            cursor    = max(child["start"], s["start"])
+            remaining = [c for c in remaining if c is not child and c["start"] < cursor]
+        if cursor > s["start"]:
+            segments.append((s, s["start"], cursor))
+
+    for root in kids.get(None, []):
+        walk(root, root["end"])
+    segments.reverse()
+
+    by_cat: dict = {}
+    by_span: dict = {}
+    for s, lo, hi in segments:
+        by_cat[s["cat"]] = by_cat.get(s["cat"], 0.0) + hi - lo
+        by_span[s["id"]] = by_span.get(s["id"], 0.0) + hi - lo
+    top = sorted(by_span.items(), key=lambda kv: kv[1], reverse=True)[:10]
+    return {
+        "duration": trace["duration"],
+        "segments": [
+            {"span": s["id"], "name": s["name"], "cat": s["cat"], "start": round(lo, 6), "end": round(hi, 6)}
+            for s, lo, hi in segments if hi - lo > 1e-6
+        ],
+        "by_category": {cat: round(v, 6) for cat, v in sorted(by_cat.items(), key=lambda kv: -kv[1])},
+        "top_spans": [
+            {"span": sid, "name": spans[sid]["name"], "cat": spans[sid]["cat"], "seconds": round(v, 6),
+             "path": _path(spans, sid)}
+            for sid, v in top
+        ],
+    }
+
+
+def _path(spans: dict, span_id: int) -> str:
+    names = []
+    while span_id is not None:
+        names.append(spans[span_id]["name"])
+        span_id = spans[span_id]["parent"]
+    return " › ".join(reversed(names))
+
+
+def chrome_trace(trace: dict) -> dict:
+    """
+    Chrome trace-event JSON (chrome://tracing, Perfetto). Spans that overlap
+    without nesting — concurrent files, LLM calls — go on separate rows.
+    """
+    lanes: list[list[float]] = []     # per row: end times of the spans still open on it
+    events = []
+    for s in sorted(trace["spans"], key=lambda s: (s["start"], -s["end"])):
+        for tid, open_ends in enumerate(lanes):
+            while open_ends and open_ends[-1] <= s["start"]:
+                open_ends.pop()
+            if not open_ends or open_ends[-1] >= s["end"]:
+                break
+        else:
+            lanes.append([])
+            tid = len(lanes) - 1
+        lanes[tid].append(s["end"])
+        events.append({
+            "name": s["name"],
+            "cat":  s["cat"],
+            "ph":   "X",
+            "ts":   round(s["start"] * 1e6, 1),
+            "dur":  round((s["end"] - s["start"]) * 1e6, 1),
+            "pid":  1,
+            "tid":  tid,
+            "args": {"wait_seconds": s["wait"], **s.get("attrs", {})},
+        })
+    events.append({"name": "process_name", "ph": "M", "pid": 1, "args": {"name": f"job {trace['job_id']}"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
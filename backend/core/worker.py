@@ -0,0 +1,197 @@
+"""
+Pipeline worker processes.
+
+Workers claim queued conversions from the SQLite job queue and run them;
+progress, previews and ZIPs go through the SQLite job store, which the API
+process reads to serve /stream, /preview and /download. With
+PIPELINE_EXECUTOR=workers the API starts PIPELINE_WORKERS of these itself;
+more (or all, with PIPELINE_WORKERS=0) can run separately on the same node:
+
+    JOB_STORE=sqlite python -m core.worker --workers 4
+
+Each process has its own adaptive LLM limiter, so the processes one
+start_workers() call launches split LLM_LIMIT_MAX between them. Separately
+started groups (the API's workers, each `python -m core.worker`) each get
+the full LLM_LIMIT_MAX.
+"""
+import os
+import sys
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+import multiprocessing
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+log = logging.getLogger("worker")
+
+# ── Config ────────────────────────────────────────────────────
+WORKER_CONCURRENCY   = int(os.getenv("WORKER_CONCURRENCY", 4))          # jobs run at once per process
+WORKER_POLL_SECONDS  = float(os.getenv("WORKER_POLL_SECONDS", 0.5))     # idle queue polling
+WORKER_HEARTBEAT     = float(os.getenv("WORKER_HEARTBEAT_SECONDS", 10))
+WORKER_METRICS_PORT  = int(os.getenv("WORKER_METRICS_PORT", 0))         # worker i serves /metrics on port + i; 0 = off
+WORKER_SHUTDOWN_WAIT = float(os.getenv("WORKER_SHUTDOWN_SECONDS", 30))  # let running jobs finish on stop
+
+
+async def run_worker(name: str, concurrency: int = WORKER_CONCURRENCY, stop: asyncio.Event | None = None):
+    """Claim and run jobs until `stop` is set, then wait for the running ones."""
+    from core.job_queue import get_queue
+    from core.job_store import push_event
+    from core.pipeline import run_pipeline
+    from utils import syntax_validator
+
+    queue   = get_queue()
+    stop    = stop or asyncio.Event()
+    running: dict[str, asyncio.Task] = {}
+    syntax_validator.warm_up()
+
+    def lost(job_id: str, requeued: bool):
+        # Every job that loses its worker gets an event — SSE clients must never wait on a dead job
+        if requeued:
+            log.warning(f"Job {job_id} lost its worker — re-queued")
+            push_event(job_id, "progress", {"step": "fetch", "pct": 0, "file": "Worker stopped — restarting the conversion..."})
+        else:
+            log.warning(f"Job {job_id} lost its worker too often — failed")
+            push_event(job_id, "error", {"message": "The worker running this conversion stopped. Please retry.", "recoverable": True})
+
+    async def beat():
+        while True:
+            await asyncio.sleep(WORKER_HEARTBEAT)
+            try:
+                queue.heartbeat(list(running))
+                requeued, dropped = queue.reap_stale()
+                for job_id in requeued:
+                    lost(job_id, True)
+                for job_id in dropped:
+                    lost(job_id, False)
+            except Exception:
+                log.exception(f"Worker {name} heartbeat failed")
+
+    async def run(job_id: str, payload: dict):
+        cancelled = False
+        try:
+            await run_pipeline(job_id, **payload)
+        except asyncio.CancelledError:
+            cancelled = True   # stopping took longer than WORKER_SHUTDOWN_WAIT
+            raise
+        finally:
+            running.pop(job_id, None)
+            if cancelled:
+                lost(job_id, queue.release(job_id))
+            else:
+                queue.finish(job_id)
+
+    heartbeat = asyncio.create_task(beat())
+    log.info(f"Worker {name} started — {concurrency} jobs at a time")
+    try:
+        while not stop.is_set():
+            claimed = queue.claim(name) if len(running) < concurrency else None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=WORKER_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job_id, payload = claimed
+            log.info(f"Worker {name} claimed job {job_id}")
+            running[job_id] = asyncio.create_task(run(job_id, payload))
+        if running:
+            log.info(f"Worker {name} stopping — waiting for {len(running)} jobs")
+            _, unfinished = await asyncio.wait(list(running.values()), timeout=WORKER_SHUTDOWN_WAIT)
+            for task in unfinished:
+                task.cancel()   # re-queued (or failed) by run()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+    finally:
+        heartbeat.cancel()
+        syntax_validator.shutdown()
+
+
+def _serve_metrics(port: int):
+    from core import metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = metrics.render().encode()
+            self.send_response(200 if self.path.startswith("/metrics") else 404)
+            self.send_header("content-type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def _process_main(index: int, concurrency: int, llm_limit: int):
+    """Entry point of one worker process."""
+    # Before core.llm is imported — it reads the limits once
+    os.environ["LLM_LIMIT_MAX"] = str(llm_limit)
+    os.environ["MAX_PARALLEL"]  = str(min(int(os.getenv("MAX_PARALLEL", 5)), llm_limit))
+    name = f"{socket.gethostname()}-{os.getpid()}"
+    if WORKER_METRICS_PORT:
+        _serve_metrics(WORKER_METRICS_PORT + index)
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, stop.set)
+        await run_worker(name, concurrency, stop)
+
+    asyncio.run(main())
+
+
+def start_workers(count: int, concurrency: int = WORKER_CONCURRENCY) -> list[multiprocessing.Process]:
+    """Start `count` worker processes that together stay within LLM_LIMIT_MAX concurrent LLM calls."""
+    budget = int(float(os.getenv("LLM_LIMIT_MAX", 50)))
+    if count > budget:
+        # Every process needs at least one LLM slot
+        log.warning(f"Starting {budget} pipeline workers, not {count}: LLM_LIMIT_MAX={budget} is shared between them")
+        count = budget
+    # spawn: a worker must not inherit the API's event loop, threads or sockets
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(target=_process_main, args=(i, concurrency, budget // count), name=f"pipeline-worker-{i}")
+        for i in range(count)
+    ]
+    for proc in procs:
+        proc.start()
+    return procs
+
+
+def stop_workers(procs: list[multiprocessing.Process]):
+    for proc in procs:
+        if proc.is_alive():
+            proc.terminate()   # SIGTERM: stop claiming, finish running jobs
+    for proc in procs:
+        proc.join(WORKER_SHUTDOWN_WAIT + 5)
+        if proc.is_alive():
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PIPELINE_WORKERS", 2)) or 1, help="worker processes")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs per process")
+    args = parser.parse_args()
+
+    from core.job_store import JOB_STORE
+    if JOB_STORE != "sqlite":
+        sys.exit("Workers need JOB_STORE=sqlite (shared with the API)")
+
+    procs = start_workers(args.workers, args.concurrency)
+    print(f"Started {len(procs)} pipeline workers ({args.concurrency} jobs each) — Ctrl+C to stop")
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        stop_workers(procs)
+
+
+if __name__ == "__main__":
+    main()
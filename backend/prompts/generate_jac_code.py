@@ -1,10 +1,44 @@
+import os
+
+PLAN_MAX_CHARS = int(os.getenv("PLAN_PROMPT_MAX_CHARS", 12000))   # plan JSON kept in the cached prefix
+
+
+def generate_jac_code_prefix(plan_json: str) -> str:
+    """
+    The part of every conversion prompt that is identical across the files
+    of a job — rules first (shared by every job), then the plan. Sent as a
+    cacheable prefix, so it must not depend on the file being converted.
+    """
+    return f"""You are an expert Jac/Jaseci developer.
+You convert Python source files to idiomatic Jac code, one file per request.
+
+Jac conversion rules:
+- Use `node` for data models (NOT Python classes)
+- Use `walker` for workflows and business logic
+- Use `has` for node fields with types and defaults
+- Use `can ... with NodeType entry` for walker abilities
+- Use `edge` for typed relationships between nodes
+- Use `visit [-->]` to traverse the graph
+- Use `import:py` to call Python utility functions
+- Use `by LLM()` only for AI inference tasks
+- Do NOT use Python class syntax inside .jac files
+- Every walker must have at least one `can` ability
+
+Return ONLY valid Jac code. No markdown fences, no explanation.
+
+OSP mapping plan for this repository:
+{plan_json[:PLAN_MAX_CHARS]}"""
+
+
 def generate_jac_code_prompt(
     file_path: str,
     role: str,
     original_code: str,
-    plan_json: str,
-    previous_error: str = ""
+    previous_error: str = "",
+    symbol_table: list | None = None,
+    part: tuple[int, int] | None = None,
 ) -> str:
+    """The per-file part of a conversion prompt; follows generate_jac_code_prefix()."""
     error_section = ""
     if previous_error:
         error_section = f"""
@@ -12,30 +46,21 @@ A previous conversion attempt failed with this error:
 {previous_error}
 Fix this specific error in your response.
 """
-    return f"""You are an expert Jac/Jaseci developer.
-Convert the Python source file below to idiomatic Jac code.
-
-OSP mapping plan:
-{plan_json[:800]}
+    chunk_section = ""
+    if part:
+        chunk_section = f"""
+This is part {part[0]} of {part[1]} of a large file. Convert ONLY the code shown;
+the other parts are converted separately. Top-level symbols of the whole file:
+{chr(10).join(symbol_table or [])}
+"""
+    return f"""Convert the Python source file below to idiomatic Jac code.
 
 File: {file_path}
 Role: {role}
-{error_section}
+{chunk_section}{error_section}
 Source code:
 ```python
 {original_code}
 ```
 
-Jac conversion rules:
-- Use `node` for data models (NOT Python classes)
-- Use `walker` for workflows and business logic
-- Use `has` for node fields with types and defaults
-- Use `can ... with NodeType entry` for walker abilities
-- Use `edge` for typed relationships between nodes
-- Use `visit [-->]` to traverse the graph
-- Use `import:py` to call Python utility functions
-- Use `by LLM()` only for AI inference tasks
-- Do NOT use Python class syntax inside .jac files
-- Every walker must have at least one `can` ability
-
-Return ONLY valid Jac code. No markdown fences, no explanation."""
\ No newline at end of file
+Return ONLY valid Jac code. No markdown fences, no explanation."""
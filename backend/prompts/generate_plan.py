@@ -1,34 +1,49 @@
 import json
 
 
-def generate_plan_prompt(repo_name: str, files: list) -> str:
-    summaries = [
-        {
-            "path":    f["path"],
-            "role":    f.get("role", "util"),
-            "snippet": f["content"][:300]
-        }
-        for f in files
-    ]
+def generate_plan_prompt(repo_name: str, files: list, analysis: dict | None = None) -> str:
+    modules = (analysis or {}).get("modules", {})
+    summaries = []
+    for f in files:
+        static = modules.get(f["path"])
+        if static is None:
+            summaries.append({"path": f["path"], "role": f.get("role", "util"), "snippet": f["content"][:300]})
+        else:
+            # Pre-digested structure instead of raw source
+            summaries.append({
+                "path":    f["path"],
+                "role":    f.get("role", "util"),
+                "imports": static["imports"],
+                "classes": [
+                    {"name": c["name"], "bases": c["bases"], "fields": c["fields"]}
+                    for c in static["classes"]
+                ],
+            })
+
+    edge_hint = ""
+    if analysis and analysis.get("edges"):
+        edge_hint = f"""
+Candidate edges found by static analysis (class field → class):
+{json.dumps([{k: e[k] for k in ("from_node", "to_node", "field")} for e in analysis["edges"]])}
+"""
+
     return f"""You are a Jac/Jaseci OSP architect.
 Given these Python source files from repo "{repo_name}", produce a JSON mapping plan
 for converting to idiomatic Jac/Jaseci.
 
 Files:
-{json.dumps(summaries, indent=2)}
-
+{json.dumps(summaries, separators=(",", ":"))}
+{edge_hint}
 Return a JSON object with exactly these keys:
 {{
   "nodes":   [{{"original_class": "str", "jac_node": "str", "fields": ["str"]}}],
   "walkers": [{{"original": "str", "jac_walker": "str", "purpose": "str"}}],
-  "edges":   [{{"from_node": "str", "to_node": "str", "edge_name": "str"}}],
-  "order":   ["str"]
+  "edges":   [{{"from_node": "str", "to_node": "str", "edge_name": "str"}}]
 }}
 
 Rules:
 - Data classes / models → Jac nodes
 - Route handlers / business logic → Jac walkers
 - Object relationships → Jac edges
-- order: list file paths with dependencies first
 
-Respond with ONLY valid JSON. No explanation, no markdown."""
\ No newline at end of file
+Respond with ONLY valid JSON. No explanation, no markdown."""
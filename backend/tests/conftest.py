@@ -0,0 +1,75 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _canned_handler(routes: dict, paths: list) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            paths.append(path)
+            status, body = routes.get(path, (404, b""))
+            self.send_response(status)
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+@pytest.fixture
+def http_server():
+    """
+    Start local HTTP servers for the test. Call it with {path: (status, body)}
+    for canned GET responses — requests are recorded in `.paths` — or with a
+    request handler class, and get the base URL back.
+    """
+    servers = []
+
+    def start(routes) -> str:
+        handler = routes if isinstance(routes, type) else _canned_handler(routes, start.paths)
+        server  = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    start.paths = []
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def fake_llm(http_server, monkeypatch, tmp_path):
+    """
+    Point llm() at bench/fake_llm.py's Messages API stand-in, served by
+    `http_server`. Call it with the limiter's starting limit and FakeLLM
+    options; returns the FakeLLM state. The response cache is a fresh one.
+    """
+    from bench.fake_llm import FakeLLM
+    from core import llm as llm_module
+    from core import llm_cache
+
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path / "llm-cache"))
+    monkeypatch.setattr(llm_cache, "_conn", None)
+
+    def start(initial_limit: int = 5, **options) -> FakeLLM:
+        state = FakeLLM(**options)
+        monkeypatch.setenv("ANTHROPIC_BASE_URL", http_server(state.handler()))
+        monkeypatch.setattr(llm_module, "API_KEY", "test")
+        monkeypatch.setattr(llm_module, "MAX_PARALLEL", initial_limit)
+        monkeypatch.setattr(llm_module, "_limiter", None)
+        monkeypatch.setattr(llm_module, "_client", None)
+        return state
+
+    return start
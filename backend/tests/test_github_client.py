@@ -0,0 +1,53 @@
+import io
+import tarfile
+
+import pytest
+
+from utils import github_client
+
+FILES = {
+    "app/models.py":         "class Todo:\n    pass\n",
+    "app/routes.py":         "from app.models import Todo\n",
+    "app/tests/test_app.py": "def test_x():\n    pass\n",
+    "setup.py":              "from setuptools import setup\n",
+    "README.md":             "# demo\n",
+}
+
+
+def _tarball(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w:gz") as tar:
+        for path, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(f"octo-demo-abc1234/{path}")   # GitHub's archive prefix
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@pytest.fixture
+def tarball_api(http_server, monkeypatch):
+    base = http_server({"/repos/octo/demo/tarball": (200, _tarball(FILES))})
+    monkeypatch.setattr(github_client, "GITHUB_API_URL", base)
+    monkeypatch.setattr(github_client, "FETCH_MODE", "tarball")
+    return http_server
+
+
+def test_tarball_fetch_yields_filtered_python_files(tarball_api):
+    files = github_client.fetch_repo_files("https://github.com/octo/demo")
+
+    assert {f["path"]: f["content"] for f in files} == {
+        "app/models.py": FILES["app/models.py"],
+        "app/routes.py": FILES["app/routes.py"],
+    }
+    assert tarball_api.paths == ["/repos/octo/demo/tarball"]   # one request for the whole repo
+
+
+def test_tarball_fetch_stops_at_limit(tarball_api, monkeypatch):
+    monkeypatch.setenv("MAX_FILES", "1")
+    assert len(github_client.fetch_repo_files("octo/demo")) == 1
+
+
+def test_tarball_fetch_missing_repo(tarball_api):
+    with pytest.raises(ValueError, match="not found"):
+        github_client.fetch_repo_files("octo/missing")
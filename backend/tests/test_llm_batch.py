@@ -0,0 +1,55 @@
+import json
+import asyncio
+
+from core import llm_batch as batch_module
+from core.llm import _request_key, llm
+from core.llm_cache import get_cached, put_cached
+
+
+def _echo(prompt: str) -> str:
+    return "answer: " + json.loads(prompt)[0]["content"]
+
+
+def test_batch_answers_in_request_order_and_fills_cache(fake_llm, monkeypatch):
+    state = fake_llm(reply=_echo, batch_latency=0.2)
+    monkeypatch.setattr(batch_module, "BATCH_POLL_SECONDS", 0.05)
+    monkeypatch.setattr(batch_module, "BATCH_MAX_REQUESTS", 2)
+    prompts = {name: f"convert {name}" for name in ["models.py", "api.py", "cli.py", "db.py", "util.py"]}
+    put_cached(_request_key("convert cli.py", None, 0.2, 4096), "answer: cached")
+
+    out = asyncio.run(batch_module.llm_batch(prompts))
+
+    assert list(out) == list(prompts)
+    assert out["cli.py"] == "answer: cached"
+    assert all(out[name] == f"answer: convert {name}" for name in prompts if name != "cli.py")
+    assert sum(len(b["requests"]) for b in state.batches.values()) == 4
+    assert len(state.batches) == 2
+    for name in ["models.py", "api.py", "db.py", "util.py"]:
+        assert get_cached(_request_key(f"convert {name}", None, 0.2, 4096)) == f"answer: convert {name}"
+
+
+def test_failed_batch_requests_are_not_cached(fake_llm, monkeypatch):
+    fake_llm(batch_latency=0, error_rate=1.0)
+    monkeypatch.setattr(batch_module, "BATCH_POLL_SECONDS", 0.05)
+
+    out = asyncio.run(batch_module.llm_batch({"a": "convert a.py"}))
+
+    assert isinstance(out["a"], batch_module.BatchError)
+    assert get_cached(_request_key("convert a.py", None, 0.2, 4096)) is None
+
+
+def test_batch_and_online_calls_share_cache_entries(fake_llm, monkeypatch):
+    state = fake_llm(reply=_echo, latency=0, batch_latency=0)
+    monkeypatch.setattr(batch_module, "BATCH_POLL_SECONDS", 0.05)
+    prefix = "rules and plan"
+
+    async def run():
+        online = await llm("convert a.py", prefix=prefix)
+        batch  = await batch_module.llm_batch({"a": "convert a.py", "b": "convert b.py"}, prefix=prefix)
+        return online, batch, await llm("convert b.py", prefix=prefix)
+
+    online, batch, again = asyncio.run(run())
+    assert batch["a"] == online
+    assert again == batch["b"]
+    assert [len(b["requests"]) for b in state.batches.values()] == [1]
+    assert state.counts["ok"] == 1
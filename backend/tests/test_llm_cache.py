@@ -0,0 +1,38 @@
+import asyncio
+
+from core import llm_cache
+from core.llm import llm, _request_key
+from core.llm_cache import get_cached, put_cached
+
+
+def _stored_bytes() -> int:
+    return llm_cache._get_conn().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_running_size_follows_writes_and_eviction(monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_cache, "_conn", None)
+    monkeypatch.setattr(llm_cache, "CACHE_MAX_BYTES", 250)
+
+    for i in range(3):
+        put_cached(f"k{i}", "x" * 100)
+    assert get_cached("k0") is None   # least recently used, evicted at 300 bytes
+    put_cached("k1", "y" * 40)        # replacing an entry frees its old size
+    assert llm_cache.cache_stats()["bytes"] == _stored_bytes() == 140
+
+    monkeypatch.setattr(llm_cache, "_conn", None)   # reopening re-reads the total once
+    assert llm_cache.cache_stats()["bytes"] == 140
+
+
+def test_only_accepted_answers_are_cached(fake_llm):
+    fake_llm(latency=0)
+
+    async def run():
+        await llm("rejected", accept=lambda text: False)
+        await llm("uncached", use_cache=False)
+        await llm("accepted", accept=lambda text: "node" in text)
+
+    asyncio.run(run())
+    assert get_cached(_request_key("rejected", None, 0.2, 4096)) is None
+    assert get_cached(_request_key("uncached", None, 0.2, 4096)) is None
+    assert get_cached(_request_key("accepted", None, 0.2, 4096)) is not None
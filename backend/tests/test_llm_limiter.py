@@ -0,0 +1,51 @@
+import asyncio
+
+from core import llm as llm_module
+from core import llm_limiter
+
+
+async def _calls(n: int, tag: str):
+    await asyncio.gather(*(llm_module.llm(f"{tag} {i}", use_cache=False) for i in range(n)))
+
+
+def test_limit_backs_off_on_429_then_recovers_under_saturation(fake_llm):
+    server = fake_llm(16, latency=0.02, capacity=4, retry_after=0.1)
+
+    async def scenario():
+        await _calls(60, "capacity")
+        after_cut = llm_module.limiter_state()
+        server.capacity = 0          # the provider frees up; only saturated successes may grow the limit
+        await _calls(300, "free")
+        return after_cut, llm_module.limiter_state()
+
+    after_cut, recovered = asyncio.run(scenario())
+
+    assert server.counts["429"] > 0
+    assert after_cut["decreases"] >= 1
+    assert after_cut["limit_exact"] < 16
+    assert recovered["limit_exact"] > after_cut["limit_exact"] + 1
+    assert recovered["in_flight"] == 0
+
+
+def test_limit_backs_off_on_529(fake_llm, monkeypatch):
+    monkeypatch.setattr(llm_limiter, "BACKOFF_BASE", 0.05)   # 529s carry no retry-after
+    server = fake_llm(8, latency=0.01, retry_after=0.1, overload_rate=0.2)
+
+    asyncio.run(_calls(40, "overloaded"))
+    state = llm_module.limiter_state()
+
+    assert server.counts["529"] > 0
+    assert state["rate_limited"] == server.counts["529"]
+    assert state["decreases"] >= 1
+    assert state["limit_exact"] < 8
+
+
+def test_limit_does_not_grow_when_not_saturated(fake_llm):
+    fake_llm(8, latency=0.01)
+
+    async def sequential():
+        for i in range(15):
+            await llm_module.llm(f"one at a time {i}", use_cache=False)
+
+    asyncio.run(sequential())
+    assert llm_module.limiter_state()["limit_exact"] == 8
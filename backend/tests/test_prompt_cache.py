@@ -0,0 +1,28 @@
+import asyncio
+
+from core import llm as llm_module
+from core.llm import llm, job_token_usage, request_params
+
+
+def test_short_prefix_is_sent_without_cache_control(monkeypatch):
+    monkeypatch.setattr(llm_module, "PROMPT_CACHE_MIN_TOKENS", 2048)
+
+    short = request_params("convert a.py", "rules " * 100, 0.2, 4096)
+    long  = request_params("convert a.py", "rules " * 2000, 0.2, 4096)
+
+    assert "cache_control" not in short["system"][0]
+    assert long["system"][0]["cache_control"] == {"type": "ephemeral"}
+
+
+def test_long_prefix_is_read_from_the_prompt_cache(fake_llm):
+    fake_llm(latency=0)
+    prefix = "Jac conversion rules. " * 500   # ~2750 tokens at 4 chars each
+
+    async def run():
+        for name in ("a.py", "b.py", "c.py"):
+            await llm(f"convert {name}", prefix=prefix, use_cache=False)
+        return job_token_usage(None, finished=True)
+
+    usage = asyncio.run(run())
+    assert usage["cache_creation_input_tokens"] == len(prefix) // 4
+    assert usage["cache_read_input_tokens"] == 2 * (len(prefix) // 4)
@@ -0,0 +1,138 @@
+import os
+import subprocess
+
+import pytest
+
+from utils import repo_sources
+from utils.repo_sources import GitHubSource, GitSource, LocalDirSource, open_source
+
+FILES = {
+    "app/models.py":        "class Todo:\n    pass\n",
+    "app/routes.py":        "from app.models import Todo\n",
+    "tests/test_models.py": "def test_todo():\n    pass\n",
+    "notes.txt":            "not python\n",
+}
+
+
+def _write(root, files: dict):
+    for path, content in files.items():
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_text(content)
+
+
+def _run_git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+                   cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path, monkeypatch):
+    """A work tree with two commits: tag v1 has the first version of app/models.py."""
+    monkeypatch.setattr(repo_sources, "GIT_CACHE_DIR", str(tmp_path / "mirrors"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _write(repo, FILES)
+    _run_git(repo, "init", "--quiet", "--initial-branch=main")
+    _run_git(repo, "add", "-A")
+    _run_git(repo, "commit", "--quiet", "-m", "first")
+    _run_git(repo, "tag", "v1")
+    _write(repo, {"app/models.py": "class Todo:\n    done = False\n"})
+    _run_git(repo, "commit", "--quiet", "-am", "second")
+    return repo
+
+
+def _files(source, limit: int = 50) -> dict:
+    return {f["path"]: f["content"] for f in source.iter_files(limit)}
+
+
+def test_local_directory(tmp_path):
+    _write(tmp_path, FILES)
+    source = open_source(str(tmp_path))
+
+    assert isinstance(source, LocalDirSource)
+    assert _files(source) == {"app/models.py": FILES["app/models.py"], "app/routes.py": FILES["app/routes.py"]}
+    assert len(_files(source, limit=1)) == 1
+
+
+def test_local_git_repo_at_ref(git_repo):
+    head = open_source(f"git+{git_repo}")
+    v1   = open_source(f"git+{git_repo}#v1")
+
+    assert isinstance(head, GitSource)
+    assert _files(head)["app/models.py"] == "class Todo:\n    done = False\n"
+    assert _files(v1) == {"app/models.py": FILES["app/models.py"], "app/routes.py": FILES["app/routes.py"]}
+    assert head.key != v1.key
+
+
+def test_git_file_url_is_fetched_into_a_mirror(git_repo, tmp_path):
+    source = open_source(f"git+file://{git_repo}#v1")
+
+    assert _files(source)["app/models.py"] == FILES["app/models.py"]
+    assert len(os.listdir(tmp_path / "mirrors")) == 1
+    assert _files(open_source(f"git+file://{git_repo}#main"))["app/models.py"] == "class Todo:\n    done = False\n"
+
+
+@pytest.mark.parametrize("ref", [
+    "--upload-pack=touch {marker}",
+    "-c",
+    "main~1",
+    "HEAD:app/models.py",
+    "v1..main",
+    "bad ref",
+])
+def test_malicious_refs_are_rejected(git_repo, tmp_path, ref):
+    marker = tmp_path / "pwned"
+    for target in (f"git+file://{git_repo}#{ref}", f"git+{git_repo}#{ref}"):
+        with pytest.raises(ValueError, match="Invalid git ref"):
+            list(open_source(target.format(marker=marker)).iter_files(50))
+    assert not marker.exists()
+
+
+def test_option_like_git_location_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Invalid git location"):
+        open_source(f"git+--upload-pack=touch {tmp_path / 'pwned'}")
+
+
+def test_git_transport_is_restricted(tmp_path):
+    marker = tmp_path / "pwned"
+    mirror = tmp_path / "mirror.git"
+    repo_sources._git(None, "init", "--bare", "--quiet", str(mirror))
+
+    with pytest.raises(ValueError, match="fetch failed"):
+        repo_sources._git(str(mirror), "fetch", f"ext::sh -c touch% {marker}", "HEAD")
+    assert not marker.exists()
+
+
+@pytest.mark.parametrize("target", ["/no/such/dir", "./no-such-dir", "../no-such-dir", "~/no-such-dir"])
+def test_missing_local_path_is_not_sent_to_github(target):
+    with pytest.raises(ValueError, match="No such directory"):
+        open_source(target)
+
+
+def test_home_relative_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    _write(tmp_path / "proj", FILES)
+
+    assert isinstance(open_source("~/proj"), LocalDirSource)
+    assert "app/models.py" in _files(open_source("~/proj"))
+
+
+@pytest.mark.parametrize("target", ["/", "/no/such/dir", "~", "git+/", "git+file:///srv/repo#main", "https://git.example.com/r.git"])
+def test_local_sources_off_never_touch_the_filesystem(target, monkeypatch):
+    def probe(*args):
+        raise AssertionError("filesystem probed")
+
+    for name in ("isdir", "isfile", "exists", "expanduser"):
+        monkeypatch.setattr(os.path, name, probe)
+    with pytest.raises(ValueError, match="Only GitHub URLs"):
+        open_source(target, allow_local=False)
+    assert open_source("octo/demo", allow_local=False).key == "octo/demo"
+
+
+def test_github_targets():
+    assert open_source("https://github.com/octo/demo").key == "octo/demo"
+    assert open_source("octo/demo.git").key == "octo/demo"
+    assert isinstance(open_source("github.com/octo/demo/tree/main"), GitHubSource)
+    with pytest.raises(ValueError, match="Invalid GitHub URL"):
+        open_source("not a repo")
@@ -0,0 +1,129 @@
+import os
+import ast
+
+# Splits large Python files on top-level class/function boundaries so each
+# piece can be converted on its own, and stitches the Jac output back together.
+
+CHUNK_THRESHOLD_LINES = int(os.getenv("CHUNK_THRESHOLD_LINES", 400))  # files above this are chunked
+CHUNK_MAX_LINES       = int(os.getenv("CHUNK_MAX_LINES", 250))        # target size of one chunk
+
+
+def _start(node) -> int:
+    """First line of a top-level statement, including its decorators (1-based)."""
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def _signature(node) -> str:
+    if isinstance(node, ast.ClassDef):
+        bases   = ", ".join(ast.unparse(b) for b in node.bases)
+        fields  = [s.target.id for s in node.body if isinstance(s, ast.AnnAssign) and isinstance(s.target, ast.Name)]
+        methods = [s.name for s in node.body if isinstance(s, (ast.FunctionDef, ast.AsyncFunctionDef))]
+        line    = f"class {node.name}({bases})" if bases else f"class {node.name}"
+        if fields:
+            line += f" fields: {', '.join(fields)}"
+        if methods:
+            line += f" methods: {', '.join(methods)}"
+        return line
+    prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+    return f"{prefix} {node.name}({ast.unparse(node.args)})"
+
+
+def symbol_table(tree: ast.Module) -> list[str]:
+    """One line per top-level class/function — the context every chunk sees."""
+    return [
+        _signature(node) for node in tree.body
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+
+
+def split_source(source: str, max_lines: int = CHUNK_MAX_LINES) -> list[dict]:
+    """
+    Split `source` into chunks of whole top-level statements, each roughly
+    `max_lines` long. The module preamble (imports, constants) is prepended
+    to every chunk so names resolve. Comments between statements stay with
+    the statement that follows them. A single definition larger than
+    `max_lines` stays in one chunk.
+    Returns [{"source", "symbols": [str]}] — one chunk if the file does not parse.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return [{"source": source, "symbols": []}]
+
+    lines   = source.splitlines(keepends=True)
+    symbols = symbol_table(tree)
+    defs    = [n for n in tree.body if isinstance(n, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))]
+    if len(defs) < 2:
+        return [{"source": source, "symbols": symbols}]
+
+    preamble = [n for n in tree.body if n.end_lineno < _start(defs[0])]
+    head     = "".join(lines[: preamble[-1].end_lineno]) if preamble else ""
+
+    # Group the remaining statements (definitions plus anything between them)
+    body   = tree.body[len(preamble):]
+    groups, current, size = [], [], 0
+    for node in body:
+        span = node.end_lineno - _start(node) + 1
+        if current and size + span > max_lines:
+            groups.append(current)
+            current, size = [], 0
+        current.append(node)
+        size += span
+    if current:
+        groups.append(current)
+
+    # Each chunk runs from the end of the previous one, so no comment or blank
+    # line between statements is lost; the last one runs to the end of the file
+    chunks, end = [], preamble[-1].end_lineno if preamble else 0
+    for i, group in enumerate(groups):
+        stop = len(lines) if i == len(groups) - 1 else group[-1].end_lineno
+        text = "".join(lines[end:stop]).strip("\n") + "\n"
+        end  = stop
+        chunks.append({"source": f"{head}\n{text}" if head else text, "symbols": symbols})
+    return chunks
+
+
+def _is_import(line: str) -> bool:
+    return line.startswith(("import ", "import:", "include ", "include:"))
+
+
+def _statement_end(lines: list[str], i: int) -> int:
+    """Index after the import statement starting at lines[i] — through its closing brace if it has one."""
+    depth, opened = 0, False
+    for j in range(i, len(lines)):
+        depth  += lines[j].count("{") - lines[j].count("}")
+        opened  = opened or "{" in lines[j]
+        if depth > 0:
+            continue
+        # `import from x` may put its brace on the next line
+        following = next((line.strip() for line in lines[j + 1:] if line.strip()), "")
+        if not opened and not lines[j].rstrip().endswith(";") and following.startswith("{"):
+            continue
+        return j + 1
+    return len(lines)
+
+
+def stitch(parts: list[str]) -> str:
+    """
+    Join converted chunks into one .jac file, hoisting whole import statements
+    (multi-line `import from x { ... }` included) and dropping duplicates.
+    """
+    imports, seen, bodies = [], set(), []
+    for part in parts:
+        lines, body, i = part.splitlines(), [], 0
+        while i < len(lines):
+            if not _is_import(lines[i].strip()):
+                body.append(lines[i])
+                i += 1
+                continue
+            end       = _statement_end(lines, i)
+            statement = "\n".join(line.rstrip() for line in lines[i:end]).strip()
+            key       = " ".join(statement.split())
+            if key not in seen:
+                seen.add(key)
+                imports.append(statement)
+            i = end
+        bodies.append("\n".join(body).strip())
+    sections = ["\n".join(imports)] if imports else []
+    return "\n\n".join(sections + [b for b in bodies if b]) + "\n"
@@ -1,4 +1,11 @@
 import os
+import re
+import json
+import logging
+import tarfile
+import requests
+from typing import Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from github import Github
 from github.GithubException import UnknownObjectException
 
@@ -7,48 +14,242 @@ MAX_FILES  = int(os.getenv("MAX_FILES", 50))  # fetch limit; pipeline caps separ
 SKIP_DIRS  = {"__pycache__", ".git", "tests", "test", "migrations", "venv", ".venv", "node_modules", "dist", "build"}
 SKIP_FILES = {"setup.py", "conftest.py", "manage.py"}
 
+# tarball: one archive download streamed through the filters
+# trees:    HEAD sha + one recursive tree call + concurrent blob downloads, cached per commit
+# contents: one Contents API request per directory + one per file
+FETCH_MODE        = os.getenv("GITHUB_FETCH_MODE", "tarball")
+GITHUB_API_URL    = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+FETCH_TIMEOUT     = int(os.getenv("GITHUB_FETCH_TIMEOUT", 60))
+FETCH_CONCURRENCY = int(os.getenv("GITHUB_FETCH_CONCURRENCY", 8))  # parallel blob downloads
+REPO_CACHE_DIR    = os.getenv("GITHUB_CACHE_DIR", "/tmp/repo2jac-cache/repos")
 
-def fetch_repo_files(github_url: str) -> list[dict]:
-    token = os.getenv("GITHUB_TOKEN", "")
-    g     = Github(token) if token else Github()
+log = logging.getLogger("github_client")
+
+# https://github.com/owner/repo[.git][/tree/...] or owner/repo
+_GITHUB_URL_RE = re.compile(
+    r"^(?:(?:https?://)?(?:www\.)?github\.com/(?P<owner>[A-Za-z0-9-]+)/(?P<repo>[A-Za-z0-9._-]+?)(?:\.git)?(?:/.*)?"
+    r"|(?P<short_owner>[A-Za-z0-9][A-Za-z0-9-]*)/(?P<short_repo>[A-Za-z0-9._-]+?)(?:\.git)?)$"
+)
 
-    clean = github_url.rstrip("/").replace(".git", "")
-    parts = clean.replace("https://github.com/", "").split("/")
 
-    if len(parts) < 2:
+def parse_github_url(github_url: str) -> tuple[str, str]:
+    match = _GITHUB_URL_RE.match(github_url.strip().rstrip("/"))
+    if not match:
         raise ValueError(f"Invalid GitHub URL: {github_url}")
+    return match["owner"] or match["short_owner"], match["repo"] or match["short_repo"]
+
+
+def fetch_repo_files(github_url: str) -> list[dict]:
+    return list(iter_repo_files(github_url))
 
-    owner, repo_name = parts[0], parts[1]
+
+def iter_repo_files(github_url: str, limit: int | None = None) -> Iterator[dict]:
+    """Yield {path, content} dicts as they are fetched, up to `limit` (default MAX_FILES)."""
+    owner, repo_name = parse_github_url(github_url)
+    if limit is None:
+        limit = int(os.getenv("MAX_FILES", 50))
+
+    if FETCH_MODE == "tarball":
+        yield from _iter_tarball(owner, repo_name, limit)
+        return
+    if FETCH_MODE == "trees":
+        yield from _iter_trees(owner, repo_name, limit)
+        return
+
+    token = os.getenv("GITHUB_TOKEN", "")
+    g     = Github(token) if token else Github()
 
     try:
         repo = g.get_repo(f"{owner}/{repo_name}")
     except UnknownObjectException:
         raise ValueError(f"Repo not found or is private: {owner}/{repo_name}")
 
-    files = []
-    _walk(repo, "", files)
-    return files[:MAX_FILES]
+    for i, f in enumerate(_walk(repo, "")):
+        if i >= limit:
+            return
+        yield f
 
 
-def _walk(repo, path: str, results: list):
+def _walk(repo, path: str) -> Iterator[dict]:
     try:
         contents = repo.get_contents(path)
     except Exception:
         return
     for item in contents:
-        if len(results) >= int(os.getenv("MAX_FILES", 50)):
-            return
         if item.type == "dir":
             if item.name not in SKIP_DIRS:
-                _walk(repo, item.path, results)
+                yield from _walk(repo, item.path)
         elif item.type == "file" and _should_include(item.name):
             try:
                 content = item.decoded_content.decode("utf-8", errors="replace")
-                results.append({"path": item.path, "content": content})
+                yield {"path": item.path, "content": content}
             except Exception:
                 pass
 
 
+def _api_headers() -> dict:
+    token   = os.getenv("GITHUB_TOKEN", "")
+    headers = {"Accept": "application/vnd.github+json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def _iter_tarball(owner: str, repo_name: str, limit: int) -> Iterator[dict]:
+    """
+    Download the default-branch tarball in a single request and stream it
+    through the include/skip filters. Nothing is written to disk.
+    """
+    url   = f"{GITHUB_API_URL}/repos/{owner}/{repo_name}/tarball"
+    count = 0
+
+    with requests.get(url, headers=_api_headers(), stream=True, timeout=FETCH_TIMEOUT) as resp:
+        if resp.status_code == 404:
+            raise ValueError(f"Repo not found or is private: {owner}/{repo_name}")
+        resp.raise_for_status()
+
+        with tarfile.open(fileobj=resp.raw, mode="r|gz") as tar:
+            for member in tar:
+                if count >= limit:
+                    break
+                if not member.isfile():
+                    continue
+                # Archive entries are prefixed with "{owner}-{repo}-{sha}/"
+                path = member.name.split("/", 1)[-1]
+                if not _should_include_path(path):
+                    continue
+                try:
+                    data = tar.extractfile(member).read()
+                except Exception:
+                    continue
+                count += 1
+                yield {"path": path, "content": data.decode("utf-8", errors="replace")}
+
+
+def _iter_trees(owner: str, repo_name: str, limit: int) -> Iterator[dict]:
+    """
+    Resolve the HEAD commit, list the whole tree in one call and download
+    matching blobs concurrently. Results are cached on disk per commit and
+    limit, so an unchanged repo costs one conditional (304) request and no
+    blob downloads. A fetch that lost any blob is not cached.
+    """
+    session = requests.Session()
+    session.headers.update(_api_headers())
+    base    = f"{GITHUB_API_URL}/repos/{owner}/{repo_name}"
+
+    sha    = _resolve_head_sha(session, base, owner, repo_name)
+    cached = _load_repo_cache(owner, repo_name, sha, limit)
+    if cached is not None:
+        log.info(f"Repo cache hit: {owner}/{repo_name}@{sha[:7]}")
+        yield from cached
+        return
+
+    resp = session.get(f"{base}/git/trees/{sha}", params={"recursive": "1"}, timeout=FETCH_TIMEOUT)
+    resp.raise_for_status()
+    tree = resp.json()
+    if tree.get("truncated"):
+        # Tree listing is capped for huge repos — the archive is still complete
+        log.warning(f"Tree for {owner}/{repo_name} truncated, falling back to tarball")
+        yield from _iter_tarball(owner, repo_name, limit)
+        return
+
+    blobs = [
+        item for item in tree.get("tree", [])
+        if item.get("type") == "blob" and _should_include_path(item["path"])
+    ][:limit]
+
+    def fetch_blob(item: dict):
+        try:
+            r = session.get(
+                f"{base}/git/blobs/{item['sha']}",
+                headers={"Accept": "application/vnd.github.raw"},
+                timeout=FETCH_TIMEOUT,
+            )
+            r.raise_for_status()
+            return {"path": item["path"], "content": r.content.decode("utf-8", errors="replace")}
+        except Exception:
+            return None
+
+    # Yield blobs in completion order; cache in tree order once all have landed
+    pool    = ThreadPoolExecutor(max_workers=FETCH_CONCURRENCY)
+    fetched = {}
+    try:
+        for future in as_completed([pool.submit(fetch_blob, item) for item in blobs]):
+            f = future.result()
+            if f is not None:
+                fetched[f["path"]] = f
+                yield f
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if len(fetched) < len(blobs):
+        # Never pin a partial file set to this commit — the next run retries
+        log.warning(f"{len(blobs) - len(fetched)} blob(s) of {owner}/{repo_name}@{sha[:7]} failed, not caching")
+        return
+    _save_repo_cache(owner, repo_name, sha, limit, [fetched[b["path"]] for b in blobs])
+
+
+def _resolve_head_sha(session: requests.Session, base: str, owner: str, repo_name: str) -> str:
+    # Conditional request: a 304 reuses the stored sha and is free against the rate limit
+    state_path = os.path.join(REPO_CACHE_DIR, f"{owner}__{repo_name}.head.json")
+    state = _read_json(state_path) or {}
+
+    headers = {"Accept": "application/vnd.github.sha"}
+    if state.get("etag") and state.get("sha"):
+        headers["If-None-Match"] = state["etag"]
+
+    resp = session.get(f"{base}/commits/HEAD", headers=headers, timeout=FETCH_TIMEOUT)
+    if resp.status_code == 304:
+        return state["sha"]
+    if resp.status_code in (404, 422):
+        raise ValueError(f"Repo not found or is private: {owner}/{repo_name}")
+    resp.raise_for_status()
+
+    sha = resp.text.strip()
+    if resp.headers.get("ETag"):
+        _write_json(state_path, {"etag": resp.headers["ETag"], "sha": sha})
+    return sha
+
+
+def _repo_cache_path(owner: str, repo_name: str, sha: str, limit: int) -> str:
+    # The limit is part of the key: a run with a higher MAX_FILES must not get a smaller cached set
+    return os.path.join(REPO_CACHE_DIR, f"{owner}__{repo_name}@{sha}.{limit}.json")
+
+
+def _load_repo_cache(owner: str, repo_name: str, sha: str, limit: int):
+    return _read_json(_repo_cache_path(owner, repo_name, sha, limit))
+
+
+def _save_repo_cache(owner: str, repo_name: str, sha: str, limit: int, files: list[dict]):
+    _write_json(_repo_cache_path(owner, repo_name, sha, limit), files)
+
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp_path, path)  # atomic — concurrent jobs never see a partial file
+    except OSError as e:
+        log.warning(f"Repo cache write failed: {e}")
+
+
+def _should_include_path(path: str) -> bool:
+    *dirs, filename = path.split("/")
+    if any(d in SKIP_DIRS for d in dirs):
+        return False
+    return _should_include(filename)
+
+
 def _should_include(filename: str) -> bool:
     if not filename.endswith(".py"):
         return False
@@ -0,0 +1,216 @@
+import ast
+import heapq
+
+# Static dependency analysis over fetched files: module import graph,
+# dependency-first conversion order and class-level edge candidates.
+
+
+def _module_name(path: str) -> str:
+    parts = path.removesuffix(".py").split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def _resolve(name: str, importer: str, known: dict) -> str | None:
+    """Map an imported dotted name to a repo path, trying the importer's packages as roots."""
+    pkg_parts = importer.split(".")[:-1]
+    for depth in range(len(pkg_parts), -1, -1):
+        candidate = ".".join(pkg_parts[:depth] + [name]) if name else ".".join(pkg_parts[:depth])
+        if candidate in known:
+            return known[candidate]
+    return None
+
+
+def _imports(tree: ast.Module, module: str, is_pkg: bool, known: dict) -> set[str]:
+    deps = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                target = _resolve(alias.name, module, known)
+                if target:
+                    deps.add(target)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                # Relative import: strip `level` components from the importer's package
+                base = module.split(".") if is_pkg else module.split(".")[:-1]
+                base = base[: len(base) - node.level + 1] if node.level > 1 else base
+                prefix = ".".join(base + ([node.module] if node.module else []))
+                candidates = [prefix] + [f"{prefix}.{a.name}" if prefix else a.name for a in node.names]
+                deps.update(known[c] for c in candidates if c in known)
+            elif node.module:
+                target = _resolve(node.module, module, known)
+                if target:
+                    deps.add(target)
+                for alias in node.names:   # `from pkg import submodule`
+                    sub = _resolve(f"{node.module}.{alias.name}", module, known)
+                    if sub:
+                        deps.add(sub)
+    return deps
+
+
+def _annotation_names(node) -> set[str]:
+    names = set()
+    for sub in ast.walk(node):
+        if isinstance(sub, ast.Name):
+            names.add(sub.id)
+        elif isinstance(sub, ast.Attribute):
+            names.add(sub.attr)
+        elif isinstance(sub, ast.Constant) and isinstance(sub.value, str):
+            names.add(sub.value.strip("'\""))   # forward references
+    return names
+
+
+def _classes(tree: ast.Module) -> list[dict]:
+    classes = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        fields = {}
+        for stmt in node.body:
+            if isinstance(stmt, ast.AnnAssign) and isinstance(stmt.target, ast.Name):
+                fields[stmt.target.id] = _annotation_names(stmt.annotation)
+            elif isinstance(stmt, ast.FunctionDef) and stmt.name == "__init__":
+                for sub in ast.walk(stmt):
+                    if (isinstance(sub, ast.AnnAssign) and isinstance(sub.target, ast.Attribute)
+                            and isinstance(sub.target.value, ast.Name) and sub.target.value.id == "self"):
+                        fields[sub.target.attr] = _annotation_names(sub.annotation)
+        classes.append({
+            "name":   node.name,
+            "bases":  [ast.unparse(b) for b in node.bases],
+            "fields": fields,
+        })
+    return classes
+
+
+def module_classes(source: str) -> list[dict]:
+    """Top-level classes of one file as {name, bases, fields}; [] if it does not parse."""
+    try:
+        classes = _classes(ast.parse(source))
+    except (SyntaxError, ValueError):
+        return []
+    for cls in classes:
+        cls["fields"] = sorted(cls["fields"])
+    return classes
+
+
+def _strongly_connected(nodes: list[str], graph: dict) -> list[list[str]]:
+    """Iterative Tarjan. SCCs come out dependencies-first."""
+    index, low, on_stack = {}, {}, set()
+    stack, sccs, counter = [], [], 0
+
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(graph[child]))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                scc = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    scc.append(member)
+                    if member == node:
+                        break
+                sccs.append(scc)
+    return sccs
+
+
+def analyze_imports(files: list[dict]) -> dict:
+    """
+    Parse every file's imports and top-level classes.
+    Returns {
+      "order":   [path, ...]              dependencies first, cycles kept together
+      "cycles":  [[path, ...], ...]       import cycles (collapsed SCCs)
+      "modules": {path: {"imports": [...], "classes": [...]}}
+      "edges":   [{"from_node", "to_node", "edge_name", "field"}]
+    }
+    Files that fail to parse are kept in fetch order with no dependencies.
+    """
+    position = {f["path"]: i for i, f in enumerate(files)}
+    known    = {_module_name(f["path"]): f["path"] for f in files}
+    graph    = {f["path"]: set() for f in files}
+    modules  = {}
+
+    for f in files:
+        try:
+            tree = ast.parse(f["content"])
+        except (SyntaxError, ValueError):
+            modules[f["path"]] = {"imports": [], "classes": []}
+            continue
+        is_pkg = f["path"].endswith("__init__.py")
+        deps   = _imports(tree, _module_name(f["path"]), is_pkg, known) - {f["path"]}
+        graph[f["path"]] = deps
+        modules[f["path"]] = {"imports": sorted(deps, key=position.get), "classes": _classes(tree)}
+
+    # Collapse cycles, then Kahn's algorithm over the condensation, stable by fetch order
+    sccs     = _strongly_connected([f["path"] for f in files], graph)
+    scc_of   = {p: i for i, scc in enumerate(sccs) for p in scc}
+    deps_of  = {i: {scc_of[d] for p in scc for d in graph[p]} - {i} for i, scc in enumerate(sccs)}
+    users_of = {i: set() for i in range(len(sccs))}
+    for i, deps in deps_of.items():
+        for d in deps:
+            users_of[d].add(i)
+    pending = {i: len(deps) for i, deps in deps_of.items()}
+    key     = {i: min(position[p] for p in scc) for i, scc in enumerate(sccs)}
+    ready   = [(key[i], i) for i, n in pending.items() if n == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        _, i = heapq.heappop(ready)
+        order.extend(sorted(sccs[i], key=position.get))
+        for user in users_of[i]:
+            pending[user] -= 1
+            if pending[user] == 0:
+                heapq.heappush(ready, (key[user], user))
+
+    # Class A with a field annotated as class B → candidate edge A → B
+    class_names = {c["name"] for m in modules.values() for c in m["classes"]}
+    edges, seen = [], set()
+    for path in order:
+        for cls in modules[path]["classes"]:
+            for field, refs in cls["fields"].items():
+                for target in sorted(refs & class_names - {cls["name"]}):
+                    if (cls["name"], target) in seen:
+                        continue
+                    seen.add((cls["name"], target))
+                    edges.append({
+                        "from_node": cls["name"],
+                        "to_node":   target,
+                        "edge_name": f"Has{target}",
+                        "field":     field,
+                    })
+
+    for m in modules.values():
+        for cls in m["classes"]:
+            cls["fields"] = sorted(cls["fields"])
+
+    return {
+        "order":   order,
+        "cycles":  [sorted(scc, key=position.get) for scc in sccs if len(scc) > 1],
+        "modules": modules,
+        "edges":   edges,
+    }
@@ -0,0 +1,215 @@
+import os
+import hashlib
+import logging
+import subprocess
+from typing import Iterator
+
+from utils.github_client import SKIP_DIRS, _should_include_path, iter_repo_files, parse_github_url
+
+log = logging.getLogger("repo_sources")
+
+# ── Config ────────────────────────────────────────────────────
+GIT_CACHE_DIR       = os.getenv("GIT_CACHE_DIR", "/tmp/repo2jac-cache/git")   # bare mirrors of remote git URLs
+GIT_TIMEOUT         = int(os.getenv("GIT_FETCH_TIMEOUT", 300))
+ALLOW_LOCAL_SOURCES = os.getenv("ALLOW_LOCAL_SOURCES", "0") == "1"            # API may read server paths / git URLs
+
+# Transports git may use for a target; everything else (ext::, fd::, …) is refused
+GIT_PROTOCOLS = ("file", "git", "http", "https", "ssh")
+
+
+class RepoSource:
+    """
+    Where a repo's files come from. Every source applies the same include/skip
+    rules as the GitHub fetcher and yields {path, content} lazily, up to `limit`.
+    """
+    kind = ""
+
+    def __init__(self, target: str):
+        self.target = target
+
+    @property
+    def key(self) -> str:
+        """Stable identity of the repo, used to find its previous result."""
+        raise NotImplementedError
+
+    def iter_files(self, limit: int) -> Iterator[dict]:
+        raise NotImplementedError
+
+
+class GitHubSource(RepoSource):
+    """The GitHub REST API (tarball, trees or contents — see GITHUB_FETCH_MODE)."""
+    kind = "github"
+
+    def __init__(self, target: str):
+        super().__init__(target)
+        parse_github_url(target)   # fail on anything that is not owner/repo before any request
+
+    @property
+    def key(self) -> str:
+        owner, repo_name = parse_github_url(self.target)
+        return f"{owner}/{repo_name}"
+
+    def iter_files(self, limit: int) -> Iterator[dict]:
+        yield from iter_repo_files(self.target, limit)
+
+
+class LocalDirSource(RepoSource):
+    """A directory on disk — a checkout, an unpacked archive, a fixture."""
+    kind = "local"
+
+    @property
+    def key(self) -> str:
+        return f"local:{os.path.realpath(self.target)}"
+
+    def iter_files(self, limit: int) -> Iterator[dict]:
+        if not os.path.isdir(self.target):
+            raise ValueError(f"Not a directory: {self.target}")
+        count = 0
+        for dirpath, dirnames, names in os.walk(self.target):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            for name in sorted(names):
+                full = os.path.join(dirpath, name)
+                path = os.path.relpath(full, self.target).replace(os.sep, "/")
+                if not _should_include_path(path) or not os.path.isfile(full):
+                    continue
+                if count >= limit:
+                    return
+                try:
+                    with open(full, "rb") as fh:
+                        content = fh.read().decode("utf-8", errors="replace")
+                except OSError:
+                    continue
+                count += 1
+                yield {"path": path, "content": content}
+
+
+class GitSource(RepoSource):
+    """
+    A git repository read with plumbing (ls-tree + cat-file --batch) — no
+    checkout. The target is a local repo (bare or not) or a remote URL, which
+    is fetched shallowly into a bare mirror under GIT_CACHE_DIR first.
+    """
+    kind = "git"
+
+    def __init__(self, target: str, ref: str = "HEAD"):
+        super().__init__(target)
+        if target.startswith("-"):
+            raise ValueError(f"Invalid git location: {target}")
+        self.ref = _check_ref(ref)
+
+    @property
+    def key(self) -> str:
+        location = self.target if _is_remote(self.target) else os.path.realpath(self.target)
+        return f"git:{location}@{self.ref}"
+
+    def _resolve(self) -> tuple[str, str]:
+        """(git dir, commit sha) for the ref."""
+        if not _is_remote(self.target):
+            return self.target, _git(self.target, "rev-parse", "--verify", "--end-of-options", f"{self.ref}^{{commit}}").strip()
+        mirror = os.path.join(GIT_CACHE_DIR, hashlib.sha1(self.target.encode()).hexdigest()[:16] + ".git")
+        if not os.path.isdir(mirror):
+            os.makedirs(GIT_CACHE_DIR, exist_ok=True)
+            _git(None, "init", "--bare", "--quiet", mirror)
+        # Only the requested commit's objects; reruns fetch just what changed
+        _git(mirror, "fetch", "--quiet", "--depth", "1", "--no-tags", "--end-of-options", self.target, self.ref)
+        return mirror, _git(mirror, "rev-parse", "--verify", "FETCH_HEAD^{commit}").strip()
+
+    def iter_files(self, limit: int) -> Iterator[dict]:
+        git_dir, commit = self._resolve()
+        listing = _git(git_dir, "ls-tree", "-r", "-z", "--full-tree", commit)
+        blobs = []
+        for entry in listing.split("\0"):
+            if not entry:
+                continue
+            meta, path = entry.split("\t", 1)
+            mode, kind, sha = meta.split()
+            if kind == "blob" and mode != "120000" and _should_include_path(path):   # skip symlinks
+                blobs.append((path, sha))
+        blobs = blobs[:limit]
+        log.info(f"git {self.target}@{commit[:7]}: {len(blobs)} files")
+
+        # One cat-file process streams every blob; read each just before it is yielded
+        proc = subprocess.Popen(
+            ["git", "-C", git_dir, "cat-file", "--batch"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        try:
+            for path, sha in blobs:
+                proc.stdin.write(f"{sha}\n".encode())
+                proc.stdin.flush()
+                header = proc.stdout.readline().split()
+                if len(header) < 3 or header[1] != b"blob":
+                    continue
+                data = proc.stdout.read(int(header[2]))
+                proc.stdout.read(1)   # trailing newline
+                yield {"path": path, "content": data.decode("utf-8", errors="replace")}
+        finally:
+            proc.stdin.close()
+            proc.kill()
+            proc.wait()
+
+
+def _git(git_dir: str | None, *args: str) -> str:
+    protocols = ["-c", "protocol.allow=never"] + [f for p in GIT_PROTOCOLS for f in ("-c", f"protocol.{p}.allow=always")]
+    cmd = ["git"] + protocols + (["-C", git_dir] if git_dir else []) + list(args)
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=GIT_TIMEOUT)
+    if result.returncode != 0:
+        raise ValueError(f"git {args[0]} failed: {result.stderr.strip() or result.returncode}")
+    return result.stdout
+
+
+def _check_ref(ref: str) -> str:
+    """A branch, tag or commit name — never an option or a revision expression."""
+    if not ref or ref.startswith("-") or subprocess.run(
+        ["git", "check-ref-format", "--allow-onelevel", ref], capture_output=True, timeout=GIT_TIMEOUT,
+    ).returncode != 0:
+        raise ValueError(f"Invalid git ref: {ref!r}")
+    return ref
+
+
+def _is_remote(target: str) -> bool:
+    return "://" in target or target.startswith("git@")
+
+
+def _is_bare_repo(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, "HEAD")) and os.path.isdir(os.path.join(path, "objects"))
+
+
+def _looks_local(target: str) -> bool:
+    """A target only a local or git source could serve — decided from the string alone."""
+    return (target.startswith(("git+", "/", "./", "../", "~"))
+            or _is_remote(target) and "github.com" not in target and target.rstrip("/").endswith(".git"))
+
+
+def open_source(target: str, allow_local: bool = True) -> RepoSource:
+    """
+    Pick the source for a conversion target:
+      git+<path or url>[#ref]  → git plumbing (a mirror, a local repo at a ref)
+      <dir>                    → git plumbing for a bare repo, else the directory as-is
+      <non-GitHub url>.git     → git plumbing against the mirror
+      anything else            → GitHub API
+    With allow_local=False only GitHub targets are accepted, and the
+    filesystem is never consulted — errors must not reveal which server
+    paths exist.
+    """
+    if not allow_local:
+        if _looks_local(target):
+            raise ValueError("Only GitHub URLs are accepted (set ALLOW_LOCAL_SOURCES=1 for local and git sources)")
+        return GitHubSource(target)
+    if target.startswith("git+"):
+        location, _, ref = target[4:].partition("#")
+        return GitSource(os.path.expanduser(location) if location.startswith("~") else location, ref or "HEAD")
+    if target.startswith("~"):
+        target = os.path.expanduser(target)
+    if os.path.isdir(target):
+        return GitSource(target) if _is_bare_repo(target) else LocalDirSource(target)
+    if target.startswith(("/", "./", "../", "~")):
+        raise ValueError(f"No such directory: {target}")
+    if _is_remote(target) and "github.com" not in target and target.rstrip("/").endswith(".git"):
+        return GitSource(target)
+    return GitHubSource(target)
+
+
+def iter_source(target: str) -> Iterator[dict]:
+    """Files of any conversion target, up to MAX_FILES."""
+    yield from open_source(target).iter_files(int(os.getenv("MAX_FILES", 50)))
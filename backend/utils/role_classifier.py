@@ -0,0 +1,104 @@
+import re
+import ast
+
+# Deterministic role classifier. Scores model/controller/service/util signals
+# from the AST and only defers to the LLM when the winner is not clear-cut.
+
+ROLES = ("model", "controller", "service", "util")
+
+MODEL_BASES = {
+    "BaseModel", "SQLModel", "Base", "DeclarativeBase", "Model", "Document",
+    "Schema", "TypedDict", "NamedTuple", "Enum", "IntEnum", "StrEnum",
+}
+MODEL_DECORATORS   = {"dataclass", "define", "frozen", "attrs", "s"}
+ROUTE_METHODS      = {"get", "post", "put", "patch", "delete", "head", "options", "route", "websocket", "api_route"}
+ROUTER_FACTORIES   = {"FastAPI", "APIRouter", "Flask", "Blueprint", "Router"}
+EXTERNAL_CLIENTS   = {
+    "requests", "httpx", "aiohttp", "urllib", "boto3", "botocore", "openai", "anthropic",
+    "smtplib", "redis", "pika", "kafka", "stripe", "twilio", "sendgrid", "github", "celery",
+}
+SERVICE_SUFFIXES   = ("Service", "Client", "Manager", "Repository", "Repo", "Gateway", "Handler", "Worker")
+PATH_HINTS = {
+    "model":      ("model", "schema", "entities", "entity", "dto"),
+    "controller": ("route", "view", "controller", "api", "endpoint", "main", "app"),
+    "service":    ("service", "client", "manager", "repository", "worker", "task"),
+    "util":       ("util", "helper", "config", "setting", "constant", "common", "tools"),
+}
+
+
+def _name(node) -> str:
+    """Last dotted component of a Name/Attribute/Call expression."""
+    if isinstance(node, ast.Call):
+        return _name(node.func)
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return ""
+
+
+def _score(path: str, tree: ast.Module) -> dict:
+    scores = dict.fromkeys(ROLES, 0.0)
+    n_classes = n_funcs = 0
+
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            modules = [a.name for a in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+            if any(m.split(".")[0] in EXTERNAL_CLIENTS for m in modules):
+                scores["service"] += 2
+
+        elif isinstance(node, ast.ClassDef):
+            n_classes += 1
+            bases = {_name(b) for b in node.bases}
+            decos = {_name(d) for d in node.decorator_list}
+            if bases & MODEL_BASES or decos & MODEL_DECORATORS:
+                scores["model"] += 3
+            elif node.name.endswith(SERVICE_SUFFIXES):
+                scores["service"] += 3
+            elif any(isinstance(b, (ast.FunctionDef, ast.AsyncFunctionDef)) for b in node.body):
+                scores["service"] += 1   # behaviour-bearing class
+
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            n_funcs += 1
+            for d in node.decorator_list:
+                target = d.func if isinstance(d, ast.Call) else d
+                if isinstance(target, ast.Attribute) and target.attr in ROUTE_METHODS:
+                    scores["controller"] += 3
+
+        elif isinstance(node, ast.Call) and _name(node) in ROUTER_FACTORIES:
+            scores["controller"] += 2
+
+    # Module of plain functions / constants with nothing else going on
+    if n_classes == 0 and not any(scores.values()):
+        scores["util"] += 2 if n_funcs else 3
+
+    # Naming hints: "user_models.py", "services/billing.py", "helpers.py"
+    *dirs, filename = path.lower().removesuffix(".py").split("/")
+    stem_tokens = set(re.split(r"[_\-.]", filename))
+    dir_tokens  = {t for d in dirs for t in re.split(r"[_\-.]", d)} - {"app", "main", "src"}
+    for role, hints in PATH_HINTS.items():
+        if any(t.startswith(h) for t in stem_tokens for h in hints):
+            scores[role] += 1.5
+        elif any(t.startswith(h) for t in dir_tokens for h in hints):
+            scores[role] += 1
+    return scores
+
+
+def classify_role(path: str, source: str) -> tuple[str, float]:
+    """
+    Return (role, confidence) for a Python file.
+    confidence is in [0, 1]; unparsable or signal-free files score 0.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return "util", 0.0
+
+    scores  = _score(path, tree)
+    ranked  = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    (role, best), (_, second) = ranked[0], ranked[1]
+    if best == 0:
+        return "util", 0.0
+    # Margin over the runner-up, damped so a single weak signal stays below threshold
+    confidence = (best - second) / (best + 1)
+    return role, round(confidence, 2)
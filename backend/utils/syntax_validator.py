@@ -1,50 +1,172 @@
-import subprocess
-import tempfile
 import os
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
+log = logging.getLogger("validator")
 
-def validate_jac_syntax(jac_code: str) -> tuple[bool, str]:
+# ── Config ────────────────────────────────────────────────────
+VALIDATE_JAC       = os.getenv("VALIDATE_JAC", "1") != "0"
+VALIDATOR_WORKERS  = int(os.getenv("VALIDATOR_WORKERS", min(4, os.cpu_count() or 1)))
+VALIDATOR_TIMEOUT  = float(os.getenv("VALIDATOR_TIMEOUT_SECONDS", 15))
+VALIDATOR_CACHE    = int(os.getenv("VALIDATOR_CACHE_SIZE", 4096))   # results kept, by code hash
+
+# Path reported in parser errors — nothing is written there
+_VIRTUAL_PATH = "converted.jac"
+
+# Compiled once per worker at startup: the first compile() bootstraps
+# jaclang's compiler cache, which can take far longer than VALIDATOR_TIMEOUT
+_WARM_UP_SNIPPET = "node Warm {\n    has name: str = \"\";\n}\n"
+
+
+# ── Worker side (runs inside the pool processes) ──────────────
+_program_cls = None
+
+
+def _load_parser():
+    """Import the jaclang compiler once per worker; None if jaclang is not installed."""
+    global _program_cls
+    if _program_cls is None:
+        try:
+            from jaclang.jac0core.program import JacProgram            # jaclang >= 0.9
+        except ImportError:
+            try:
+                from jaclang.compiler.program import JacProgram        # older releases
+            except ImportError:
+                return None
+        _program_cls = JacProgram
+    return _program_cls
+
+
+def _parser_ready() -> bool:
+    if _load_parser() is None:
+        return False
+    _check_in_worker(_WARM_UP_SNIPPET)
+    return True
+
+
+def _check_in_worker(jac_code: str) -> tuple[bool, str] | None:
+    """Parse jac_code from memory. Returns None when no parser is available."""
+    program_cls = _load_parser()
+    if program_cls is None:
+        return None
+    program = program_cls()
+    program.compile(use_str=jac_code, file_path=_VIRTUAL_PATH, type_check=False, no_cgen=True)
+    if program.errors_had:
+        return False, "\n".join(str(e) for e in program.errors_had)
+    return True, ""
+
+
+# ── Pool ──────────────────────────────────────────────────────
+_pool: ProcessPoolExecutor | None = None
+_warming: list = []          # one parser import per worker, awaited before the first check
+_parser_missing = False
+_results: "OrderedDict[str, tuple[bool, str]]" = OrderedDict()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _warming
+    if _pool is None:
+        # spawn: workers must not inherit the server's threads or event loop
+        _pool = ProcessPoolExecutor(
+            max_workers=VALIDATOR_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # Start every worker and run one real compile now, not on the first
+        # file. The first jaclang import and compile can take tens of seconds
+        # on a cold install — they are not charged against VALIDATOR_TIMEOUT
+        _warming = [_pool.submit(_parser_ready) for _ in range(VALIDATOR_WORKERS)]
+    return _pool
+
+
+def _reset_pool(pool: ProcessPoolExecutor | None = None):
     """
-    Write jac_code to a temp file and run `jac check` on it.
-    Returns (is_valid: bool, error_message: str).
+    Throw away a pool with a hung or dead worker; the next call starts a
+    fresh one. With `pool`, only if it is still the current one — callers
+    that saw it break must not tear down its replacement. Checks still
+    queued on it fail with BrokenProcessPool instead of being cancelled.
     """
-    # BUG-7 FIX: initialize tmp_path before try block
-    # prevents NameError in finally if NamedTemporaryFile fails
-    tmp_path = None
+    global _pool
+    if pool is not None and pool is not _pool:
+        return
+    pool, _pool = _pool, None
+    if pool is None:
+        return
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.kill()
+    pool.shutdown(wait=False)
 
-    try:
-        with tempfile.NamedTemporaryFile(
-            suffix=".jac", mode="w", delete=False, encoding="utf-8"
-        ) as f:
-            f.write(jac_code)
-            tmp_path = f.name
-
-        result = subprocess.run(
-            ["jac", "check", tmp_path],
-            capture_output=True,
-            text=True,
-            timeout=15,
-        )
-        if result.returncode == 0:
-            return True, ""
-        else:
-            error = result.stderr.strip() or result.stdout.strip()
-            return False, error
-
-    except FileNotFoundError:
-        # jac CLI not installed — skip validation
+
+def warm_up():
+    """Spawn the pool ahead of the first conversion (called at API startup)."""
+    if VALIDATE_JAC:
+        _get_pool()
+
+
+def shutdown():
+    _reset_pool()
+
+
+def _remember(key: str, result: tuple[bool, str]):
+    _results[key] = result
+    _results.move_to_end(key)
+    while len(_results) > VALIDATOR_CACHE:
+        _results.popitem(last=False)
+
+
+def _skip_validation() -> tuple[bool, str]:
+    global _parser_missing
+    if not _parser_missing:
+        log.warning("jaclang is not installed — skipping Jac syntax validation")
+    _parser_missing = True
+    _reset_pool()
+    return True, ""
+
+
+async def validate_jac(jac_code: str) -> tuple[bool, str]:
+    """
+    Parse jac_code in a warm worker process. Returns (is_valid, error_message).
+    Results are cached by code hash. If jaclang is not installed, every snippet
+    is reported valid — same as the old `jac check` path without the CLI.
+    """
+    if not VALIDATE_JAC or _parser_missing:
         return True, ""
 
-    except subprocess.TimeoutExpired:
-        return False, "Syntax validation timed out"
+    key = hashlib.sha256(jac_code.encode("utf-8")).hexdigest()
+    if key in _results:
+        _results.move_to_end(key)
+        return _results[key]
 
-    except Exception as e:
-        return False, str(e)
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    try:
+        if _warming:
+            ready = await asyncio.gather(*(asyncio.wrap_future(f) for f in list(_warming)))
+            _warming.clear()
+            if not all(ready):
+                return _skip_validation()
+        result = await asyncio.wait_for(
+            loop.run_in_executor(pool, _check_in_worker, jac_code),
+            timeout=VALIDATOR_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        _reset_pool(pool)
+        return False, "Syntax validation timed out"
+    except BrokenProcessPool as e:
+        # Our worker died, or another check's timeout recycled the pool
+        log.error(f"Jac validator pool broke: {e}")
+        _reset_pool(pool)
+        return False, "Syntax validation was interrupted (validator restarted)"
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            raise   # the caller itself is being cancelled
+        return False, "Syntax validation was interrupted (validator restarted)"
 
-    finally:
-        # BUG-7 FIX: guard against tmp_path being None
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.unlink(tmp_path)
-            except Exception:
-                pass
\ No newline at end of file
+    if result is None:
+        return _skip_validation()
+    _remember(key, result)
+    return result
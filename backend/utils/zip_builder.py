@@ -1,6 +1,162 @@
 import os
-import zipfile
+import time
+import zlib
+import struct
 import tempfile
+from typing import Iterable, Iterator
+
+ENV_EXAMPLE = "ANTHROPIC_API_KEY=sk-ant-your-key-here\n"
+
+# ZIP record layouts (PKWARE APPNOTE 4.3.7 / 4.3.12 / 4.3.16)
+_LOCAL_HEADER   = struct.Struct("<4s2B4HL2L2H")
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_END_OF_DIR     = struct.Struct("<4s4H2LH")
+_UTF8_FLAG      = 0x0800
+_DEFLATED       = 8
+
+
+def _dos_datetime(ts: float) -> tuple[int, int]:
+    t = time.localtime(ts)
+    return (
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+        ((t.tm_year - 1980) << 9) | (t.tm_mon << 4) | t.tm_mday,
+    )
+
+
+def _compress(name: str, data) -> dict:
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    co  = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    dos_time, dos_date = _dos_datetime(time.time())
+    return {
+        "name":  name.encode("utf-8"),
+        "data":  co.compress(raw) + co.flush(),
+        "crc":   zlib.crc32(raw),
+        "size":  len(raw),
+        "time":  dos_time,
+        "date":  dos_date,
+    }
+
+
+def _local_header(e: dict) -> bytes:
+    return _LOCAL_HEADER.pack(
+        b"PK\x03\x04", 20, 0, _UTF8_FLAG, _DEFLATED, e["time"], e["date"],
+        e["crc"], len(e["data"]), e["size"], len(e["name"]), 0,
+    ) + e["name"]
+
+
+def _central_directory(entries: list[dict]) -> bytes:
+    out, offset = [], 0
+    for e in entries:
+        out.append(_CENTRAL_HEADER.pack(
+            b"PK\x01\x02", 20, 0, 20, 0, _UTF8_FLAG, _DEFLATED, e["time"], e["date"],
+            e["crc"], len(e["data"]), e["size"], len(e["name"]), 0, 0, 0, 0, 0, offset,
+        ) + e["name"])
+        offset += _LOCAL_HEADER.size + len(e["name"]) + len(e["data"])
+    directory = b"".join(out)
+    return directory + _END_OF_DIR.pack(
+        b"PK\x05\x06", 0, 0, len(entries), len(entries), len(directory), offset, 0,
+    )
+
+
+def _arcname(file_path: str) -> str:
+    return file_path if file_path.endswith(".jac") else file_path.replace(".py", ".jac")
+
+
+class ZipAssembler:
+    """
+    Builds a ZIP archive incrementally in memory. Each entry is deflated as
+    soon as it is added, so the archive is ready the moment the last file
+    lands; finalize() freezes it for ranged downloads.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, dict] = {}
+        self.finalized = False
+
+    def add(self, arcname: str, data):
+        if self.finalized:
+            raise RuntimeError("ZIP archive already finalized")
+        self._entries[arcname] = _compress(arcname, data)   # re-adding replaces
+
+    def add_jac_file(self, file_path: str, jac_code: str):
+        self.add(_arcname(file_path), jac_code)
+
+    def add_project_files(self, readme: str, demo_script: str):
+        self.add("README.md", readme)
+        self.add("demo.sh", demo_script)
+        self.add(".env.example", ENV_EXAMPLE)
+
+    def finalize(self):
+        self.finalized = True
+
+    def _segments(self) -> list[bytes]:
+        entries  = list(self._entries.values())
+        segments = []
+        for e in entries:
+            segments += [_local_header(e), e["data"]]
+        segments.append(_central_directory(entries))
+        return segments
+
+    @property
+    def size(self) -> int:
+        return sum(
+            _LOCAL_HEADER.size + _CENTRAL_HEADER.size + 2 * len(e["name"]) + len(e["data"])
+            for e in self._entries.values()
+        ) + _END_OF_DIR.size
+
+    def iter_bytes(self, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """Yield the archive bytes in [start, end) without joining them into one buffer."""
+        end = self.size if end is None else end
+        pos = 0
+        for seg in self._segments():
+            seg_end = pos + len(seg)
+            if seg_end > start and pos < end:
+                yield seg[max(start - pos, 0): min(end - pos, len(seg))]
+            pos = seg_end
+            if pos >= end:
+                break
+
+    def write_to(self, path: str):
+        with open(path, "wb") as fh:
+            for chunk in self.iter_bytes():
+                fh.write(chunk)
+
+
+class ZipFileArtifact:
+    """A finalized archive on disk, served with the same interface as ZipAssembler."""
+
+    finalized = True
+    CHUNK = 64 * 1024
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @property
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def iter_bytes(self, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        end = self.size if end is None else end
+        with open(self.path, "rb") as fh:
+            fh.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = fh.read(min(self.CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+def stream_zip(files: Iterable[tuple[str, str]]) -> Iterator[bytes]:
+    """Compress and yield (arcname, text) pairs one entry at a time; length is not known up front."""
+    entries = []
+    for arcname, data in files:
+        e = _compress(arcname, data)
+        entries.append(e)
+        yield _local_header(e)
+        yield e["data"]
+    yield _central_directory(entries)
 
 
 def build_zip(job_id: str, jac_files: dict, readme: str, demo_script: str) -> str:
@@ -11,20 +167,11 @@ def build_zip(job_id: str, jac_files: dict, readme: str, demo_script: str) -> st
     tmp_dir  = tempfile.gettempdir()
     zip_path = os.path.join(tmp_dir, f"{job_id}.zip")
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-
-        # Write each .jac file
-        for file_path, jac_code in jac_files.items():
-            arcname = file_path if file_path.endswith(".jac") else file_path.replace(".py", ".jac")
-            zf.writestr(arcname, jac_code)
-
-        # Write README
-        zf.writestr("README.md", readme)
-
-        # Write demo script
-        zf.writestr("demo.sh", demo_script)
-
-        # Write .env.example
-        zf.writestr(".env.example", "ANTHROPIC_API_KEY=sk-ant-your-key-here\n")
+    zf = ZipAssembler()
+    for file_path, jac_code in jac_files.items():
+        zf.add_jac_file(file_path, jac_code)
+    zf.add_project_files(readme, demo_script)
+    zf.finalize()
+    zf.write_to(zip_path)
 
-    return zip_path
\ No newline at end of file
+    return zip_path
@@ -22,82 +22,110 @@ export default function ConvertPage() {
   const [activeTab,  setActiveTab]  = useState("code");
   const [summary,    setSummary]    = useState(null);
   const [errorMsg,   setErrorMsg]   = useState("");
+  const [live,       setLive]       = useState(null);   // latest streamed file: { file, text }
 
   useEffect(() => {
     if (!jobId) return;
     let cancelled = false;
 
+    // Resume point for reconnects — the backend replays events after this id
+    let lastEventId = "";
+    const MAX_RECONNECTS = 5;
+    // Streamed Jac text per file, rebuilt from `partial` deltas
+    const partials = {};
+
     async function connectSSE() {
       // Small delay to ensure backend has registered the job
       await new Promise(r => setTimeout(r, 500));
-      if (cancelled) return;
-
-      try {
-        const response = await fetch(`/api/stream/${jobId}`);
-        if (!response.ok) {
-          setErrorMsg("Failed to connect to stream");
-          setState(STATE.ERROR);
-          return;
-        }
 
-        const reader  = response.body.getReader();
-        const decoder = new TextDecoder();
-        let buffer    = "";
-        let eventType = "";
-        let dataLine  = "";
-
-        while (!cancelled) {
-          const { done, value } = await reader.read();
-          if (done) break;
-
-          buffer += decoder.decode(value, { stream: true });
-          const lines = buffer.split("\n");
-          buffer = lines.pop();
-
-          for (const line of lines) {
-            if (line.startsWith("event:")) {
-              eventType = line.slice(6).trim();
-            } else if (line.startsWith("data:")) {
-              dataLine = line.slice(5).trim();
-            } else if (line.startsWith(":")) {
-              // keepalive ping — ignore
-            } else if (line === "" && eventType && dataLine) {
-              try {
-                const data = JSON.parse(dataLine);
-                if (eventType === "progress") {
-                  setPct(data.pct || 0);
-                  setEvents(prev => [...prev, data]);
-                } else if (eventType === "complete") {
-                  setSummary(data);
-                  cancelled = true;
-                  try {
-                    const res = await fetch(`/api/preview/${jobId}`);
-                    const pv  = await res.json();
-                    setPreview(pv);
-                    setActiveFile(pv.files?.[0] || null);
-                  } catch (e) {
-                    console.error("Preview failed:", e);
+      for (let attempt = 0; attempt <= MAX_RECONNECTS && !cancelled; attempt++) {
+        if (attempt > 0) await new Promise(r => setTimeout(r, 1000 * attempt));
+        if (cancelled) return;
+
+        try {
+          const response = await fetch(`/api/stream/${jobId}`, {
+            headers: lastEventId ? { "Last-Event-ID": lastEventId } : {},
+          });
+          if (!response.ok) {
+            setErrorMsg("Failed to connect to stream");
+            setState(STATE.ERROR);
+            return;
+          }
+
+          const reader  = response.body.getReader();
+          const decoder = new TextDecoder();
+          let buffer    = "";
+          let eventType = "";
+          let dataLine  = "";
+          let eventId   = "";
+
+          while (!cancelled) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split("\n");
+            buffer = lines.pop();
+
+            for (const line of lines) {
+              if (line.startsWith("id:")) {
+                eventId = line.slice(3).trim();
+              } else if (line.startsWith("event:")) {
+                eventType = line.slice(6).trim();
+              } else if (line.startsWith("data:")) {
+                dataLine = line.slice(5).trim();
+              } else if (line.startsWith(":")) {
+                // keepalive ping — ignore
+              } else if (line === "" && eventType && dataLine) {
+                if (eventId) lastEventId = eventId;
+                try {
+                  const data = JSON.parse(dataLine);
+                  if (eventType === "progress") {
+                    setPct(data.pct || 0);
+                    setEvents(prev => [...prev, data]);
+                  } else if (eventType === "partial") {
+                    // Live only: after a reconnect the server resends from offset 0
+                    const key  = `${data.file}#${data.attempt}`;
+                    const text = partials[key] || "";
+                    if (data.offset <= text.length) {
+                      partials[key] = text.slice(0, data.offset) + data.text;
+                      setLive({ file: data.file, text: partials[key] });
+                    }
+                  } else if (eventType === "complete") {
+                    setSummary(data);
+                    cancelled = true;
+                    try {
+                      const res = await fetch(`/api/preview/${jobId}`);
+                      const pv  = await res.json();
+                      setPreview(pv);
+                      setActiveFile(pv.files?.[0] || null);
+                    } catch (e) {
+                      console.error("Preview failed:", e);
+                    }
+                    setState(STATE.DONE);
+                  } else if (eventType === "error") {
+                    setErrorMsg(data.message || "Conversion failed");
+                    setState(STATE.ERROR);
+                    cancelled = true;
                   }
-                  setState(STATE.DONE);
-                } else if (eventType === "error") {
-                  setErrorMsg(data.message || "Conversion failed");
-                  setState(STATE.ERROR);
-                  cancelled = true;
+                } catch (e) {
+                  console.error("Parse error:", e);
                 }
-              } catch (e) {
-                console.error("Parse error:", e);
+                eventType = "";
+                dataLine  = "";
+                eventId   = "";
               }
-              eventType = "";
-              dataLine  = "";
             }
           }
+        } catch (e) {
+          if (cancelled) return;
+          console.error("SSE error, reconnecting:", e);
         }
-      } catch (e) {
-        if (!cancelled) {
-          console.error("SSE error:", e);
-          setErrorMsg("Lost connection to server. Please try again.");
-          setState(STATE.ERROR);
-        }
+      }
+
+      if (!cancelled) {
+        setErrorMsg("Lost connection to server. Please try again.");
+        setState(STATE.ERROR);
       }
     }
 
@@ -112,6 +140,12 @@ export default function ConvertPage() {
         <div style={styles.streamCard}>
           <h2 style={styles.streamTitle}>🤖 Agent is converting your repo...</h2>
           <ProgressStream events={events} pct={pct} />
+          {live && (
+            <div style={styles.live}>
+              <div style={styles.liveFile}>✍ {live.file}</div>
+              <pre style={styles.livePre}>{live.text.split("\n").slice(-12).join("\n")}</pre>
+            </div>
+          )}
         </div>
       </div>
     );
@@ -175,6 +209,9 @@ const styles = {
   center:      { minHeight: "100vh", display: "flex", alignItems: "center", justifyContent: "center", padding: "2rem" },
   streamCard:  { background: "#1a1f35", border: "1px solid #2d3748", borderRadius: "12px", padding: "2rem", width: "100%", maxWidth: "640px" },
   streamTitle: { fontSize: "1.3rem", fontWeight: 700, marginBottom: "1.5rem" },
+  live:        { marginTop: "1.25rem", borderTop: "1px solid #2d3748", paddingTop: "1rem" },
+  liveFile:    { color: "#94a3b8", fontSize: "0.8rem", marginBottom: "0.5rem" },
+  livePre:     { margin: 0, color: "#a5b4fc", fontSize: "0.75rem", fontFamily: "monospace", whiteSpace: "pre-wrap", maxHeight: "14rem", overflow: "hidden" },
   retryBtn:    { marginTop: "1.5rem", background: "#2d3748", border: "none", color: "#e2e8f0", padding: "0.6rem 1.2rem", borderRadius: "6px", cursor: "pointer" },
   page:        { display: "flex", flexDirection: "column", height: "100vh", overflow: "hidden" },
   topBar:      { display: "flex", alignItems: "center", justifyContent: "space-between", padding: "0.75rem 1.5rem", background: "#1a1f35", borderBottom: "1px solid #2d3748", flexShrink: 0 },